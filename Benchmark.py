@@ -0,0 +1,289 @@
+#!/usr/bin/env python
+import glob
+import json
+import multiprocessing
+import os
+import platform
+import sys
+import time
+from vtkmodules.vtkCommonCore import vtkVersion
+from ElevationEngine import NumpyElevation
+from SurfaceSampler import SampleSurface
+from PointCloudIO import LoadPolyData, ReadPolyData, SidecarEnabled
+from PipelineTrace import StartTrace
+from Pipelines import (
+    BuildOctree,
+    DataRange,
+    Densify,
+    Elevation,
+    EstimateNormals,
+    ExtractSurface,
+    NormalSampleSize,
+    OctreeRepresentation,
+    PaddedBounds,
+    SamplePoints,
+    SignedDistance,
+    SurfaceRadius,
+    Triangulate
+)
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+PIPELINES = ['elevation', 'densify', 'extract-surface', 'octree', 'sample', 'triangulate']
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                'benchmark_baseline.json')
+
+
+def get_program_parameters():
+    import argparse
+    description = 'Time every stage of the filter script pipelines headlessly.'
+    epilogue = '''
+Each (pipeline, file) case runs in a fresh process so that peak RSS is
+per case. Before the timed read each case loads its input once untimed,
+so the read stage maps a warm sidecar (or decodes, with --no-sidecar)
+whatever was on disk before. With --baseline the run is compared against
+stored results and the exit status is 1 when a stage got slower than the
+tolerance allows or an output size changed.
+'''
+    parser = argparse.ArgumentParser(description=description, epilog=epilogue,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('files', nargs='*', default=['./res/*.vtp'],
+                        help='input files or glob patterns (default: ./res/*.vtp)')
+    parser.add_argument('--pipelines', nargs='+', choices=PIPELINES, default=PIPELINES)
+    parser.add_argument('--dimension', type=int, default=256,
+                        help='signed distance volume dimension')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='runs per case, the fastest is kept')
+    parser.add_argument('--output', help='write the results as JSON')
+    parser.add_argument('--baseline', nargs='?', const=DEFAULT_BASELINE,
+                        help='compare against a stored baseline')
+    parser.add_argument('--update-baseline', action='store_true',
+                        help='write the results to the baseline file')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='allowed relative slowdown per stage')
+    parser.add_argument('--min-seconds', type=float, default=0.01,
+                        help='ignore slowdowns smaller than this')
+    parser.add_argument('--no-sidecar', action='store_true',
+                        help='always decode inputs instead of using point cache sidecars')
+    args = parser.parse_args()
+    return args
+
+
+def PeakRss():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == 'darwin':
+        peak //= 1024
+    return peak
+
+
+def OutputSize(output):
+    if hasattr(output, 'GetNumberOfLeafNodes'):
+        return {"leaf_nodes": output.GetNumberOfLeafNodes(), "levels": output.GetLevel()}
+    size = {"points": output.GetNumberOfPoints(), "cells": output.GetNumberOfCells(),
+            "memory_kib": output.GetActualMemorySize()}
+    return size
+
+
+class StageTimer(object):
+    def __init__(self):
+        self.stages = []
+
+    def Run(self, name, func, *args):
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        output = func(*args)
+        record = {
+            "stage": name,
+            "wall_seconds": time.perf_counter() - wall,
+            "cpu_seconds": time.process_time() - cpu,
+            "peak_rss_kib": PeakRss(),
+        }
+        record.update(OutputSize(output))
+        self.stages.append(record)
+        return output
+
+
+def RunElevation(timer, polyData, dimension):
+    timer.Run("elevation", Elevation, polyData)
+    timer.Run("elevation_numpy", NumpyElevation, polyData)
+
+
+def RunDensify(timer, polyData, dimension):
+    maxRange = max(DataRange(polyData.GetBounds()))
+    timer.Run("densify", Densify, polyData, maxRange * .03)
+
+
+def RunExtractSurface(timer, polyData, dimension):
+    bounds = polyData.GetBounds()
+    oriented = polyData
+    if not polyData.GetPointData().GetNormals():
+        oriented = timer.Run("normals", EstimateNormals, polyData, NormalSampleSize(polyData))
+    radius = SurfaceRadius(bounds, dimension)
+    distance = timer.Run("signed_distance", SignedDistance, oriented, dimension, radius,
+                         PaddedBounds(bounds))
+    timer.Run("extract_surface", ExtractSurface, distance, radius)
+
+
+def RunOctree(timer, polyData, dimension):
+    octree = timer.Run("build_locator", BuildOctree, polyData, 5)
+    timer.Run("representation", OctreeRepresentation, octree, octree.GetLevel())
+
+
+def RunSample(timer, polyData, dimension):
+    sample = timer.Run("sample", SamplePoints, polyData, DataRange(polyData.GetBounds())[0] / 50)
+    if polyData.GetNumberOfPolys():
+        timer.Run("sample_numpy", SampleSurface, polyData, sample.GetNumberOfPoints(), 0)
+
+
+def RunTriangulate(timer, polyData, dimension):
+    timer.Run("triangulate", Triangulate, polyData)
+
+
+RUNNERS = {
+    'elevation': RunElevation,
+    'densify': RunDensify,
+    'extract-surface': RunExtractSurface,
+    'octree': RunOctree,
+    'sample': RunSample,
+    'triangulate': RunTriangulate,
+}
+
+
+def RunCase(pipeline, filename, dimension):
+    if SidecarEnabled(filename):
+        # Untimed: writes the sidecar if missing or stale #
+        LoadPolyData(filename)
+    timer = StageTimer()
+    polyData = timer.Run("read", ReadPolyData, filename)
+    RUNNERS[pipeline](timer, polyData, dimension)
+    return timer.stages
+
+
+def MergeRuns(runs):
+    # Fastest wall/cpu per stage, largest peak RSS #
+    merged = [dict(stage) for stage in runs[0]]
+    for run in runs[1:]:
+        for best, stage in zip(merged, run):
+            best["wall_seconds"] = min(best["wall_seconds"], stage["wall_seconds"])
+            best["cpu_seconds"] = min(best["cpu_seconds"], stage["cpu_seconds"])
+            if stage["peak_rss_kib"] is not None:
+                best["peak_rss_kib"] = max(best["peak_rss_kib"], stage["peak_rss_kib"])
+    return merged
+
+
+def RunBenchmark(filenames, pipelines, dimension, repeat):
+    results = []
+    StartTrace()
+    context = multiprocessing.get_context('spawn')
+    for pipeline in pipelines:
+        for filename in filenames:
+            runs = []
+            for _ in range(max(1, repeat)):
+                with context.Pool(1, maxtasksperchild=1) as pool:
+                    runs.append(pool.apply(RunCase, (pipeline, filename, dimension)))
+            stages = MergeRuns(runs)
+            results.append({"pipeline": pipeline, "file": os.path.basename(filename),
+                            "stages": stages})
+            for stage in stages:
+                print("%-16s %-22s %-16s %9.4f s wall %9.4f s cpu %8s KiB peak" % (
+                    pipeline, os.path.basename(filename), stage["stage"],
+                    stage["wall_seconds"], stage["cpu_seconds"], stage["peak_rss_kib"]))
+    return results
+
+
+def ReadMode():
+    return "decode" if os.environ.get("PCFT_SIDECAR", "1") == "0" else "sidecar"
+
+
+def CompareBaseline(results, baseline, tolerance, minSeconds, skipStages=()):
+    stored = {}
+    for case in baseline["results"]:
+        for stage in case["stages"]:
+            stored[(case["pipeline"], case["file"], stage["stage"])] = stage
+
+    failures = []
+    for case in results:
+        for stage in case["stages"]:
+            key = (case["pipeline"], case["file"], stage["stage"])
+            base = stored.get(key)
+            if base is None or stage["stage"] in skipStages:
+                continue
+            wall, baseWall = stage["wall_seconds"], base["wall_seconds"]
+            if wall > baseWall * (1 + tolerance) and wall - baseWall > minSeconds:
+                failures.append("%s: %.4f s, baseline %.4f s (+%.0f%%)" % (
+                    "/".join(key), wall, baseWall, (wall / baseWall - 1) * 100))
+            for field in ("points", "cells", "leaf_nodes", "levels"):
+                if field in base and stage.get(field) != base[field]:
+                    failures.append("%s: %s %s, baseline %s" % (
+                        "/".join(key), field, stage.get(field), base[field]))
+    return failures
+
+
+def main():
+    args = get_program_parameters()
+    if args.no_sidecar:
+        os.environ["PCFT_SIDECAR"] = "0"
+
+    filenames = []
+    for pattern in args.files:
+        for match in sorted(glob.glob(pattern)):
+            if match not in filenames:
+                filenames.append(match)
+    if not filenames:
+        print("No input files match: ", " ".join(args.files))
+        return 2
+
+    results = RunBenchmark(filenames, args.pipelines, args.dimension, args.repeat)
+    report = {
+        "environment": {
+            "python": platform.python_version(),
+            "vtk": vtkVersion.GetVTKVersion(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+        },
+        "dimension": args.dimension,
+        "read_mode": ReadMode(),
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    if args.update_baseline:
+        with open(args.baseline or DEFAULT_BASELINE, 'w') as f:
+            json.dump(report, f, indent=2)
+        return 0
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get("dimension") != args.dimension:
+            print("Baseline was recorded with dimension ", baseline.get("dimension"))
+        cpus = baseline.get("environment", {}).get("cpus")
+        if cpus != os.cpu_count():
+            print("WARNING: baseline was recorded on ", cpus, " CPUs, this machine has ",
+                  os.cpu_count(), "; timings are not comparable")
+        skipStages = ()
+        if baseline.get("read_mode") != ReadMode():
+            print("WARNING: baseline read mode is ", baseline.get("read_mode"), ", this run is ",
+                  ReadMode(), "; read stages not compared")
+            skipStages = ("read",)
+        failures = CompareBaseline(results, baseline, args.tolerance, args.min_seconds,
+                                   skipStages)
+        if failures:
+            print("!" * 72)
+            print("PERFORMANCE REGRESSION against ", args.baseline)
+            for failure in failures:
+                print("  ", failure)
+            print("!" * 72)
+            return 1
+        print("No regressions against ", args.baseline)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
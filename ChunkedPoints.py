@@ -0,0 +1,262 @@
+#!/usr/bin/env python
+import time
+from pathlib import Path
+import numpy as np
+from ElevationEngine import ElevationScalars, PointsPolyData
+from StreamingTriangulate import PlyHeader
+
+TEXT_SUFFIXES = ['.xyz', '.csv', '.txt', '.pts']
+RAW_SUFFIXES = ['.bin', '.raw']
+DEFAULT_CHUNK_POINTS = 1 << 20
+READ_BYTES = 16 << 20
+# Voxel indices are packed into one int64 key, 21 bits per axis #
+VOXEL_BITS = 21
+VOXEL_LIMIT = 1 << (VOXEL_BITS - 1)
+# Partial voxel sums held before VoxelAccumulator merges them #
+MERGE_ENTRIES = 1 << 18
+
+
+def Rechunk(blocks, chunkPoints):
+    """Regroup (n, 3) blocks of any size into blocks of exactly chunkPoints rows."""
+    pending, count = [], 0
+    for block in blocks:
+        pending.append(block)
+        count += len(block)
+        while count >= chunkPoints:
+            merged = np.concatenate(pending) if len(pending) > 1 else pending[0]
+            yield merged[:chunkPoints]
+            pending = [merged[chunkPoints:]]
+            count = len(pending[0])
+    if count:
+        yield np.concatenate(pending)
+
+
+def PlyBlocks(file_name, chunkPoints):
+    header = PlyHeader.Parse(file_name)
+    if header is None:
+        raise ValueError(f'Not a binary PLY with scalar vertex properties: {file_name}')
+    with open(file_name, 'rb') as f:
+        f.seek(header.vertexStart)
+        for first in range(0, header.numberOfVertices, chunkPoints):
+            count = min(chunkPoints, header.numberOfVertices - first)
+            vertices = np.fromfile(f, dtype=header.vertexType, count=count)
+            block = np.empty((len(vertices), 3), dtype=np.float32)
+            for axis, name in enumerate('xyz'):
+                block[:, axis] = vertices[name]
+            yield block
+
+
+def RawBlocks(file_name, chunkPoints, dtype='<f4', components=3):
+    """Interleaved records of components values, the first three being x, y, z."""
+    with open(file_name, 'rb') as f:
+        while True:
+            values = np.fromfile(f, dtype=dtype, count=chunkPoints * components)
+            if len(values) == 0:
+                return
+            yield values.reshape(-1, components)[:, :3].astype(np.float32)
+
+
+def ParseRow(line):
+    try:
+        return [float(value) for value in line.replace(b',', b' ').split()]
+    except ValueError:
+        return None
+
+
+def TextBlocks(file_name):
+    """x y z (more columns ignored) rows, separated by blanks or commas.
+
+    The file is read READ_BYTES at a time, cut at the last newline and
+    parsed in bulk. Leading lines that are not numbers (a CSV header) are
+    skipped.
+    """
+    columns = None
+    tail = b''
+    with open(file_name, 'rb') as f:
+        while True:
+            data = f.read(READ_BYTES)
+            atEnd = not data
+            data = tail + data
+            if not atEnd:
+                cut = data.rfind(b'\n') + 1
+                if cut == 0:
+                    tail = data
+                    continue
+                data, tail = data[:cut], data[cut:]
+            if columns is None:
+                lines = data.split(b'\n')
+                for skipped, line in enumerate(lines):
+                    row = ParseRow(line)
+                    if row:
+                        columns = len(row)
+                        break
+                else:
+                    if atEnd:
+                        return
+                    continue
+                data = b'\n'.join(lines[skipped:])
+            if data.strip():
+                values = np.array(data.replace(b',', b' ').split(), dtype=np.float64)
+                if len(values) % columns:
+                    raise ValueError(f'Rows of unequal length in {file_name}')
+                yield values.reshape(-1, columns)[:, :3].astype(np.float32)
+            if atEnd:
+                return
+
+
+def PointChunks(file_name, chunkPoints=DEFAULT_CHUNK_POINTS, dtype='<f4', components=3):
+    """Yield (chunkPoints, 3) float32 blocks of the points of file_name.
+
+    Binary PLY vertices and raw interleaved binary (dtype, components per
+    point) are read with bulk fromfile calls of one block each; text files
+    are parsed in large buffered pieces. Only one block is resident at a
+    time, the last one may be shorter.
+    """
+    ext = Path(file_name).suffix.lower()
+    if ext == '.ply':
+        return PlyBlocks(file_name, chunkPoints)
+    if ext in RAW_SUFFIXES:
+        return RawBlocks(file_name, chunkPoints, dtype, components)
+    if ext in TEXT_SUFFIXES:
+        return Rechunk(TextBlocks(file_name), chunkPoints)
+    raise ValueError(f'No chunked reader for this file suffix: {ext}')
+
+
+def ChunkBounds(chunks):
+    low = np.full(3, np.inf)
+    high = np.full(3, -np.inf)
+    for points in chunks:
+        if len(points):
+            low = np.minimum(low, points.min(axis=0))
+            high = np.maximum(high, points.max(axis=0))
+    return (low[0], high[0], low[1], high[1], low[2], high[2])
+
+
+def ElevationChunks(chunks, lowPoint, highPoint, scalarRange=(0.0, 1.0)):
+    """Yield (points, elevation) per block, as vtkElevationFilter would color them."""
+    for points in chunks:
+        yield points, ElevationScalars(points, lowPoint, highPoint, scalarRange)
+
+
+def VoxelKeys(points, voxelSize, origin=(0.0, 0.0, 0.0)):
+    """int64 keys of the voxelSize cells holding points, counted from origin.
+
+    Pass an origin near the points: the indices are limited to 2^20 cells
+    either side of it, which absolute coordinates of a georeferenced cloud
+    exceed at any useful voxel size.
+    """
+    index = np.floor((points - np.asarray(origin, dtype=np.float64)) / voxelSize).astype(np.int64)
+    if index.size and (index.min() < -VOXEL_LIMIT or index.max() >= VOXEL_LIMIT):
+        raise ValueError(f'Voxel size {voxelSize} gives more than 2^{VOXEL_BITS} voxels per axis')
+    index += VOXEL_LIMIT
+    return (index[:, 0] << (2 * VOXEL_BITS)) | (index[:, 1] << VOXEL_BITS) | index[:, 2]
+
+
+def ReduceVoxels(keys, sums, counts):
+    """Merge entries sharing a key: unique keys, summed columns of sums and counts."""
+    unique, inverse = np.unique(keys, return_inverse=True)
+    merged = np.empty((len(unique), sums.shape[1]))
+    for axis in range(sums.shape[1]):
+        merged[:, axis] = np.bincount(inverse, weights=sums[:, axis], minlength=len(unique))
+    return unique, merged, np.bincount(inverse, weights=counts, minlength=len(unique))
+
+
+class VoxelAccumulator(object):
+    """Running per-voxel coordinate sums and counts over point blocks.
+
+    Each block is reduced on its own; the partial results are merged once
+    they outgrow the voxels already held, so memory follows the number of
+    occupied voxels, not the number of points.
+    """
+
+    def __init__(self, voxelSize):
+        self.voxelSize = voxelSize
+        # Voxels and sums are counted from the minimum of the first block #
+        self.origin = None
+        self.numberOfPoints = 0
+        self.partials = []
+        self.partialSize = 0
+        self.mergedSize = 0
+
+    def Add(self, points):
+        if len(points) == 0:
+            return
+        if self.origin is None:
+            self.origin = points.min(axis=0).astype(np.float64)
+        keys = VoxelKeys(points, self.voxelSize, self.origin)
+        partial = ReduceVoxels(keys, points - self.origin, np.ones(len(points)))
+        self.partials.append(partial)
+        self.partialSize += len(partial[0])
+        self.numberOfPoints += len(points)
+        if self.partialSize > max(2 * self.mergedSize, MERGE_ENTRIES):
+            self.Merge()
+
+    def Merge(self):
+        if len(self.partials) > 1:
+            self.partials = [ReduceVoxels(*(np.concatenate(arrays)
+                                            for arrays in zip(*self.partials)))]
+        self.mergedSize = self.partialSize = len(self.partials[0][0]) if self.partials else 0
+
+    def Centroids(self):
+        """(voxels, 3) float32 centroids and the point count of each voxel."""
+        self.Merge()
+        if not self.partials:
+            return np.empty((0, 3), dtype=np.float32), np.empty(0)
+        keys, sums, counts = self.partials[0]
+        return (sums / counts[:, None] + self.origin).astype(np.float32), counts
+
+
+def VoxelDownsampleChunks(chunks, voxelSize):
+    accumulator = VoxelAccumulator(voxelSize)
+    for points in chunks:
+        accumulator.Add(points)
+    return accumulator.Centroids()
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description='Stream a large point file block by block.')
+    parser.add_argument('filename', help='.ply, .xyz/.csv/.txt/.pts or raw .bin/.raw points')
+    parser.add_argument('--chunk-points', type=int, default=DEFAULT_CHUNK_POINTS)
+    parser.add_argument('--dtype', default='<f4', help='value type of raw files')
+    parser.add_argument('--components', type=int, default=3, help='values per point of raw files')
+    parser.add_argument('--elevation', metavar='OUTPUT_RAW',
+                        help='write x, y, z, elevation float32 records')
+    parser.add_argument('--voxel-size', type=float, default=None,
+                        help='voxel downsample and write the centroids to --output')
+    parser.add_argument('--output', default='downsampled.vtp')
+    args = parser.parse_args()
+
+    def Chunks():
+        return PointChunks(args.filename, args.chunk_points, args.dtype, args.components)
+
+    start = time.perf_counter()
+    if args.elevation:
+        bounds = ChunkBounds(Chunks())
+        numberOfPoints = 0
+        with open(args.elevation, 'wb') as f:
+            for points, scalars in ElevationChunks(Chunks(), (0, 0, bounds[5]), (0, 0, bounds[4])):
+                f.write(np.column_stack((points, scalars)).astype('<f4').data)
+                numberOfPoints += len(points)
+        print("Elevation of ", numberOfPoints, " points written to ", args.elevation)
+    elif args.voxel_size:
+        from vtkmodules.vtkIOXML import vtkXMLPolyDataWriter
+        accumulator = VoxelAccumulator(args.voxel_size)
+        for points in Chunks():
+            accumulator.Add(points)
+        centroids, counts = accumulator.Centroids()
+        numberOfPoints = accumulator.numberOfPoints
+        writer = vtkXMLPolyDataWriter()
+        writer.SetInputData(PointsPolyData(centroids))
+        writer.SetFileName(args.output)
+        writer.Write()
+        print(numberOfPoints, " points in ", len(centroids), " voxels written to ", args.output)
+    else:
+        numberOfPoints = sum(len(points) for points in Chunks())
+        print(numberOfPoints, " points")
+    elapsed = time.perf_counter() - start
+    print("%.3f" % elapsed, " s (", "%.0f" % (numberOfPoints / elapsed), " points/s)")
+
+
+if __name__ == '__main__':
+    main()
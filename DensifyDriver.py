@@ -0,0 +1,63 @@
+#!/usr/bin/env python
+import time
+import numpy as np
+from vtkmodules.util import numpy_support
+from ElevationEngine import PointsPolyData
+from Pipelines import Densify
+
+
+def DensifyPasses(polyData, targetDistance, maxIterations=5, closestPoints=10,
+                  minGrowth=0.0, pointBudget=None):
+    """Run vtkDensifyPointCloudFilter one pass at a time, yielding each pass.
+
+    Yields (newPoints, record) where newPoints holds only the points the
+    pass added and record its timing and growth. Stops after maxIterations,
+    when a pass adds fewer than minGrowth * current points, or when the
+    cloud reaches pointBudget points (the last pass is truncated to fit).
+    """
+    current = polyData
+    for iteration in range(1, maxIterations + 1):
+        start = time.perf_counter()
+        densified = Densify(current, targetDistance, 1, closestPoints)
+        seconds = time.perf_counter() - start
+
+        before = current.GetNumberOfPoints()
+        points = numpy_support.vtk_to_numpy(densified.GetPoints().GetData())
+        newPoints = points[before:]
+        stop = None
+        if pointBudget is not None and before + len(newPoints) >= pointBudget:
+            newPoints = newPoints[:max(pointBudget - before, 0)]
+            stop = "point budget"
+        growth = len(newPoints) / max(before, 1)
+        if stop is None and (len(newPoints) == 0 or growth < minGrowth):
+            stop = "converged"
+        if stop is None and iteration == maxIterations:
+            stop = "maximum iterations"
+        record = {
+            "iteration": iteration,
+            "seconds": seconds,
+            "points_before": before,
+            "new_points": len(newPoints),
+            "growth": growth,
+            "stop": stop,
+        }
+        yield newPoints, record
+        if stop is not None:
+            return
+        current = densified
+
+
+def IterativeDensify(polyData, targetDistance, maxIterations=5, closestPoints=10,
+                     minGrowth=0.0, pointBudget=None):
+    """Collect DensifyPasses into one cloud; returns (polyData, history)."""
+    pieces = [numpy_support.vtk_to_numpy(polyData.GetPoints().GetData())]
+    history = []
+    for newPoints, record in DensifyPasses(polyData, targetDistance, maxIterations,
+                                           closestPoints, minGrowth, pointBudget):
+        pieces.append(np.array(newPoints))
+        history.append(record)
+        print("Pass ", record["iteration"], ": +", record["new_points"], " points (",
+              "%.1f" % (record["growth"] * 100), "%) in ", "%.3f" % record["seconds"], " s")
+    if history:
+        print("Stopped after ", len(history), " passes: ", history[-1]["stop"])
+    return PointsPolyData(np.concatenate(pieces)), history
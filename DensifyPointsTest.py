@@ -1,48 +1,24 @@
 #!/usr/bin/env python
 # noinspection PyUnresolvedReferences
-import numpy as np
-from pathlib import Path
-import vtk
 import vtkmodules.vtkInteractionStyle
 # noinspection PyUnresolvedReferences
 import vtkmodules.vtkRenderingOpenGL2
 from vtkmodules.vtkCommonColor import vtkNamedColors
-from vtkmodules.vtkIOXML import vtkXMLPolyDataReader
-from vtkmodules.vtkFiltersGeneral import vtkVertexGlyphFilter
 from vtkmodules.vtkInteractionStyle import vtkInteractorStyleTrackballCamera
-from vtkmodules.vtkCommonDataModel import (
-    vtkCellArray,
-    vtkPolyData,
-    vtkPolyLine
-)
-from vtkmodules.vtkFiltersCore import (
-    vtkCleanPolyData,
-    vtkElevationFilter,
-    vtkGlyph3D,
-    vtkMaskPoints,
-    vtkPolyDataNormals,
-    vtkTriangleFilter
-)
 from vtkmodules.vtkRenderingCore import (
     vtkActor,
-    vtkActor2D,
-    vtkCamera,
-    vtkDataSetMapper,
     vtkGlyph3DMapper,
-    vtkPolyDataMapper,
     vtkRenderWindow,
     vtkRenderWindowInteractor,
     vtkRenderer
 )
-from vtkmodules.vtkIOGeometry import (
-     vtkBYUReader,
-     vtkOBJReader,
-     vtkSTLReader
-)
-from vtkmodules.vtkIOLegacy import vtkPolyDataReader
-from vtkmodules.vtkIOPLY import vtkPLYReader
-from vtkmodules.vtkIOXML import vtkXMLPolyDataReader
 from vtkmodules.vtkFiltersSources import vtkSphereSource
+from PointCloudIO import ReadPolyData
+from Pipelines import Densify
+from PartitionedDensify import PartitionedDensify
+from DensifyDriver import IterativeDensify
+from PointLOD import DEFAULT_RENDER_BUDGET, PointBudgetLOD
+from OutlierRemoval import OUTLIER_MODES, RemoveOutliers
 
 def get_program_parameters():
     import argparse
@@ -50,57 +26,34 @@ def get_program_parameters():
     epilogue = ''''''
     parser = argparse.ArgumentParser(description=description, epilog=epilogue,
                                      formatter_class=argparse.RawDescriptionHelpFormatter)
-    parser.add_argument('filename', help='./res/ism_test_cat.vtp')
+    parser.add_argument('filename', nargs='?', default='./res/ism_test_wolf.vtp',
+                        help='./res/ism_test_cat.vtp')
+    parser.add_argument('--tiles', type=int, default=0,
+                        help='densify in tiles^3 spatial tiles in worker processes')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='number of worker processes (default: CPU count)')
+    parser.add_argument('--min-growth', type=float, default=None,
+                        help='densify pass by pass, stop when a pass grows the cloud less than this ratio')
+    parser.add_argument('--point-budget', type=int, default=None,
+                        help='densify pass by pass, stop once the cloud has this many points')
+    parser.add_argument('--outliers', choices=OUTLIER_MODES, default=None,
+                        help='remove stray points first: sigma of mean k-NN distance, or neighbors within a radius')
+    parser.add_argument('--outlier-sigma', type=float, default=3.0,
+                        help='standard deviations kept by --outliers statistical')
+    parser.add_argument('--outlier-radius', type=float, default=None,
+                        help='radius of --outliers radius (default: twice the sampled 4-NN spacing)')
+    parser.add_argument('--render-budget', type=int, default=DEFAULT_RENDER_BUDGET,
+                        help='points drawn per frame while the camera moves')
     args = parser.parse_args()
-    return args.filename
+    return args
 
 
-def ReadPolyData(file_name):
-    valid_suffixes = ['.g', '.obj', '.stl', '.ply', '.vtk', '.vtp']
-    path = Path(file_name)
-    if path.suffix:
-        ext = path.suffix.lower()
-    if path.suffix not in valid_suffixes:
-        print(f'No reader for this file suffix: {ext}')
-        return None
-    else:
-        if ext == ".ply":
-            reader = vtkPLYReader()
-            reader.SetFileName(file_name)
-            reader.Update()
-            poly_data = reader.GetOutput()
-        elif ext == ".vtp":
-            reader = vtkXMLPolyDataReader()
-            reader.SetFileName(file_name)
-            reader.Update()
-            poly_data = reader.GetOutput()
-        elif ext == ".obj":
-            reader = vtkOBJReader()
-            reader.SetFileName(file_name)
-            reader.Update()
-            poly_data = reader.GetOutput()
-        elif ext == ".stl":
-            reader = vtkSTLReader()
-            reader.SetFileName(file_name)
-            reader.Update()
-            poly_data = reader.GetOutput()
-        elif ext == ".vtk":
-            reader = vtkPolyDataReader()
-            reader.SetFileName(file_name)
-            reader.Update()
-            poly_data = reader.GetOutput()
-        elif ext == ".g":
-            reader = vtkBYUReader()
-            reader.SetGeometryFileName(file_name)
-            reader.Update()
-            poly_data = reader.GetOutput()
-
-        return poly_data
-
 def main():
-    #filename = get_program_parameters()
-    filename ="./res/ism_test_wolf.vtp"
-    polyData = ReadPolyData(filename)
+    args = get_program_parameters()
+    polyData = ReadPolyData(args.filename)
+    if args.outliers:
+        polyData = RemoveOutliers(polyData, args.outliers, stdDevFactor=args.outlier_sigma,
+                                  radius=args.outlier_radius)
 
     bounds = polyData.GetBounds()
     drange = [0, 0, 0];
@@ -111,13 +64,16 @@ def main():
     maxRange = max(max(drange[0], drange[1]), drange[2])
 
     print( "# of original points: ", polyData.GetNumberOfPoints())
-    densify = vtk.vtkDensifyPointCloudFilter()
-    densify.SetInputData(polyData)
-    densify.SetMaximumNumberOfIterations(5)
-    densify.SetTargetDistance(maxRange * .03)
-    densify.SetNumberOfClosestPoints(10)
-    densify.Update()
-    print("# of densified points: ", densify.GetOutput().GetNumberOfPoints())
+    if args.tiles > 0:
+        densified = PartitionedDensify(polyData, maxRange * .03, tiles=args.tiles,
+                                       workers=args.workers)
+    elif args.min_growth is not None or args.point_budget is not None:
+        densified, history = IterativeDensify(polyData, maxRange * .03,
+                                              minGrowth=args.min_growth or 0.0,
+                                              pointBudget=args.point_budget)
+    else:
+        densified = Densify(polyData, maxRange * .03)
+    print("# of densified points: ", densified.GetNumberOfPoints())
 
     colors = vtkNamedColors()
     radius = maxRange * .01
@@ -125,7 +81,6 @@ def main():
     sphereSource1.SetRadius(radius)
 
     glyph3D1 = vtkGlyph3DMapper()
-    glyph3D1.SetInputData(polyData)
     glyph3D1.SetSourceConnection(sphereSource1.GetOutputPort())
     glyph3D1.ScalarVisibilityOff()
     glyph3D1.ScalingOff()
@@ -140,7 +95,6 @@ def main():
     sphereSource2.SetRadius(radius * .75)
 
     glyph3D2 = vtkGlyph3DMapper()
-    glyph3D2.SetInputConnection(densify.GetOutputPort())
     glyph3D2.SetSourceConnection(sphereSource2.GetOutputPort())
     glyph3D2.ScalarVisibilityOff()
     glyph3D2.ScalingOff()
@@ -160,6 +114,13 @@ def main():
 
     iren = vtkRenderWindowInteractor()
     iren.SetRenderWindow(renWin)
+    style = vtkInteractorStyleTrackballCamera()
+    iren.SetInteractorStyle(style)
+
+    lod = PointBudgetLOD(renWin, args.render_budget)
+    lod.Add(glyph3D1, polyData)
+    lod.Add(glyph3D2, densified)
+    lod.Attach(style)
 
     # Add  the actors to the renderer, set  the  background and size  #
     ren1.AddActor(glyph3DActor1)
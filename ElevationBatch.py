@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+# Headless elevation of many files, shared by ElevationFilterTest --batch
+# and `pcft elevation`. Imports no rendering modules.
+import glob
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from vtkmodules.vtkIOXML import vtkXMLPolyDataWriter
+from PointCloudIO import ReadPolyData
+from Pipelines import Elevation
+from ElevationEngine import NumpyElevation
+from PipelineTrace import StartTrace
+
+ENGINES = {'vtk': Elevation, 'numpy': NumpyElevation}
+
+
+def OutputNames(filenames, outputDir):
+    """<stem>_elevation.vtp of each file, under its directory relative to the inputs' common one."""
+    common = os.path.commonpath([os.path.dirname(os.path.abspath(f)) for f in filenames])
+    outputNames = []
+    for filename in filenames:
+        relative = os.path.relpath(os.path.dirname(os.path.abspath(filename)), common)
+        stem = os.path.splitext(os.path.basename(filename))[0]
+        outputNames.append(os.path.normpath(os.path.join(outputDir, relative,
+                                                         stem + "_elevation.vtp")))
+    return outputNames
+
+
+def ElevateFile(filename, outputName, engine='vtk'):
+    start = time.perf_counter()
+    polyData = ReadPolyData(filename)
+    if polyData is None:
+        return filename, None, 0, time.perf_counter() - start
+    elevation = ENGINES[engine](polyData)
+
+    os.makedirs(os.path.dirname(outputName), exist_ok=True)
+    writer = vtkXMLPolyDataWriter()
+    writer.SetFileName(outputName)
+    writer.SetInputData(elevation)
+    writer.SetDataModeToAppended()
+    writer.Write()
+    return filename, outputName, elevation.GetNumberOfPoints(), time.perf_counter() - start
+
+
+def BatchElevation(patterns, outputDir, workers=None, engine='vtk'):
+    filenames = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern, recursive=True))
+        if not matches:
+            print("No files match: ", pattern)
+        for match in map(os.path.normpath, matches):
+            if match not in filenames:
+                filenames.append(match)
+    if not filenames:
+        return []
+    outputNames = OutputNames(filenames, outputDir)
+    # cat.vtp and cat.ply of one directory would write the same result #
+    collisions = sorted({name for name in outputNames if outputNames.count(name) > 1})
+    if collisions:
+        for name in collisions:
+            print("Several inputs would write ", name, ": ",
+                  [f for f, o in zip(filenames, outputNames) if o == name])
+        return []
+
+    results = []
+    start = time.perf_counter()
+    StartTrace()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(ElevateFile, f, o, engine)
+                   for f, o in zip(filenames, outputNames)]
+        for future in as_completed(futures):
+            filename, outputName, numPoints, seconds = future.result()
+            if outputName is None:
+                print("Skipped: ", filename)
+                continue
+            results.append((filename, outputName, numPoints, seconds))
+            print(filename, " -> ", outputName, ": ", numPoints, " points in ",
+                  "%.3f" % seconds, " s (", "%.0f" % (numPoints / seconds), " points/s)")
+    elapsed = time.perf_counter() - start
+
+    totalPoints = sum(r[2] for r in results)
+    print("# of files: ", len(results), ", # of points: ", totalPoints,
+          ", wall time: ", "%.3f" % elapsed, " s (", "%.0f" % (totalPoints / elapsed),
+          " points/s)")
+    return results
@@ -5,21 +5,7 @@ import vtkmodules.vtkInteractionStyle
 import vtkmodules.vtkRenderingOpenGL2
 from vtkmodules.vtkCommonColor import vtkNamedColors
 from vtkmodules.vtkIOXML import vtkXMLPolyDataReader
-from vtkmodules.vtkFiltersGeneral import vtkVertexGlyphFilter
 from vtkmodules.vtkInteractionStyle import vtkInteractorStyleTrackballCamera
-from vtkmodules.vtkCommonDataModel import (
-    vtkCellArray,
-    vtkPolyData,
-    vtkPolyLine
-)
-from vtkmodules.vtkFiltersCore import (
-    vtkCleanPolyData,
-    vtkElevationFilter,
-    vtkGlyph3D,
-    vtkMaskPoints,
-    vtkPolyDataNormals,
-    vtkTriangleFilter
-)
 from vtkmodules.vtkRenderingCore import (
     vtkActor,
     vtkPolyDataMapper,
@@ -27,23 +13,44 @@ from vtkmodules.vtkRenderingCore import (
     vtkRenderWindowInteractor,
     vtkRenderer
 )
+from ElevationBatch import ENGINES, BatchElevation
+from PointLOD import DEFAULT_RENDER_BUDGET, PointBudgetLOD
 
 
 def get_program_parameters():
     import argparse
     description = 'Read a VTK XML PolyData file.'
-    epilogue = ''''''
+    epilogue = '''
+Without --batch the file is shown in an interactive window. With --batch
+every matching file is colored headlessly and written to the output
+directory as <name>_elevation.vtp carrying the Elevation point array.
+'''
     parser = argparse.ArgumentParser(description=description, epilog=epilogue,
                                      formatter_class=argparse.RawDescriptionHelpFormatter)
-    parser.add_argument('filename', help='./res/ism_test_cat.vtp')
+    parser.add_argument('filename', nargs='?', default='./res/ism_test_wolf.vtp',
+                        help='./res/ism_test_cat.vtp')
+    parser.add_argument('--batch', nargs='+', metavar='GLOB',
+                        help='input files or glob patterns, e.g. "./res/*.vtp"')
+    parser.add_argument('--output-dir', default='./elevation',
+                        help='where batch results go, mirroring the input directories')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='number of worker processes (default: CPU count)')
+    parser.add_argument('--engine', choices=['vtk', 'numpy'], default='vtk',
+                        help='vtkVertexGlyphFilter + vtkElevationFilter, or the NumPy engine')
+    parser.add_argument('--render-budget', type=int, default=DEFAULT_RENDER_BUDGET,
+                        help='points drawn per frame while the camera moves')
     args = parser.parse_args()
-    return args.filename
+    return args
 
 
 def main():
+    args = get_program_parameters()
+    if args.batch:
+        BatchElevation(args.batch, args.output_dir, args.workers, args.engine)
+        return
+
     colors = vtkNamedColors()
-    #filename = get_program_parameters()
-    filename ="./res/ism_test_wolf.vtp"
+    filename = args.filename
 
     reader = vtkXMLPolyDataReader()
     reader.SetFileName(filename)
@@ -52,18 +59,9 @@ def main():
     #polyData = vtkPolyData()
     #polyData.SetPoints(reader.GetOutput());
 
-    glyphFilter = vtkVertexGlyphFilter()
-    glyphFilter.SetInputData(reader.GetOutput())
-    glyphFilter.Update()
-
-    bounds = glyphFilter.GetOutput().GetBounds()
-    elevationFilter =vtkElevationFilter()
-    elevationFilter.SetInputConnection(glyphFilter.GetOutputPort())
-    elevationFilter.SetLowPoint(0, 0, bounds[5])
-    elevationFilter.SetHighPoint(0, 0, bounds[4])
+    elevation = ENGINES[args.engine](reader.GetOutput())
 
     dataMapper = vtkPolyDataMapper()
-    dataMapper.SetInputConnection(elevationFilter.GetOutputPort())
 
     actor = vtkActor()
     actor.SetMapper(dataMapper)
@@ -81,6 +79,10 @@ def main():
     renderwindIt.SetRenderWindow(renderwind)
     renderwindIt.SetInteractorStyle(style)
 
+    lod = PointBudgetLOD(renderwind, args.render_budget)
+    lod.Add(dataMapper, elevation)
+    lod.Attach(style)
+
     renderwind.Render()
     renderwindIt.Start()
 
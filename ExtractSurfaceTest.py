@@ -1,49 +1,32 @@
 #!/usr/bin/env python
 # noinspection PyUnresolvedReferences
-import numpy as np
-from pathlib import Path
-import vtk
 import vtkmodules.vtkInteractionStyle
 # noinspection PyUnresolvedReferences
 import vtkmodules.vtkRenderingOpenGL2
 from vtkmodules.vtkCommonColor import vtkNamedColors
-from vtkmodules.vtkIOXML import vtkXMLPolyDataReader
-from vtkmodules.vtkFiltersGeneral import vtkVertexGlyphFilter
-from vtkmodules.vtkInteractionStyle import vtkInteractorStyleTrackballCamera
-from vtkmodules.vtkCommonDataModel import (
-    vtkCellArray,
-    vtkPolyData,
-    vtkPolyLine
-)
-from vtkmodules.vtkFiltersCore import (
-    vtkCleanPolyData,
-    vtkElevationFilter,
-    vtkGlyph3D,
-    vtkMaskPoints,
-    vtkPolyDataNormals,
-    vtkTriangleFilter
-)
 from vtkmodules.vtkRenderingCore import (
     vtkActor,
-    vtkActor2D,
-    vtkCamera,
-    vtkDataSetMapper,
-    vtkGlyph3DMapper,
     vtkProperty,
     vtkPolyDataMapper,
     vtkRenderWindow,
     vtkRenderWindowInteractor,
     vtkRenderer
 )
-from vtkmodules.vtkIOGeometry import (
-     vtkBYUReader,
-     vtkOBJReader,
-     vtkSTLReader
+from PointCloudIO import ReadPolyData
+from Pipelines import (
+    ExtractSurface,
+    NormalSampleSize,
+    PaddedBounds,
+    SignedDistance,
+    SurfaceRadius
 )
-from vtkmodules.vtkIOLegacy import vtkPolyDataReader
-from vtkmodules.vtkIOPLY import vtkPLYReader
-from vtkmodules.vtkIOXML import vtkXMLPolyDataReader
-from vtkmodules.vtkFiltersSources import vtkSphereSource
+from NarrowBandSurface import NarrowBandSurface
+from NeighborIndex import IndexFor
+from NormalCache import CachedNormals
+from TiledSurface import TiledSurface
+from SurfaceSweep import SurfaceSweep
+from VoxelGrid import GridVoxelSize, VoxelDownsample
+from OutlierRemoval import OUTLIER_MODES, RemoveOutliers
 
 def get_program_parameters():
     import argparse
@@ -51,102 +34,92 @@ def get_program_parameters():
     epilogue = ''''''
     parser = argparse.ArgumentParser(description=description, epilog=epilogue,
                                      formatter_class=argparse.RawDescriptionHelpFormatter)
-    parser.add_argument('filename', help='horse.vtp.')
+    parser.add_argument('filename', nargs='?', default='./res/ism_test_cat.vtp',
+                        help='horse.vtp.')
+    parser.add_argument('--dimension', type=int, default=256,
+                        help='signed distance volume resolution per axis')
+    parser.add_argument('--narrow-band', action='store_true',
+                        help='evaluate and store distances only within radius of the points')
+    parser.add_argument('--block-size', type=int, default=32,
+                        help='voxels per axis of a narrow band block')
+    parser.add_argument('--tiled', action='store_true',
+                        help='reconstruct tile by tile in worker processes')
+    parser.add_argument('--tile-size', type=int, default=64,
+                        help='voxels per axis of a tile')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='number of worker processes (default: CPU count)')
+    parser.add_argument('--outliers', choices=OUTLIER_MODES, default=None,
+                        help='remove stray points first: sigma of mean k-NN distance, or neighbors within a radius')
+    parser.add_argument('--outlier-sigma', type=float, default=3.0,
+                        help='standard deviations kept by --outliers statistical')
+    parser.add_argument('--outlier-radius', type=float, default=None,
+                        help='radius of --outliers radius (default: twice the sampled 4-NN spacing)')
+    parser.add_argument('--voxel-factor', type=float, default=None,
+                        help='reconstruct from voxel centroids, voxels this many grid spacings wide')
+    parser.add_argument('--sweep', nargs='*', type=float, metavar='RADIUS',
+                        help='write one surface per radius from a single distance volume and exit '
+                             '(no radius: ten from 0.55 to 1 times the distance radius)')
+    parser.add_argument('--output-dir', default='./sweep',
+                        help='where sweep surfaces and sweep.json are written')
     args = parser.parse_args()
-    return args.filename
-
-
-def ReadPolyData(file_name):
-    valid_suffixes = ['.g', '.obj', '.stl', '.ply', '.vtk', '.vtp']
-    path = Path(file_name)
-    if path.suffix:
-        ext = path.suffix.lower()
-    if path.suffix not in valid_suffixes:
-        print(f'No reader for this file suffix: {ext}')
-        return None
-    else:
-        if ext == ".ply":
-            reader = vtkPLYReader()
-            reader.SetFileName(file_name)
-            reader.Update()
-            poly_data = reader.GetOutput()
-        elif ext == ".vtp":
-            reader = vtkXMLPolyDataReader()
-            reader.SetFileName(file_name)
-            reader.Update()
-            poly_data = reader.GetOutput()
-        elif ext == ".obj":
-            reader = vtkOBJReader()
-            reader.SetFileName(file_name)
-            reader.Update()
-            poly_data = reader.GetOutput()
-        elif ext == ".stl":
-            reader = vtkSTLReader()
-            reader.SetFileName(file_name)
-            reader.Update()
-            poly_data = reader.GetOutput()
-        elif ext == ".vtk":
-            reader = vtkPolyDataReader()
-            reader.SetFileName(file_name)
-            reader.Update()
-            poly_data = reader.GetOutput()
-        elif ext == ".g":
-            reader = vtkBYUReader()
-            reader.SetGeometryFileName(file_name)
-            reader.Update()
-            poly_data = reader.GetOutput()
-
-        return poly_data
+    if args.sweep is not None and (args.narrow_band or args.tiled):
+        parser.error('--sweep extracts from one full distance volume, '
+                     'it cannot be combined with --narrow-band or --tiled')
+    return args
 
 
 def main():
     colors = vtkNamedColors()
-    #filename = get_program_parameters()
-    filename ="./res/ism_test_cat.vtp"
+    args = get_program_parameters()
+    filename = args.filename
+    if args.sweep is not None:
+        SurfaceSweep(filename, args.dimension, args.sweep or None, args.output_dir,
+                     workers=args.workers, outliers=args.outliers,
+                     outlierSigma=args.outlier_sigma, outlierRadius=args.outlier_radius,
+                     voxelFactor=args.voxel_factor)
+        return
     polyData = ReadPolyData(filename)
+    if args.outliers:
+        polyData = RemoveOutliers(polyData, args.outliers, stdDevFactor=args.outlier_sigma,
+                                  radius=args.outlier_radius)
     bounds = polyData.GetBounds()
     print( "# of points: ", polyData.GetNumberOfPoints())
+    if args.voxel_factor:
+        polyData = VoxelDownsample(polyData, GridVoxelSize(bounds, args.dimension,
+                                                           args.voxel_factor))
 
     drange =[1, 2, 3]
     for i in range(3):
       drange[i] = bounds[2 * i + 1] - bounds[2 * i]
 
-    sampleSize = polyData.GetNumberOfPoints() * 0.00005
-    if (sampleSize < 10):
-        sampleSize = 10
+    sampleSize = NormalSampleSize(polyData)
     print("Sample size is: ", sampleSize)
       # Do we need to estimate normals?
-    distance = vtk.vtkSignedDistance()
     if (polyData.GetPointData().GetNormals()):
         print("Using normals from input file")
-        distance.SetInputData(polyData)
+        oriented = polyData
     else:
         print("Estimating normals using PCANormalEstimation")
-        normals = vtk.vtkPCANormalEstimation()
-        normals.SetInputData(polyData)
-        normals.SetSampleSize(sampleSize)
-        normals.SetNormalOrientationToGraphTraversal()
-        normals.FlipNormalsOn()
-        distance.SetInputConnection(normals.GetOutputPort())
+        oriented = CachedNormals(polyData, sampleSize, locator=IndexFor(polyData).locator)
 
     print("Range: ", drange[0], ", ", drange[1], ", ", drange[2])
-    dimension = 256
-    radius = max(max(drange[0], drange[1]), drange[2]) /dimension * 4 # ~4 voxels
+    dimension = args.dimension
+    radius = SurfaceRadius(bounds, dimension)
     print("Radius: ",radius)
 
-    distance.SetRadius(radius)
-    distance.SetDimensions(dimension, dimension, dimension)
-    distance.SetBounds(bounds[0] - drange[0] * .1, bounds[1] + drange[0] * .1,
-                      bounds[2] - drange[1] * .1, bounds[3] + drange[1] * .1,
-                      bounds[4] - drange[2] * .1, bounds[5] + drange[2] * .1)
-
-    surface = vtk.vtkExtractSurface()
-    surface.SetInputConnection(distance.GetOutputPort())
-    surface.SetRadius(radius * .99)
-    surface.Update()
+    if args.tiled:
+        surface = TiledSurface(oriented, dimension, radius, PaddedBounds(bounds),
+                               args.tile_size, workers=args.workers)
+    elif args.narrow_band:
+        surface = NarrowBandSurface(oriented, dimension, radius, PaddedBounds(bounds),
+                                    args.block_size)
+    else:
+        distance = SignedDistance(oriented, dimension, radius, PaddedBounds(bounds),
+                                  IndexFor(oriented).locator)
+        surface = ExtractSurface(distance, radius)
 
     surfaceMapper = vtkPolyDataMapper()
-    surfaceMapper.SetInputConnection(surface.GetOutputPort())
+    surfaceMapper.SetInputData(surface)
 
     back = vtkProperty()
     back.SetColor(colors.GetColor3d("Banana"))
@@ -0,0 +1,198 @@
+#!/usr/bin/env python
+import time
+import numpy as np
+from vtkmodules.util import numpy_support
+from vtkmodules.vtkCommonCore import vtkPoints
+from vtkmodules.vtkCommonDataModel import (
+    vtkCellArray,
+    vtkImageData,
+    vtkPolyData
+)
+from vtkmodules.vtkFiltersPoints import (
+    vtkExtractSurface,
+    vtkSignedDistance
+)
+from PipelineTrace import Traced
+
+
+class SparseDistanceVolume(object):
+    """Signed distance on a dimension^3 grid, stored only near the points.
+
+    The grid is cut into blocks of blockSize voxels per axis. A block is
+    active when a point lies within radius of it, and only active blocks
+    are evaluated (with vtkSignedDistance over the points that can reach
+    them) and kept as float32 arrays of (blockSize + 1)^3 samples.
+    Neighboring blocks share their boundary sample plane, and surfaces are
+    extracted in grid index coordinates, so the vertices two blocks create
+    on their common plane are bit-identical and merge exactly.
+    """
+
+    def __init__(self, dimension, radius, bounds, blockSize=32, halo=None):
+        self.dimension = dimension
+        self.radius = radius
+        self.halo = radius if halo is None else max(halo, radius)
+        self.bounds = bounds
+        self.blockSize = blockSize
+        self.origin = np.array(bounds[0::2], dtype=np.float64)
+        self.spacing = (np.array(bounds[1::2], dtype=np.float64) - self.origin) / (dimension - 1)
+        self.numberOfBlocks = -(-(dimension - 1) // blockSize)
+        self.blocks = {}
+
+    def BlockExtent(self, key):
+        lo = np.array(key) * self.blockSize
+        hi = np.minimum(lo + self.blockSize, self.dimension - 1)
+        return lo, hi
+
+    def PointBlocks(self, points):
+        """Return (pointIds, blockIds) pairs of every point and block within halo."""
+        scale = self.spacing * self.blockSize
+        lo = np.floor((points - self.halo - self.origin) / scale).astype(np.int64)
+        hi = np.floor((points + self.halo - self.origin) / scale).astype(np.int64)
+        lo = np.clip(lo, 0, self.numberOfBlocks - 1)
+        hi = np.clip(hi, 0, self.numberOfBlocks - 1)
+        span = (hi - lo).max(axis=0) + 1
+
+        pointIds = []
+        blockIds = []
+        allIds = np.arange(len(points))
+        n = self.numberOfBlocks
+        for dx in range(span[0]):
+            for dy in range(span[1]):
+                for dz in range(span[2]):
+                    block = lo + (dx, dy, dz)
+                    inside = np.all(block <= hi, axis=1)
+                    pointIds.append(allIds[inside])
+                    block = block[inside]
+                    blockIds.append((block[:, 0] * n + block[:, 1]) * n + block[:, 2])
+        return np.concatenate(pointIds), np.concatenate(blockIds)
+
+    def ActiveBlocks(self, polyData):
+        """Yield (key, points, normals) of every block with points within halo."""
+        points = numpy_support.vtk_to_numpy(polyData.GetPoints().GetData())
+        normals = numpy_support.vtk_to_numpy(polyData.GetPointData().GetNormals())
+        pointIds, blockIds = self.PointBlocks(points)
+        order = np.argsort(blockIds, kind='stable')
+        pointIds = pointIds[order]
+        blockIds = blockIds[order]
+        active, starts = np.unique(blockIds, return_index=True)
+        ends = np.append(starts[1:], len(blockIds))
+
+        n = self.numberOfBlocks
+        for blockId, start, end in zip(active, starts, ends):
+            key = (int(blockId // (n * n)), int(blockId // n % n), int(blockId % n))
+            ids = pointIds[start:end]
+            yield key, points[ids], normals[ids]
+
+    def Compute(self, polyData):
+        for key, points, normals in self.ActiveBlocks(polyData):
+            self.blocks[key] = self.EvaluateBlock(key, points, normals)
+        return self
+
+    def EvaluateBlock(self, key, points, normals):
+        lo, hi = self.BlockExtent(key)
+        blockPoints = vtkPoints()
+        blockPoints.SetData(numpy_support.numpy_to_vtk(points, deep=1))
+        blockNormals = numpy_support.numpy_to_vtk(normals, deep=1)
+        blockNormals.SetName("Normals")
+        block = vtkPolyData()
+        block.SetPoints(blockPoints)
+        block.GetPointData().SetNormals(blockNormals)
+
+        low = self.origin + lo * self.spacing
+        high = self.origin + hi * self.spacing
+        distance = Traced(vtkSignedDistance())
+        distance.SetInputData(block)
+        distance.SetRadius(self.radius)
+        distance.SetDimensions(*(hi - lo + 1))
+        distance.SetBounds(low[0], high[0], low[1], high[1], low[2], high[2])
+        distance.Update()
+        scalars = distance.GetOutput().GetPointData().GetScalars()
+        return numpy_support.vtk_to_numpy(scalars).astype(np.float32)
+
+    def BlockImage(self, key):
+        """Wrap a stored block as vtkImageData in grid index coordinates."""
+        lo, hi = self.BlockExtent(key)
+        scalars = numpy_support.numpy_to_vtk(self.blocks[key])
+        scalars.SetName("SignedDistance")
+        image = vtkImageData()
+        image.SetDimensions(*(hi - lo + 1))
+        image.SetOrigin(*lo.astype(np.float64))
+        image.SetSpacing(1, 1, 1)
+        image.GetPointData().SetScalars(scalars)
+        return image
+
+    def ExtractBlock(self, key, radius):
+        """Return the (points, offsets, connectivity) of one block's surface."""
+        surface = Traced(vtkExtractSurface())
+        surface.SetInputData(self.BlockImage(key))
+        surface.SetRadius(radius * .99)
+        surface.Update()
+        return MeshArrays(surface.GetOutput())
+
+    def ExtractSurface(self, radius):
+        pieces = [self.ExtractBlock(key, radius) for key in sorted(self.blocks)]
+        return StitchSeams(pieces, self.origin, self.spacing)
+
+    def GetActualMemorySize(self):
+        return sum(block.nbytes for block in self.blocks.values()) // 1024
+
+
+def MeshArrays(polyData):
+    """Copy the polygons of polyData out as (points, offsets, connectivity)."""
+    polys = polyData.GetPolys()
+    if polys.GetNumberOfCells() == 0:
+        return None
+    points = numpy_support.vtk_to_numpy(polyData.GetPoints().GetData())
+    offsets = numpy_support.vtk_to_numpy(polys.GetOffsetsArray()).astype(np.int64)
+    connectivity = numpy_support.vtk_to_numpy(polys.GetConnectivityArray())
+    # vtkExtractSurface leaves unreferenced, uninitialized points behind #
+    used, connectivity = np.unique(connectivity, return_inverse=True)
+    return points[used], offsets, connectivity.reshape(-1).astype(np.int64)
+
+
+def StitchSeams(pieces, origin, spacing):
+    """Append meshes extracted in grid index coordinates into one world mesh.
+
+    Each piece is a (points, offsets, connectivity) tuple or None. Vertices
+    on shared block planes are bit-identical and merged exactly.
+    """
+    pieces = [piece for piece in pieces if piece is not None]
+    if not pieces:
+        return vtkPolyData()
+    points = []
+    connectivity = []
+    offsets = [np.zeros(1, dtype=np.int64)]
+    numberOfPoints = 0
+    for piecePoints, pieceOffsets, pieceConnectivity in pieces:
+        points.append(piecePoints)
+        connectivity.append(pieceConnectivity + numberOfPoints)
+        offsets.append(pieceOffsets[1:] + offsets[-1][-1])
+        numberOfPoints += len(piecePoints)
+    points = np.concatenate(points)
+    connectivity = np.concatenate(connectivity)
+    offsets = np.concatenate(offsets)
+
+    unique, inverse = np.unique(points, axis=0, return_inverse=True)
+    merged = (origin + unique * spacing).astype(np.float32)
+
+    polyData = vtkPolyData()
+    vtkpoints = vtkPoints()
+    vtkpoints.SetData(numpy_support.numpy_to_vtk(merged, deep=1))
+    polyData.SetPoints(vtkpoints)
+    polys = vtkCellArray()
+    polys.SetData(numpy_support.numpy_to_vtkIdTypeArray(offsets, deep=1),
+                  numpy_support.numpy_to_vtkIdTypeArray(inverse.reshape(-1)[connectivity], deep=1))
+    polyData.SetPolys(polys)
+    return polyData
+
+
+def NarrowBandSurface(polyData, dimension, radius, bounds, blockSize=32):
+    """Reconstruct the surface of an oriented cloud from a sparse distance volume."""
+    start = time.perf_counter()
+    volume = SparseDistanceVolume(dimension, radius, bounds, blockSize).Compute(polyData)
+    total = volume.numberOfBlocks ** 3
+    print("Narrow band: ", len(volume.blocks), " of ", total, " blocks active, ",
+          volume.GetActualMemorySize(), " KiB instead of ",
+          dimension ** 3 * 4 // 1024, " KiB dense, ",
+          "%.3f" % (time.perf_counter() - start), " s")
+    return volume.ExtractSurface(radius)
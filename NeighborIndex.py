@@ -0,0 +1,93 @@
+#!/usr/bin/env python
+# One spatial index per point cloud, shared by every stage that searches
+# the same points. vtkPCANormalEstimation, vtkSignedDistance and the
+# outlier filters each build a vtkStaticPointLocator of their input
+# unless given one; IndexFor hands them a single locator built once for
+# the points and reused for as long as those points are unchanged.
+import hashlib
+import time
+from collections import OrderedDict
+import numpy as np
+from vtkmodules.util import numpy_support
+from vtkmodules.vtkCommonDataModel import vtkStaticPointLocator
+from Pipelines import BuildOctree
+
+# Clouds whose index IndexFor keeps #
+INDEX_CACHE_SIZE = 4
+
+indices = OrderedDict()
+
+
+def PointsDigest(data):
+    points = numpy_support.vtk_to_numpy(data)
+    digest = hashlib.blake2b(digest_size=20)
+    digest.update(str((points.dtype.str, points.shape)).encode())
+    digest.update(np.ascontiguousarray(points).data)
+    return digest.digest()
+
+
+class NeighborIndex(object):
+    """A vtkStaticPointLocator over the points of polyData, plus its octrees.
+
+    The locator is built here and marked to keep its search structure, so
+    a filter that calls SetDataSet/BuildLocator on another data set with
+    the same points (the output of the normals stage, say) reuses it.
+    Octree() is built on first use and kept.
+    """
+
+    def __init__(self, polyData):
+        start = time.perf_counter()
+        self.points = polyData.GetPoints()
+        # Held so that the identity check of Covers sees the same wrapper #
+        self.data = self.points.GetData()
+        self.mtime = self.data.GetMTime()
+        self.digest = PointsDigest(self.data)
+        self.locator = vtkStaticPointLocator()
+        self.locator.SetDataSet(polyData)
+        self.locator.BuildLocator()
+        self.locator.UseExistingSearchStructureOn()
+        self.buildSeconds = time.perf_counter() - start
+        self.octrees = {}
+
+    def Covers(self, polyData):
+        """True if polyData holds the indexed points, unmodified.
+
+        Filters that only read the points still bump the MTime of the
+        array (vtkPCANormalEstimation does), so a newer MTime only
+        triggers a comparison of the content.
+        """
+        points = polyData.GetPoints()
+        if points is None or points.GetData() is not self.data:
+            return False
+        if self.data.GetMTime() != self.mtime:
+            if PointsDigest(self.data) != self.digest:
+                return False
+            self.mtime = self.data.GetMTime()
+        return True
+
+    def Locator(self, polyData):
+        """The shared locator for polyData, or None to let the filter build its own."""
+        return self.locator if self.Covers(polyData) else None
+
+    def Octree(self, maxPointsPerRegion=5):
+        """The vtkOctreePointLocator of the points, built once per region size."""
+        if maxPointsPerRegion not in self.octrees:
+            self.octrees[maxPointsPerRegion] = BuildOctree(self.locator.GetDataSet(),
+                                                           maxPointsPerRegion)
+        return self.octrees[maxPointsPerRegion]
+
+
+def IndexFor(polyData):
+    """The NeighborIndex of the points of polyData, built on the first request."""
+    for key, index in list(indices.items()):
+        if index.Covers(polyData):
+            indices.move_to_end(key)
+            return index
+        if polyData.GetPoints() is not None and polyData.GetPoints().GetData() is index.data:
+            # The points were modified in place #
+            del indices[key]
+    index = NeighborIndex(polyData)
+    indices[id(index)] = index
+    while len(indices) > INDEX_CACHE_SIZE:
+        indices.popitem(last=False)
+    return index
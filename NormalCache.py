@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+import hashlib
+import os
+import tempfile
+import time
+from pathlib import Path
+import numpy as np
+from vtkmodules.util import numpy_support
+from vtkmodules.vtkCommonDataModel import vtkPolyData
+from Pipelines import EstimateNormals
+
+# Override the location with PCFT_NORMAL_CACHE, the size with PCFT_NORMAL_CACHE_BYTES #
+DEFAULT_CACHE_DIR = Path(os.environ.get('XDG_CACHE_HOME', Path.home() / '.cache')) / 'pcft' / 'normals'
+DEFAULT_CACHE_BYTES = 1024 * 1024 * 1024
+
+
+def NormalCacheDir():
+    return Path(os.environ.get('PCFT_NORMAL_CACHE', DEFAULT_CACHE_DIR))
+
+
+def NormalCacheBytes():
+    return int(os.environ.get('PCFT_NORMAL_CACHE_BYTES', DEFAULT_CACHE_BYTES))
+
+
+def NormalKey(polyData, sampleSize, orientation, flip):
+    """Hash of the point coordinates and every parameter that affects the normals."""
+    points = numpy_support.vtk_to_numpy(polyData.GetPoints().GetData())
+    digest = hashlib.blake2b(digest_size=20)
+    digest.update(str((points.dtype.str, points.shape, int(sampleSize),
+                       orientation, bool(flip))).encode())
+    digest.update(np.ascontiguousarray(points).data)
+    return digest.hexdigest()
+
+
+def WithNormals(polyData, normals):
+    oriented = vtkPolyData()
+    oriented.ShallowCopy(polyData)
+    array = numpy_support.numpy_to_vtk(normals, deep=1)
+    array.SetName("Normals")
+    oriented.GetPointData().SetNormals(array)
+    return oriented
+
+
+def CachedNormals(polyData, sampleSize, orientation='GraphTraversal', flip=True, locator=None):
+    """EstimateNormals, memoized on disk by the content of the points.
+
+    Hits refresh the file's modification time, and the least recently used
+    files are removed once the directory holds more than
+    PCFT_NORMAL_CACHE_BYTES.
+    """
+    cacheDir = NormalCacheDir()
+    path = cacheDir / (NormalKey(polyData, sampleSize, orientation, flip) + '.npy')
+    try:
+        normals = np.load(path)
+    except (OSError, ValueError):
+        normals = None
+    if normals is not None and len(normals) == polyData.GetNumberOfPoints():
+        print("Using cached normals ", path.name)
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return WithNormals(polyData, normals)
+
+    start = time.perf_counter()
+    oriented = EstimateNormals(polyData, sampleSize, orientation, flip, locator)
+    print("Estimated normals in ", "%.3f" % (time.perf_counter() - start), " s")
+    normals = numpy_support.vtk_to_numpy(oriented.GetPointData().GetNormals())
+    maxBytes = NormalCacheBytes()
+    if normals.size * 4 > maxBytes:
+        return oriented
+    try:
+        cacheDir.mkdir(parents=True, exist_ok=True)
+        # Not .npy until renamed, so that EvictNormals never sees a partial file #
+        fd, tmp = tempfile.mkstemp(suffix='.tmp', dir=cacheDir)
+        with os.fdopen(fd, 'wb') as f:
+            np.save(f, normals.astype('<f4', copy=False))
+        os.replace(tmp, path)
+        EvictNormals(cacheDir, maxBytes)
+    except OSError as e:
+        print(f'Could not cache normals in {cacheDir}: {e}')
+    return oriented
+
+
+def EvictNormals(cacheDir, maxBytes):
+    """Remove the least recently used .npy files until cacheDir holds at most maxBytes."""
+    files = []
+    for path in cacheDir.glob('*.npy'):
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            continue
+        files.append((stat.st_mtime_ns, stat.st_size, path))
+    total = sum(size for _, size, _ in files)
+    for _, size, path in sorted(files):
+        if total <= maxBytes:
+            break
+        path.unlink(missing_ok=True)
+        total -= size
+        print("Evicted normals ", path.name, " (", "%.1f" % (size / 2 ** 20), " MiB)")
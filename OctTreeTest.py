@@ -1,51 +1,40 @@
 
 #!/usr/bin/env python
+import threading
+import time
+from collections import OrderedDict
 # noinspection PyUnresolvedReferences
-import numpy as np
-from pathlib import Path
-import vtk
 import vtkmodules.vtkInteractionStyle
 # noinspection PyUnresolvedReferences
 import vtkmodules.vtkRenderingOpenGL2
 from vtkmodules.vtkCommonColor import vtkNamedColors
-from vtkmodules.vtkIOXML import vtkXMLPolyDataReader
-from vtkmodules.vtkFiltersGeneral import vtkVertexGlyphFilter
-from vtkmodules.vtkInteractionStyle import vtkInteractorStyleTrackballCamera
-from vtkmodules.vtkCommonDataModel import (
-    vtkCellArray,
-    vtkPolyData,
-    vtkPolyLine
-)
-from vtkmodules.vtkFiltersCore import (
-    vtkCleanPolyData,
-    vtkElevationFilter,
-    vtkGlyph3D,
-    vtkMaskPoints,
-    vtkPolyDataNormals,
-    vtkTriangleFilter
+from vtkmodules.vtkCommonCore import vtkMath
+from vtkmodules.vtkInteractionWidgets import (
+    vtkSliderRepresentation2D,
+    vtkSliderWidget
 )
 from vtkmodules.vtkRenderingCore import (
     vtkActor,
-    vtkActor2D,
-    vtkCamera,
-    vtkDataSetMapper,
-    vtkGlyph3DMapper,
-    vtkProperty,
     vtkPolyDataMapper,
     vtkRenderWindow,
     vtkRenderWindowInteractor,
     vtkRenderer
 )
-from vtkmodules.vtkIOGeometry import (
-     vtkBYUReader,
-     vtkOBJReader,
-     vtkSTLReader
+from PointCloudIO import ReadPolyData
+from Pipelines import (
+    ExtractSurface,
+    NormalSampleSize,
+    OctreeRepresentation,
+    PaddedBounds,
+    SignedDistance,
+    SurfaceRadius
 )
-from vtkmodules.vtkIOLegacy import vtkPolyDataReader
-from vtkmodules.vtkIOPLY import vtkPLYReader
-from vtkmodules.vtkIOXML import vtkXMLPolyDataReader
-from vtkmodules.vtkFiltersSources import vtkSphereSource
-from vtkmodules.vtkFiltersSources import vtkArrowSource
+from NeighborIndex import IndexFor
+from NormalCache import CachedNormals
+from OctreeCache import CachedOctree
+from TiledSurface import TiledSurface
+from VoxelGrid import GridVoxelSize, VoxelDownsample
+from OutlierRemoval import OUTLIER_MODES, RemoveOutliers
 
 def get_program_parameters():
     import argparse
@@ -53,68 +42,96 @@ def get_program_parameters():
     epilogue = ''''''
     parser = argparse.ArgumentParser(description=description, epilog=epilogue,
                                      formatter_class=argparse.RawDescriptionHelpFormatter)
-    parser.add_argument('filename', help='ism_test_cat.vtp.')
+    parser.add_argument('filename', nargs='?', default='./res/ism_test_wolf.vtp',
+                        help='ism_test_cat.vtp.')
+    parser.add_argument('--tiled', action='store_true',
+                        help='reconstruct the surface tile by tile in worker processes')
+    parser.add_argument('--tile-size', type=int, default=64,
+                        help='voxels per axis of a tile')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='number of worker processes (default: CPU count)')
+    parser.add_argument('--octree-cache', action='store_true',
+                        help='save the built octree next to the input and reload it next time')
+    parser.add_argument('--outliers', choices=OUTLIER_MODES, default=None,
+                        help='remove stray points first: sigma of mean k-NN distance, or neighbors within a radius')
+    parser.add_argument('--outlier-sigma', type=float, default=3.0,
+                        help='standard deviations kept by --outliers statistical')
+    parser.add_argument('--outlier-radius', type=float, default=None,
+                        help='radius of --outliers radius (default: twice the sampled 4-NN spacing)')
+    parser.add_argument('--voxel-factor', type=float, default=None,
+                        help='reconstruct from voxel centroids, voxels this many grid spacings wide')
     args = parser.parse_args()
-    return args.filename
-
+    return args
+
+
+class OctreeLevelCache(object):
+    """Octree level representations, generated ahead of time in a thread.
+
+    generate(level) builds the vtkPolyData of one level. Start() fills the
+    cache for every level in the background; Get() returns a cached level
+    or builds it on the spot. Least recently used levels are dropped once
+    their summed GetActualMemorySize() exceeds maxBytes.
+    """
+
+    def __init__(self, generate, numberOfLevels, maxBytes=256 * 1024 * 1024):
+        self.generate = generate
+        self.numberOfLevels = numberOfLevels
+        self.maxBytes = maxBytes
+        self.levels = OrderedDict()
+        self.totalBytes = 0
+        self.lock = threading.Lock()
+        self.thread = None
+
+    def Start(self):
+        self.thread = threading.Thread(target=self.GenerateAll, daemon=True)
+        self.thread.start()
+
+    def GenerateAll(self):
+        start = time.perf_counter()
+        for level in range(self.numberOfLevels):
+            self.Get(level)
+        print("Generated ", self.numberOfLevels, " octree levels in ",
+              "%.3f" % (time.perf_counter() - start), " s")
+
+    def Get(self, level):
+        # The locator is not thread safe, so generation is serialized #
+        with self.lock:
+            polyData = self.levels.get(level)
+            if polyData is not None:
+                self.levels.move_to_end(level)
+                return polyData
+            polyData = self.generate(level)
+            nbytes = polyData.GetActualMemorySize() * 1024
+            self.levels[level] = polyData
+            self.totalBytes += nbytes
+            while self.totalBytes > self.maxBytes and len(self.levels) > 1:
+                _, evicted = self.levels.popitem(last=False)
+                self.totalBytes -= evicted.GetActualMemorySize() * 1024
+            return polyData
 
-def ReadPolyData(file_name):
-    valid_suffixes = ['.g', '.obj', '.stl', '.ply', '.vtk', '.vtp']
-    path = Path(file_name)
-    if path.suffix:
-        ext = path.suffix.lower()
-    if path.suffix not in valid_suffixes:
-        print(f'No reader for this file suffix: {ext}')
-        return None
-    else:
-        if ext == ".ply":
-            reader = vtkPLYReader()
-            reader.SetFileName(file_name)
-            reader.Update()
-            poly_data = reader.GetOutput()
-        elif ext == ".vtp":
-            reader = vtkXMLPolyDataReader()
-            reader.SetFileName(file_name)
-            reader.Update()
-            poly_data = reader.GetOutput()
-        elif ext == ".obj":
-            reader = vtkOBJReader()
-            reader.SetFileName(file_name)
-            reader.Update()
-            poly_data = reader.GetOutput()
-        elif ext == ".stl":
-            reader = vtkSTLReader()
-            reader.SetFileName(file_name)
-            reader.Update()
-            poly_data = reader.GetOutput()
-        elif ext == ".vtk":
-            reader = vtkPolyDataReader()
-            reader.SetFileName(file_name)
-            reader.Update()
-            poly_data = reader.GetOutput()
-        elif ext == ".g":
-            reader = vtkBYUReader()
-            reader.SetGeometryFileName(file_name)
-            reader.Update()
-            poly_data = reader.GetOutput()
-
-        return poly_data
 
 class SliderObserver(object):
-    def __init__(self, Octree, polyData, renderer):
-        self.Octree = Octree
+    def __init__(self, levels, mapper, renderer):
+        self.levels = levels
         self.level = 0
-        self.polyData = polyData
+        self.mapper = mapper
         self.renderer = renderer
 
     def __call__(self, caller, event):
-        self.level = vtk.vtkMath.Round(caller.GetRepresentation().GetValue())
-        self.Octree.GenerateRepresentation(self.level, self.polyData)
-        self.renderer.Render()
-
-
-def OctreeVisualize(polyData):
-    colors = vtk.vtkNamedColors()
+        start = time.perf_counter()
+        level = vtkMath.Round(caller.GetRepresentation().GetValue())
+        if level == self.level:
+            return
+        self.level = level
+        self.mapper.SetInputData(self.levels.Get(self.level))
+        self.renderer.GetRenderWindow().Render()
+        print("Level ", self.level, ": ", "%.1f" % ((time.perf_counter() - start) * 1000),
+              " ms from event to frame")
+
+
+def OctreeVisualize(polyData, tiled=False, tileSize=64, workers=None, octreeFile=None,
+                    voxelFactor=None):
+    colors = vtkNamedColors()
     bounds = polyData.GetBounds()
     print( "# of points: ", polyData.GetNumberOfPoints())
 
@@ -122,70 +139,66 @@ def OctreeVisualize(polyData):
     for i in range(3):
       drange[i] = bounds[2 * i + 1] - bounds[2 * i]
 
-    sampleSize = polyData.GetNumberOfPoints() * 0.00005
-    if (sampleSize < 10):
-        sampleSize = 10
+    dimension = 256
+    # The surface is reconstructed from the cloud, the octree built on all points #
+    cloud = polyData
+    if voxelFactor:
+        cloud = VoxelDownsample(polyData, GridVoxelSize(bounds, dimension, voxelFactor))
+
+    sampleSize = NormalSampleSize(cloud)
     print("Sample size is: ", sampleSize)
       # Do we need to estimate normals?
-    distance = vtk.vtkSignedDistance()
-    if (polyData.GetPointData().GetNormals()):
+    if (cloud.GetPointData().GetNormals()):
         print("Using normals from input file")
-        distance.SetInputData(polyData)
+        oriented = cloud
     else:
         print("Estimating normals using PCANormalEstimation")
-        normals = vtk.vtkPCANormalEstimation()
-        normals.SetInputData(polyData)
-        normals.SetSampleSize(sampleSize)
-        normals.SetNormalOrientationToGraphTraversal()
-        normals.FlipNormalsOn()
-        distance.SetInputConnection(normals.GetOutputPort())
+        oriented = CachedNormals(cloud, sampleSize, locator=IndexFor(cloud).locator)
 
     print("Range: ", drange[0], ", ", drange[1], ", ", drange[2])
-    dimension = 256
-    radius = max(max(drange[0], drange[1]), drange[2]) /dimension * 4 # ~4 voxels
+    radius = SurfaceRadius(bounds, dimension)
     print("Radius: ",radius)
 
-    distance.SetRadius(radius)
-    distance.SetDimensions(dimension, dimension, dimension)
-    distance.SetBounds(bounds[0] - drange[0] * .1, bounds[1] + drange[0] * .1,
-                      bounds[2] - drange[1] * .1, bounds[3] + drange[1] * .1,
-                      bounds[4] - drange[2] * .1, bounds[5] + drange[2] * .1)
-
-    surface = vtk.vtkExtractSurface()
-    surface.SetInputConnection(distance.GetOutputPort())
-    surface.SetRadius(radius * .99)
-    surface.Update()
+    if tiled:
+        surface = TiledSurface(oriented, dimension, radius, PaddedBounds(bounds),
+                               tileSize, workers=workers)
+    else:
+        distance = SignedDistance(oriented, dimension, radius, PaddedBounds(bounds),
+                                  IndexFor(oriented).locator)
+        surface = ExtractSurface(distance, radius)
 
-    plyMapper = vtk.vtkPolyDataMapper()
-    plyMapper.SetInputConnection(surface.GetOutputPort())
-    plyActor = vtk.vtkActor()
+    plyMapper = vtkPolyDataMapper()
+    plyMapper.SetInputData(surface)
+    plyActor = vtkActor()
     plyActor.SetMapper(plyMapper)
     plyActor.GetProperty().SetInterpolationToFlat()
     plyActor.GetProperty().SetRepresentationToPoints()
     plyActor.GetProperty().SetColor(colors.GetColor3d("Yellow"))
 
-    octree = vtk.vtkOctreePointLocator()
-    octree.SetMaximumPointsPerRegion(5)
-    octree.SetDataSet(polyData)
-    octree.BuildLocator()
+    if octreeFile:
+        octree = CachedOctree(polyData, octreeFile, 5)
+    else:
+        octree = IndexFor(polyData).Octree(5)
 
-    polydata = vtk.vtkPolyData()
-    octree.GenerateRepresentation(0, polydata)
+    levels = OctreeLevelCache(lambda level: OctreeRepresentation(octree, level),
+                              octree.GetLevel() + 1)
+    polydata = levels.Get(0)
+    levels.Start()
 
-    octreeMapper = vtk.vtkPolyDataMapper()
+    octreeMapper = vtkPolyDataMapper()
     octreeMapper.SetInputData(polydata)
 
-    octreeActor = vtk.vtkActor()
+    octreeActor = vtkActor()
     octreeActor.SetMapper(octreeMapper)
     octreeActor.GetProperty().SetInterpolationToFlat()
     octreeActor.GetProperty().SetRepresentationToWireframe()
     octreeActor.GetProperty().SetColor(colors.GetColor3d("SpringGreen"))
 
-    renderer = vtk.vtkRenderer()
-    renderWindow = vtk.vtkRenderWindow()
+    renderer = vtkRenderer()
+    renderWindow = vtkRenderWindow()
     renderWindow.AddRenderer(renderer)
 
-    renderWindowInteractor = vtk.vtkRenderWindowInteractor()
+    renderWindowInteractor = vtkRenderWindowInteractor()
     renderWindowInteractor.SetRenderWindow(renderWindow)
 
     renderer.AddActor(plyActor)
@@ -196,7 +209,7 @@ def OctreeVisualize(polyData):
     renderWindow.SetSize(600, 600)
     renderWindow.Render()
 
-    sliderRep = vtk.vtkSliderRepresentation2D()
+    sliderRep = vtkSliderRepresentation2D()
     sliderRep.SetMinimumValue(0)
     sliderRep.SetMaximumValue(octree.GetLevel())
     sliderRep.SetValue(0)
@@ -213,16 +226,13 @@ def OctreeVisualize(polyData):
     sliderRep.GetSliderProperty().SetColor(colors.GetColor3d("LightBlue"))
     sliderRep.GetSelectedProperty().SetColor(colors.GetColor3d("Violet"))
 
-    sliderWidget = vtk.vtkSliderWidget()
+    sliderWidget = vtkSliderWidget()
     sliderWidget.SetInteractor(renderWindowInteractor)
     sliderWidget.SetRepresentation(sliderRep)
     sliderWidget.SetAnimationModeToAnimate()
     sliderWidget.EnabledOn()
 
-    callback = SliderObserver(octree, polydata, renderer)
-    callback.Octree = octree
-    callback.PolyData = polydata
-    callback.Renderer = renderer
+    callback = SliderObserver(levels, octreeMapper, renderer)
 
     sliderWidget.AddObserver('InteractionEvent', callback)
 
@@ -233,7 +243,10 @@ def OctreeVisualize(polyData):
 
 
 if __name__ == '__main__':
-    #filename = get_program_parameters()
-    filename ="./res/ism_test_wolf.vtp"
-    polyData = ReadPolyData(filename)
-    OctreeVisualize(polyData)
+    args = get_program_parameters()
+    polyData = ReadPolyData(args.filename)
+    if args.outliers:
+        polyData = RemoveOutliers(polyData, args.outliers, stdDevFactor=args.outlier_sigma,
+                                  radius=args.outlier_radius)
+    OctreeVisualize(polyData, args.tiled, args.tile_size, args.workers,
+                    args.filename if args.octree_cache else None, args.voxel_factor)
@@ -0,0 +1,222 @@
+#!/usr/bin/env python
+import json
+import os
+import shutil
+import tempfile
+from pathlib import Path
+import numpy as np
+from vtkmodules.util import numpy_support
+from vtkmodules.vtkCommonCore import vtkPoints
+from vtkmodules.vtkCommonDataModel import vtkCellArray
+from Pipelines import BuildOctree
+
+OCTREE_EXTENSION = '.octree'
+OCTREE_VERSION = 1
+
+# Corner order and quad faces of an axis-aligned box #
+BOX_CORNERS = np.array([[0, 0, 0], [1, 0, 0], [1, 1, 0], [0, 1, 0],
+                        [0, 0, 1], [1, 0, 1], [1, 1, 1], [0, 1, 1]])
+BOX_FACES = np.array([[0, 3, 2, 1], [4, 5, 6, 7], [0, 1, 5, 4],
+                      [1, 2, 6, 5], [2, 3, 7, 6], [3, 0, 4, 7]])
+
+
+def OctreePath(file_name, maxPointsPerRegion):
+    path = Path(file_name)
+    return path.with_name(f'{path.name}.{maxPointsPerRegion}{OCTREE_EXTENSION}')
+
+
+def SaveOctree(octree, path, source=None):
+    """Write the leaves of a built vtkOctreePointLocator as flat .npy arrays.
+
+    regions.npy holds the region bounds, data_bounds.npy the bounds of the
+    points inside each leaf, permutation.npy the point ids grouped by leaf
+    with offsets.npy delimiting them, and levels.npy the depth of each
+    leaf. Interior nodes follow from the leaves since octants always split
+    at their center.
+    """
+    path = Path(path)
+    numberOfLeaves = octree.GetNumberOfLeafNodes()
+    regions = np.empty((numberOfLeaves, 6))
+    dataBounds = np.empty((numberOfLeaves, 6))
+    ids = []
+    bounds = [0.0] * 6
+    for leaf in range(numberOfLeaves):
+        octree.GetRegionBounds(leaf, bounds)
+        regions[leaf] = bounds
+        octree.GetRegionDataBounds(leaf, bounds)
+        dataBounds[leaf] = bounds
+        ids.append(numpy_support.vtk_to_numpy(octree.GetPointsInRegion(leaf)).astype(np.int64))
+    offsets = np.zeros(numberOfLeaves + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(leafIds) for leafIds in ids])
+
+    root = np.empty(6)
+    root[0::2] = regions[:, 0::2].min(axis=0)
+    root[1::2] = regions[:, 1::2].max(axis=0)
+    # Octants halve every axis; the longest one is never flat #
+    axis = int(np.argmax(root[1::2] - root[0::2]))
+    extent = (regions[:, 2 * axis + 1] - regions[:, 2 * axis]) / (root[2 * axis + 1] - root[2 * axis])
+    levels = np.rint(-np.log2(extent)).astype(np.int64)
+
+    tmp = Path(tempfile.mkdtemp(prefix=path.name + '.', dir=path.parent))
+    try:
+        np.save(tmp / 'regions.npy', regions.astype('<f8'))
+        np.save(tmp / 'data_bounds.npy', dataBounds.astype('<f8'))
+        np.save(tmp / 'permutation.npy', np.concatenate(ids).astype('<i8'))
+        np.save(tmp / 'offsets.npy', offsets.astype('<i8'))
+        np.save(tmp / 'levels.npy', levels.astype('<i8'))
+        meta = {
+            "version": OCTREE_VERSION,
+            "root": root.tolist(),
+            "level": octree.GetLevel(),
+            "max_points_per_region": octree.GetMaximumPointsPerRegion(),
+            "number_of_points": octree.GetDataSet().GetNumberOfPoints(),
+        }
+        if source is not None:
+            stat = Path(source).stat()
+            meta["source_mtime_ns"] = stat.st_mtime_ns
+            meta["source_size"] = stat.st_size
+        with open(tmp / 'meta.json', 'w') as f:
+            json.dump(meta, f)
+        if path.exists():
+            shutil.rmtree(path, ignore_errors=True)
+        os.replace(tmp, path)
+    except OSError:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+
+
+class LoadedOctree(object):
+    """Read-only octree over memory-mapped leaf arrays.
+
+    Offers the query and representation methods of vtkOctreePointLocator
+    that the scripts use, without calling BuildLocator.
+    """
+
+    def __init__(self, path, polyData):
+        path = Path(path)
+        with open(path / 'meta.json') as f:
+            self.meta = json.load(f)
+        self.regions = np.load(path / 'regions.npy', mmap_mode='r')
+        self.dataBounds = np.load(path / 'data_bounds.npy', mmap_mode='r')
+        self.permutation = np.load(path / 'permutation.npy', mmap_mode='r')
+        self.offsets = np.load(path / 'offsets.npy', mmap_mode='r')
+        self.levels = np.load(path / 'levels.npy', mmap_mode='r')
+        self.root = np.array(self.meta["root"])
+        self.dataSet = polyData
+        self.points = numpy_support.vtk_to_numpy(polyData.GetPoints().GetData())
+
+    def GetDataSet(self):
+        return self.dataSet
+
+    def GetLevel(self):
+        return self.meta["level"]
+
+    def GetMaximumPointsPerRegion(self):
+        return self.meta["max_points_per_region"]
+
+    def GetNumberOfLeafNodes(self):
+        return len(self.regions)
+
+    def GetRegionBounds(self, leaf, bounds=None):
+        if bounds is not None:
+            bounds[:] = self.regions[leaf]
+        return tuple(self.regions[leaf])
+
+    def GetPointsInRegion(self, leaf):
+        return self.permutation[self.offsets[leaf]:self.offsets[leaf + 1]]
+
+    def GetRegionContainingPoint(self, x, y, z):
+        regions = self.regions
+        inside = ((regions[:, 0] <= x) & (x <= regions[:, 1]) &
+                  (regions[:, 2] <= y) & (y <= regions[:, 3]) &
+                  (regions[:, 4] <= z) & (z <= regions[:, 5]))
+        leaves = np.flatnonzero(inside)
+        return int(leaves[0]) if len(leaves) else -1
+
+    def BoxDistance2(self, x):
+        bounds = self.dataBounds
+        d = np.maximum(np.maximum(bounds[:, 0::2] - x, x - bounds[:, 1::2]), 0)
+        return (d * d).sum(axis=1)
+
+    def RegionPoints(self, leaves):
+        if len(leaves) == 0:
+            return np.empty(0, dtype=np.int64)
+        return np.concatenate([self.GetPointsInRegion(leaf) for leaf in leaves])
+
+    def FindPointsWithinRadius(self, radius, x, result=None):
+        x = np.asarray(x, dtype=np.float64)
+        ids = self.RegionPoints(np.flatnonzero(self.BoxDistance2(x) <= radius * radius))
+        d2 = ((self.points[ids] - x) ** 2).sum(axis=1)
+        ids = ids[d2 <= radius * radius]
+        if result is not None:
+            result.Reset()
+            for pointId in ids:
+                result.InsertNextId(int(pointId))
+        return ids
+
+    def FindClosestPoint(self, x):
+        x = np.asarray(x, dtype=np.float64)
+        boxDistance2 = self.BoxDistance2(x)
+        order = np.argsort(boxDistance2)
+        best, bestDistance2 = -1, np.inf
+        for leaf in order:
+            if boxDistance2[leaf] > bestDistance2:
+                break
+            ids = self.GetPointsInRegion(leaf)
+            if len(ids) == 0:
+                continue
+            d2 = ((self.points[ids] - x) ** 2).sum(axis=1)
+            nearest = np.argmin(d2)
+            if d2[nearest] < bestDistance2:
+                best, bestDistance2 = int(ids[nearest]), d2[nearest]
+        return best
+
+    def GenerateRepresentation(self, level, polyData):
+        """Fill polyData with the boxes of every octant at level, like VTK does."""
+        size = (self.root[1::2] - self.root[0::2]) / 2 ** level
+        deep = self.levels >= level
+        centers = (self.regions[deep][:, 0::2] + self.regions[deep][:, 1::2]) / 2
+        cells = np.unique(np.floor((centers - self.root[0::2]) / size).astype(np.int64), axis=0)
+
+        corners = self.root[0::2] + (cells[:, None, :] + BOX_CORNERS) * size
+        points = vtkPoints()
+        points.SetData(numpy_support.numpy_to_vtk(corners.reshape(-1, 3).astype(np.float32), deep=1))
+        faces = (np.arange(len(cells))[:, None, None] * 8 + BOX_FACES).reshape(-1)
+        polys = vtkCellArray()
+        polys.SetData(4, numpy_support.numpy_to_vtkIdTypeArray(faces.astype(np.int64), deep=1))
+        polyData.Initialize()
+        polyData.SetPoints(points)
+        polyData.SetPolys(polys)
+
+
+def ReadOctree(path, polyData, source=None):
+    """Open a saved octree if it is current for polyData (and source), else None."""
+    try:
+        octree = LoadedOctree(path, polyData)
+    except (OSError, ValueError, KeyError):
+        return None
+    meta = octree.meta
+    if (meta.get("version") != OCTREE_VERSION
+            or meta.get("number_of_points") != polyData.GetNumberOfPoints()):
+        return None
+    if source is not None:
+        stat = Path(source).stat()
+        if (meta.get("source_mtime_ns") != stat.st_mtime_ns
+                or meta.get("source_size") != stat.st_size):
+            return None
+    return octree
+
+
+def CachedOctree(polyData, file_name, maxPointsPerRegion=5):
+    """Reload the octree saved next to file_name, or build and save it."""
+    path = OctreePath(file_name, maxPointsPerRegion)
+    octree = ReadOctree(path, polyData, file_name)
+    if octree is not None:
+        print("Using saved octree ", path)
+        return octree
+    octree = BuildOctree(polyData, maxPointsPerRegion)
+    try:
+        SaveOctree(octree, path, file_name)
+    except OSError as e:
+        print(f'Could not save octree to {path}: {e}')
+    return octree
@@ -0,0 +1,293 @@
+#!/usr/bin/env python
+# Unattended turntable renders of the pipelines. The scene is computed
+# once, written to raw .vtp layers and loaded by every worker process,
+# which renders its share of the frames into an offscreen window and
+# saves them as PNG. ffmpeg, when installed, joins the frames into an mp4.
+import glob
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+# noinspection PyUnresolvedReferences
+import vtkmodules.vtkRenderingOpenGL2
+from vtkmodules.vtkCommonColor import vtkNamedColors
+from vtkmodules.vtkIOImage import vtkPNGWriter
+from vtkmodules.vtkIOXML import (
+    vtkXMLPolyDataReader,
+    vtkXMLPolyDataWriter
+)
+from vtkmodules.vtkRenderingCore import (
+    vtkActor,
+    vtkCamera,
+    vtkPolyDataMapper,
+    vtkRenderWindow,
+    vtkRenderer,
+    vtkWindowToImageFilter
+)
+from PointCloudIO import ReadPolyData
+from PointDisplay import MarkerActor
+from Pipelines import (
+    DataRange,
+    Densify,
+    Elevation,
+    ExtractSurface,
+    NormalSampleSize,
+    OctreeRepresentation,
+    PaddedBounds,
+    SamplePoints,
+    SignedDistance,
+    SurfaceRadius,
+    Triangulate
+)
+from NeighborIndex import IndexFor
+from NormalCache import CachedNormals
+from PipelineTrace import StartTrace
+
+PIPELINES = ['elevation', 'densify', 'extract-surface', 'octree', 'sample', 'triangulate']
+# The inputs of the README demo videos #
+DEMO_FILES = {
+    'elevation': ['cat', 'horse', 'lioness', 'michael', 'wolf'],
+    'densify': ['cat', 'horse', 'lioness', 'michael', 'wolf'],
+    'extract-surface': ['cat', 'horse', 'lioness', 'michael', 'wolf'],
+    'octree': ['cat', 'horse', 'lioness', 'michael', 'wolf'],
+    'sample': ['Torso'],
+    'triangulate': ['Torso'],
+}
+DEFAULT_FRAMES = 120
+DEFAULT_SIZE = (640, 480)
+FRAME_PATTERN = 'frame_%04d.png'
+
+# The scene of a worker process, set by LoadScene #
+renderWindow = None
+startCamera = None
+
+
+def DemoFile(name, resDir='./res'):
+    return os.path.join(resDir, name + '.vtp' if name == 'Torso' else f'ism_test_{name}.vtp')
+
+
+def Layer(polyData, kind, color, radius=0.0, scalars=False):
+    """One actor of a scene: kind is surface, wireframe, points or markers."""
+    return {"polyData": polyData, "kind": kind, "color": color, "radius": radius,
+            "scalars": scalars}
+
+
+def Scene(pipeline, polyData, dimension=256):
+    """Run pipeline headlessly on polyData; returns (layers, background) as the script shows them."""
+    maxRange = max(DataRange(polyData.GetBounds()))
+    if pipeline == 'elevation':
+        return [Layer(Elevation(polyData), 'points', 'White', scalars=True)], 'Black'
+    if pipeline == 'densify':
+        densified = Densify(polyData, maxRange * .03)
+        radius = maxRange * .01
+        return [Layer(polyData, 'markers', 'Banana', radius),
+                Layer(densified, 'markers', 'Tomato', radius * .75)], 'SlateGray'
+    if pipeline == 'sample':
+        sample = SamplePoints(polyData, DataRange(polyData.GetBounds())[0] / 50)
+        radius = DataRange(polyData.GetBounds())[0] * 0.01
+        return [Layer(polyData, 'markers', 'Banana', radius),
+                Layer(sample, 'markers', 'Tomato', radius * .75)], 'SteelBlue'
+    if pipeline == 'triangulate':
+        return [Layer(Triangulate(polyData), 'surface', 'MistyRose')], 'DarkSlateGray'
+
+    bounds = polyData.GetBounds()
+    oriented = polyData
+    if not polyData.GetPointData().GetNormals():
+        oriented = CachedNormals(polyData, NormalSampleSize(polyData),
+                                 locator=IndexFor(polyData).locator)
+    radius = SurfaceRadius(bounds, dimension)
+    surface = ExtractSurface(SignedDistance(oriented, dimension, radius, PaddedBounds(bounds),
+                                            IndexFor(oriented).locator), radius)
+    if pipeline == 'extract-surface':
+        return [Layer(surface, 'surface', 'Tomato')], 'SlateGray'
+    octree = IndexFor(polyData).Octree(5)
+    return [Layer(surface, 'points', 'Yellow'),
+            Layer(OctreeRepresentation(octree, min(4, octree.GetLevel())), 'wireframe',
+                  'SpringGreen')], 'MidnightBlue'
+
+
+def LayerActor(layer, colors):
+    color = colors.GetColor3d(layer["color"])
+    if layer["kind"] == 'markers':
+        return MarkerActor(layer["polyData"], layer["radius"], color)
+    mapper = vtkPolyDataMapper()
+    mapper.SetInputData(layer["polyData"])
+    mapper.SetScalarVisibility(layer["scalars"])
+    actor = vtkActor()
+    actor.SetMapper(mapper)
+    actor.GetProperty().SetColor(color)
+    if layer["kind"] == 'wireframe':
+        actor.GetProperty().SetRepresentationToWireframe()
+    elif layer["kind"] == 'points':
+        actor.GetProperty().SetRepresentationToPoints()
+        actor.GetProperty().SetPointSize(2)
+    return actor
+
+
+def SoftwareGLFallback():
+    """Select the Mesa software rasterizer on Linux without a display or GPU.
+
+    Mesa reads LIBGL_ALWAYS_SOFTWARE when the first context is created, so
+    this runs in each worker before its window. A value set by the caller
+    is left alone.
+    """
+    if not sys.platform.startswith('linux') or 'LIBGL_ALWAYS_SOFTWARE' in os.environ:
+        return False
+    if os.environ.get('DISPLAY') or os.environ.get('WAYLAND_DISPLAY'):
+        return False
+    if glob.glob('/dev/dri/renderD*'):
+        return False
+    os.environ['LIBGL_ALWAYS_SOFTWARE'] = '1'
+    return True
+
+
+def LoadScene(layers, background, size):
+    """Worker initializer: read the layer files into an offscreen window."""
+    global renderWindow, startCamera
+    SoftwareGLFallback()
+    colors = vtkNamedColors()
+    renderer = vtkRenderer()
+    renderer.SetBackground(colors.GetColor3d(background))
+    for layer in layers:
+        reader = vtkXMLPolyDataReader()
+        reader.SetFileName(layer["polyData"])
+        reader.Update()
+        renderer.AddActor(LayerActor(dict(layer, polyData=reader.GetOutput()), colors))
+    renderWindow = vtkRenderWindow()
+    renderWindow.SetOffScreenRendering(1)
+    renderWindow.SetSize(*size)
+    renderWindow.AddRenderer(renderer)
+    renderer.ResetCamera()
+    renderer.GetActiveCamera().Elevation(20)
+    renderer.GetActiveCamera().OrthogonalizeViewUp()
+    startCamera = vtkCamera()
+    startCamera.DeepCopy(renderer.GetActiveCamera())
+
+
+def RenderFrames(frames, numberOfFrames, outputDir):
+    """Render the given frame numbers of the turntable; returns seconds spent."""
+    start = time.perf_counter()
+    renderer = renderWindow.GetRenderers().GetFirstRenderer()
+    camera = renderer.GetActiveCamera()
+    image = vtkWindowToImageFilter()
+    image.SetInput(renderWindow)
+    image.ReadFrontBufferOff()
+    # The frame was just rendered, by default the filter would render it again #
+    image.ShouldRerenderOff()
+    writer = vtkPNGWriter()
+    writer.SetInputConnection(image.GetOutputPort())
+    for frame in frames:
+        camera.DeepCopy(startCamera)
+        camera.Azimuth(360.0 * frame / numberOfFrames)
+        renderer.ResetCameraClippingRange()
+        renderWindow.Render()
+        image.Modified()
+        writer.SetFileName(os.path.join(outputDir, FRAME_PATTERN % frame))
+        writer.Write()
+    return time.perf_counter() - start
+
+
+def EncodeVideo(outputDir, videoName, fps=30):
+    """Join the frames with ffmpeg; returns the video name, or None without ffmpeg."""
+    ffmpeg = shutil.which('ffmpeg')
+    if ffmpeg is None:
+        print("ffmpeg not found, frames left in ", outputDir)
+        return None
+    subprocess.run([ffmpeg, '-loglevel', 'error', '-y', '-framerate', str(fps),
+                    '-i', os.path.join(outputDir, FRAME_PATTERN), '-c:v', 'libx264',
+                    '-pix_fmt', 'yuv420p', videoName], check=True)
+    return videoName
+
+
+def RenderTurntable(pipeline, file_name, outputDir, numberOfFrames=DEFAULT_FRAMES,
+                    size=DEFAULT_SIZE, workers=None, fps=30, dimension=256):
+    """Render pipeline on file_name as numberOfFrames PNGs, plus an mp4 if ffmpeg exists.
+
+    The pipeline runs once here; the layers go to uncompressed .vtp files
+    that each worker loads once, then the workers render interleaved
+    frame numbers so they finish together.
+    """
+    start = time.perf_counter()
+    polyData = ReadPolyData(file_name)
+    if polyData is None:
+        return None
+    layers, background = Scene(pipeline, polyData, dimension)
+    sceneSeconds = time.perf_counter() - start
+    os.makedirs(outputDir, exist_ok=True)
+    workers = workers or os.cpu_count()
+
+    with tempfile.TemporaryDirectory(dir=outputDir) as tmp:
+        layerFiles = []
+        for i, layer in enumerate(layers):
+            path = os.path.join(tmp, f'layer{i}.vtp')
+            writer = vtkXMLPolyDataWriter()
+            writer.SetFileName(path)
+            writer.SetInputData(layer["polyData"])
+            writer.SetDataModeToAppended()
+            writer.EncodeAppendedDataOff()
+            writer.SetCompressorTypeToNone()
+            writer.Write()
+            layerFiles.append(dict(layer, polyData=path))
+        renderStart = time.perf_counter()
+        StartTrace()
+        with ProcessPoolExecutor(max_workers=workers, initializer=LoadScene,
+                                 initargs=(layerFiles, background, size)) as executor:
+            futures = [executor.submit(RenderFrames, range(worker, numberOfFrames, workers),
+                                       numberOfFrames, outputDir)
+                       for worker in range(workers)]
+            workerSeconds = sum(future.result() for future in futures)
+        renderSeconds = time.perf_counter() - renderStart
+
+    video = EncodeVideo(outputDir, outputDir.rstrip('/\\') + '.mp4', fps)
+    print(pipeline, " ", file_name, ": ", numberOfFrames, " frames of ", size[0], "x", size[1],
+          ", scene ", "%.3f" % sceneSeconds, " s, render ", "%.3f" % renderSeconds, " s (",
+          "%.1f" % (numberOfFrames / renderSeconds), " frames/s, ", "%.3f" % workerSeconds,
+          " s in ", workers, " workers) -> ", video or outputDir)
+    return video or outputDir
+
+
+def get_program_parameters():
+    import argparse
+    description = 'Render pipeline results offscreen as turntable frames and videos.'
+    epilogue = '''
+--all renders every README demo (pipeline, model) pair into
+<output-dir>/<pipeline>_<model>/ and <output-dir>/<pipeline>_<model>.mp4.
+'''
+    parser = argparse.ArgumentParser(description=description, epilog=epilogue,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('pipeline', nargs='?', choices=PIPELINES, default='extract-surface')
+    parser.add_argument('filename', nargs='?', default='./res/ism_test_cat.vtp')
+    parser.add_argument('--all', action='store_true', help='render all demo assets')
+    parser.add_argument('--res-dir', default='./res', help='inputs of --all')
+    parser.add_argument('--output-dir', default='./demo')
+    parser.add_argument('--frames', type=int, default=DEFAULT_FRAMES)
+    parser.add_argument('--size', type=int, nargs=2, default=DEFAULT_SIZE, metavar=('W', 'H'))
+    parser.add_argument('--fps', type=int, default=30)
+    parser.add_argument('--dimension', type=int, default=256,
+                        help='signed distance volume resolution per axis')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='number of worker processes (default: CPU count)')
+    args = parser.parse_args()
+    return args
+
+
+def main():
+    args = get_program_parameters()
+    if args.all:
+        jobs = [(pipeline, DemoFile(name, args.res_dir), f'{pipeline}_{name}')
+                for pipeline in PIPELINES for name in DEMO_FILES[pipeline]]
+    else:
+        stem = os.path.splitext(os.path.basename(args.filename))[0]
+        jobs = [(args.pipeline, args.filename, f'{args.pipeline}_{stem}')]
+    start = time.perf_counter()
+    for pipeline, file_name, name in jobs:
+        RenderTurntable(pipeline, file_name, os.path.join(args.output_dir, name), args.frames,
+                        tuple(args.size), args.workers, args.fps, args.dimension)
+    print("Rendered ", len(jobs), " turntables in ", "%.3f" % (time.perf_counter() - start), " s")
+
+
+if __name__ == '__main__':
+    main()
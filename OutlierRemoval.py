@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+import os
+import time
+from contextlib import contextmanager
+import numpy as np
+from vtkmodules.vtkCommonCore import (
+    vtkIdList,
+    vtkSMPTools
+)
+from NeighborIndex import IndexFor
+from Pipelines import (
+    DataRange,
+    RadiusOutlierRemoval,
+    StatisticalOutlierRemoval
+)
+
+OUTLIER_MODES = ['statistical', 'radius']
+# Points whose neighbors set the default radius of the radius mode #
+SPACING_SAMPLES = 1000
+# vtkSMPTools backend of the threaded stages, VTK_SMP_BACKEND_IN_USE takes precedence #
+THREADED_BACKEND = 'STDThread'
+
+
+@contextmanager
+def ThreadedSMP(backend=THREADED_BACKEND):
+    """Run the enclosed VTK filters on the threaded vtkSMPTools backend.
+
+    The wheels default to the Sequential backend. The previous backend is
+    restored on exit so that worker processes forked afterwards do not
+    inherit a thread pool without its threads.
+    """
+    tools = vtkSMPTools()
+    previous = tools.GetBackend()
+    if os.environ.get('VTK_SMP_BACKEND_IN_USE') is None:
+        tools.SetBackend(backend)
+    try:
+        yield tools
+    finally:
+        tools.SetBackend(previous)
+
+
+def NeighborSpacing(polyData, index, numberOfNeighbors, samples=SPACING_SAMPLES, seed=0):
+    """Mean distance from a point to its numberOfNeighbors-th neighbor, over a sample of points."""
+    points = polyData.GetPoints()
+    numberOfPoints = polyData.GetNumberOfPoints()
+    ids = vtkIdList()
+    distances = []
+    for pointId in np.random.default_rng(seed).choice(numberOfPoints, min(samples, numberOfPoints),
+                                                      replace=False):
+        point = points.GetPoint(int(pointId))
+        index.locator.FindClosestNPoints(numberOfNeighbors + 1, point, ids)
+        farthest = points.GetPoint(ids.GetId(ids.GetNumberOfIds() - 1))
+        distances.append(np.linalg.norm(np.subtract(farthest, point)))
+    return float(np.mean(distances))
+
+
+def RemoveOutliers(polyData, mode='statistical', sampleSize=10, stdDevFactor=3.0, radius=None,
+                   numberOfNeighbors=4, index=None):
+    """Drop stray points before the grid bounds are taken from the cloud.
+
+    'statistical' removes points whose mean distance to their sampleSize
+    nearest neighbors lies more than stdDevFactor standard deviations
+    above the mean; 'radius' removes points with fewer than
+    numberOfNeighbors others within radius (default: twice the sampled
+    NeighborSpacing). Both query the shared locator of index (default:
+    IndexFor(polyData)) from the threaded SMP backend. Prints the removed points and
+    how much the largest extent shrank.
+    """
+    start = time.perf_counter()
+    with ThreadedSMP() as tools:
+        index = index or IndexFor(polyData)
+        locator = index.Locator(polyData)
+        if mode == 'statistical':
+            cleaned = StatisticalOutlierRemoval(polyData, sampleSize, stdDevFactor, locator)
+        elif mode == 'radius':
+            radius = radius or 2 * NeighborSpacing(polyData, index, numberOfNeighbors)
+            cleaned = RadiusOutlierRemoval(polyData, radius, numberOfNeighbors, locator)
+        else:
+            raise ValueError(f'Unknown outlier mode {mode}, expected one of {OUTLIER_MODES}')
+        threads = tools.GetEstimatedNumberOfThreads()
+    before = max(DataRange(polyData.GetBounds()))
+    after = max(DataRange(cleaned.GetBounds()))
+    print("Outliers (", mode, "): removed ", polyData.GetNumberOfPoints() - cleaned.GetNumberOfPoints(),
+          " of ", polyData.GetNumberOfPoints(), " points, largest extent ", "%.4g" % before, " -> ",
+          "%.4g" % after, ", ", "%.3f" % (time.perf_counter() - start), " s on ", threads, " threads")
+    return cleaned
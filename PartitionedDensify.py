@@ -0,0 +1,101 @@
+#!/usr/bin/env python
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from vtkmodules.util import numpy_support
+from ElevationEngine import PointsPolyData
+from Pipelines import Densify
+from PipelineTrace import StartTrace
+
+
+def TileGrid(bounds, tiles):
+    low = np.array(bounds[0::2], dtype=np.float64)
+    high = np.array(bounds[1::2], dtype=np.float64)
+    tiles = np.broadcast_to(np.asarray(tiles, dtype=np.int64), (3,))
+    size = (high - low) / tiles
+    size[size == 0] = 1.0
+    return low, size, tiles
+
+
+def TileIndex(points, low, size, tiles):
+    index = np.floor((points - low) / size).astype(np.int64)
+    return np.clip(index, 0, tiles - 1)
+
+
+def DensifyTile(points, core, targetDistance, iterations, closestPoints):
+    """Densify the tile plus halo and keep the new points inside the tile core."""
+    start = time.perf_counter()
+    densified = Densify(PointsPolyData(points), targetDistance, iterations, closestPoints)
+    # vtkDensifyPointCloudFilter appends the new points after the input ones #
+    output = numpy_support.vtk_to_numpy(densified.GetPoints().GetData())[len(points):]
+    low, high, closeHigh = core
+    inside = np.all((output >= low) & ((output < high) | (closeHigh & (output <= high))), axis=1)
+    return np.array(output[inside]), time.perf_counter() - start
+
+
+def PartitionedDensify(polyData, targetDistance, iterations=5, closestPoints=10,
+                       tiles=2, haloFactor=3.0, workers=None):
+    """vtkDensifyPointCloudFilter over spatial tiles in a process pool.
+
+    The bounds are cut into tiles (per axis). Each tile is densified with
+    the input points within haloFactor * targetDistance of it, so points
+    near the seams see the same neighbors as in a single-shot run. A new
+    point is kept only by the tile whose core contains it, which drops the
+    duplicates created inside the halos. The input points come first in
+    the output, as with the filter itself.
+    """
+    start = time.perf_counter()
+    points = numpy_support.vtk_to_numpy(polyData.GetPoints().GetData())
+    low, size, tiles = TileGrid(polyData.GetBounds(), tiles)
+    halo = haloFactor * targetDistance
+    lowIndex = TileIndex(points - halo, low, size, tiles)
+    highIndex = TileIndex(points + halo, low, size, tiles)
+
+    jobs = []
+    for i in range(tiles[0]):
+        for j in range(tiles[1]):
+            for k in range(tiles[2]):
+                index = np.array([i, j, k])
+                members = np.all((lowIndex <= index) & (index <= highIndex), axis=1)
+                if not members.any():
+                    continue
+                # The last tile along an axis also owns its upper face #
+                core = (low + index * size, low + (index + 1) * size, index == tiles - 1)
+                jobs.append((points[members], core))
+
+    pieces = [points]
+    tileSeconds = 0.0
+    StartTrace()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(DensifyTile, tilePoints, core, targetDistance,
+                                   iterations, closestPoints)
+                   for tilePoints, core in jobs]
+        for future in futures:
+            newPoints, seconds = future.result()
+            pieces.append(newPoints.astype(points.dtype, copy=False))
+            tileSeconds += seconds
+    output = PointsPolyData(np.concatenate(pieces))
+    elapsed = time.perf_counter() - start
+    print("Partitioned densify: ", len(jobs), " tiles, ", "%.3f" % tileSeconds,
+          " s in workers, ", "%.3f" % elapsed, " s wall (",
+          "%.0f" % (output.GetNumberOfPoints() / elapsed), " points/s)")
+    return output
+
+
+def CompareWithSingleShot(polyData, targetDistance, iterations=5, closestPoints=10,
+                          tolerance=0.05, **kwargs):
+    """Run both modes on polyData.
+
+    Returns the partitioned output and whether its point count lies within
+    tolerance (a fraction) of the single-shot count.
+    """
+    start = time.perf_counter()
+    single = Densify(polyData, targetDistance, iterations, closestPoints)
+    singleSeconds = time.perf_counter() - start
+    partitioned = PartitionedDensify(polyData, targetDistance, iterations, closestPoints, **kwargs)
+    expected = single.GetNumberOfPoints()
+    actual = partitioned.GetNumberOfPoints()
+    difference = abs(actual - expected) / max(expected, 1)
+    print("Single shot: ", expected, " points in ", "%.3f" % singleSeconds,
+          " s, partitioned: ", actual, " points (", "%.1f" % (difference * 100), "% apart)")
+    return partitioned, difference <= tolerance
@@ -0,0 +1,345 @@
+#!/usr/bin/env python
+# Declarative pipelines over the Pipelines stages. A description names
+# each stage, its filter, its input stages and its parameters; the stages
+# form a DAG evaluated on demand. Every stage output is stored on disk
+# under a key hashing the filter, its parameters and the keys of its
+# inputs, so a changed parameter re-executes only the stages downstream
+# of it, and a cached stage is loaded without running anything upstream.
+import hashlib
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+from vtkmodules.vtkCommonCore import vtkDoubleArray
+from vtkmodules.vtkIOXML import (
+    vtkXMLImageDataReader,
+    vtkXMLImageDataWriter,
+    vtkXMLPolyDataReader,
+    vtkXMLPolyDataWriter
+)
+from PointCloudIO import ReadPolyData
+from Pipelines import (
+    DataRange,
+    Densify,
+    Elevation,
+    EstimateNormals,
+    ExtractSurface,
+    NormalSampleSize,
+    OctreeRepresentation,
+    PaddedBounds,
+    SamplePoints,
+    SignedDistance,
+    SurfaceRadius,
+    Triangulate
+)
+from VoxelGrid import DEFAULT_VOXEL_FACTOR, GridVoxelSize, VoxelDownsample
+from OutlierRemoval import RemoveOutliers
+from NeighborIndex import IndexFor
+
+DAG_VERSION = 1
+# Override the location with PCFT_DAG_CACHE, the size with PCFT_DAG_CACHE_BYTES #
+DEFAULT_CACHE_DIR = Path(os.environ.get('XDG_CACHE_HOME', Path.home() / '.cache')) / 'pcft' / 'dag'
+DEFAULT_CACHE_BYTES = 4 * 1024 * 1024 * 1024
+# Field data array through which the distance volume carries its radius #
+RADIUS_ARRAY = 'SignedDistanceRadius'
+FORMATS = {
+    'vtkPolyData': ('.vtp', vtkXMLPolyDataWriter, vtkXMLPolyDataReader),
+    'vtkImageData': ('.vti', vtkXMLImageDataWriter, vtkXMLImageDataReader),
+}
+
+# read -> normals -> signed distance -> extract surface, octree of the points #
+SURFACE_PIPELINE = {
+    'read': {'filter': 'read', 'params': {'file': './res/ism_test_cat.vtp'}},
+    'normals': {'filter': 'normals', 'inputs': ['read']},
+    'distance': {'filter': 'signed-distance', 'inputs': ['normals'],
+                 'params': {'dimension': 256}},
+    'surface': {'filter': 'extract-surface', 'inputs': ['distance']},
+    'octree': {'filter': 'octree', 'inputs': ['read']},
+}
+
+
+def ReadStage(inputs, file):
+    polyData = ReadPolyData(file)
+    if polyData is None:
+        raise ValueError(f'Could not read {file}')
+    return polyData
+
+
+def OutliersStage(inputs, mode='statistical', sampleSize=10, stdDevFactor=3.0, radius=None,
+                  numberOfNeighbors=4):
+    return RemoveOutliers(inputs[0], mode, sampleSize, stdDevFactor, radius, numberOfNeighbors)
+
+
+def VoxelGridStage(inputs, voxelSize=None, dimension=256, factor=DEFAULT_VOXEL_FACTOR):
+    polyData = inputs[0]
+    return VoxelDownsample(polyData, voxelSize or GridVoxelSize(polyData.GetBounds(), dimension,
+                                                               factor))
+
+
+def NormalsStage(inputs, sampleSize=None, orientation='GraphTraversal', flip=True):
+    polyData = inputs[0]
+    if polyData.GetPointData().GetNormals():
+        return polyData
+    return EstimateNormals(polyData, sampleSize or NormalSampleSize(polyData), orientation, flip,
+                           IndexFor(polyData).locator)
+
+
+def SignedDistanceStage(inputs, dimension=256, radius=None, pad=.1):
+    polyData = inputs[0]
+    bounds = polyData.GetBounds()
+    radius = radius or SurfaceRadius(bounds, dimension)
+    distance = SignedDistance(polyData, dimension, radius, PaddedBounds(bounds, pad),
+                              IndexFor(polyData).locator)
+    array = vtkDoubleArray()
+    array.SetName(RADIUS_ARRAY)
+    array.InsertNextValue(radius)
+    distance.GetFieldData().AddArray(array)
+    return distance
+
+
+def ExtractSurfaceStage(inputs, radius=None):
+    distance = inputs[0]
+    if radius is None:
+        radius = distance.GetFieldData().GetArray(RADIUS_ARRAY).GetValue(0)
+    return ExtractSurface(distance, radius)
+
+
+def OctreeStage(inputs, maxPointsPerRegion=5, level=None):
+    octree = IndexFor(inputs[0]).Octree(maxPointsPerRegion)
+    return OctreeRepresentation(octree, octree.GetLevel() if level is None else level)
+
+
+def ElevationStage(inputs):
+    return Elevation(inputs[0])
+
+
+def DensifyStage(inputs, targetDistance=None, iterations=5, closestPoints=10):
+    polyData = inputs[0]
+    targetDistance = targetDistance or max(DataRange(polyData.GetBounds())) * .03
+    return Densify(polyData, targetDistance, iterations, closestPoints)
+
+
+def SampleStage(inputs, distance=None):
+    polyData = inputs[0]
+    return SamplePoints(polyData, distance or DataRange(polyData.GetBounds())[0] / 50)
+
+
+def TriangulateStage(inputs):
+    return Triangulate(inputs[0])
+
+
+FILTERS = {
+    'read': ReadStage,
+    'outliers': OutliersStage,
+    'voxel-grid': VoxelGridStage,
+    'normals': NormalsStage,
+    'signed-distance': SignedDistanceStage,
+    'extract-surface': ExtractSurfaceStage,
+    'octree': OctreeStage,
+    'elevation': ElevationStage,
+    'densify': DensifyStage,
+    'sample': SampleStage,
+    'triangulate': TriangulateStage,
+}
+# Outputs not written to the stage cache: the point cache sidecar already keeps them #
+UNCACHED_FILTERS = ['read']
+
+
+class StageCache(object):
+    """Stage outputs as XML files named by their key, trimmed to maxBytes.
+
+    Hits refresh the file's modification time; once the directory holds
+    more than maxBytes the least recently used files are removed.
+    """
+
+    def __init__(self, cacheDir=None, maxBytes=None):
+        self.cacheDir = Path(cacheDir or os.environ.get('PCFT_DAG_CACHE', DEFAULT_CACHE_DIR))
+        self.maxBytes = int(maxBytes or os.environ.get('PCFT_DAG_CACHE_BYTES', DEFAULT_CACHE_BYTES))
+
+    def Load(self, key):
+        for extension, _, readerType in FORMATS.values():
+            path = self.cacheDir / (key + extension)
+            if not path.exists():
+                continue
+            reader = readerType()
+            reader.SetFileName(str(path))
+            reader.Update()
+            if reader.GetErrorCode():
+                return None
+            os.utime(path)
+            return reader.GetOutput()
+        return None
+
+    def Store(self, key, dataObject):
+        if dataObject.GetClassName() not in FORMATS:
+            return
+        extension, writerType, _ = FORMATS[dataObject.GetClassName()]
+        if dataObject.GetActualMemorySize() * 1024 > self.maxBytes:
+            return
+        try:
+            self.cacheDir.mkdir(parents=True, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(suffix=extension, dir=self.cacheDir)
+            os.close(fd)
+            writer = writerType()
+            writer.SetFileName(tmp)
+            writer.SetInputData(dataObject)
+            writer.SetDataModeToAppended()
+            writer.EncodeAppendedDataOff()
+            writer.SetCompressorTypeToNone()
+            if not writer.Write():
+                os.unlink(tmp)
+                return
+            os.replace(tmp, self.cacheDir / (key + extension))
+        except OSError as e:
+            print(f'Could not cache stage output in {self.cacheDir}: {e}')
+            return
+        self.Evict()
+
+    def Evict(self):
+        files = []
+        for path in self.cacheDir.iterdir():
+            if path.suffix in [format[0] for format in FORMATS.values()]:
+                stat = path.stat()
+                files.append((stat.st_mtime_ns, stat.st_size, path))
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.maxBytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+            print("Evicted ", path.name, " (", "%.1f" % (size / 2 ** 20), " MiB)")
+
+
+class PipelineDag(object):
+    """Evaluate a pipeline description stage by stage, through a StageCache.
+
+    description maps stage names to {'filter': one of FILTERS, 'inputs':
+    [stage names], 'params': {keyword arguments of the filter}}. Get(name)
+    returns the output of a stage: from this run's results, from the
+    cache, or by running the filter on the outputs of its inputs.
+    """
+
+    def __init__(self, description, cache=None):
+        self.stages = {}
+        for name, stage in description.items():
+            if stage['filter'] not in FILTERS:
+                raise ValueError(f'Unknown filter {stage["filter"]} of stage {name}')
+            self.stages[name] = {'filter': stage['filter'],
+                                 'inputs': list(stage.get('inputs', [])),
+                                 'params': dict(stage.get('params', {}))}
+        for name, stage in self.stages.items():
+            for inputName in stage['inputs']:
+                if inputName not in self.stages:
+                    raise ValueError(f'Stage {name} reads the unknown stage {inputName}')
+        self.cache = cache if cache is not None else StageCache()
+        self.keys = {}
+        self.outputs = {}
+        self.executed = []
+
+    def Key(self, name, visiting=()):
+        if name in self.keys:
+            return self.keys[name]
+        if name in visiting:
+            raise ValueError(f'Stage {name} depends on itself')
+        stage = self.stages[name]
+        digest = hashlib.blake2b(digest_size=20)
+        digest.update(json.dumps([DAG_VERSION, stage['filter'], stage['params']],
+                                 sort_keys=True).encode())
+        if stage['filter'] == 'read':
+            # Like the sidecar, the file is identified by its size and mtime #
+            stat = Path(stage['params']['file']).stat()
+            digest.update(str((stat.st_size, stat.st_mtime_ns)).encode())
+        for inputName in stage['inputs']:
+            digest.update(self.Key(inputName, visiting + (name,)).encode())
+        self.keys[name] = digest.hexdigest()
+        return self.keys[name]
+
+    def Get(self, name):
+        key = self.Key(name)
+        if key in self.outputs:
+            return self.outputs[key]
+        stage = self.stages[name]
+        cached = stage['filter'] not in UNCACHED_FILTERS
+        start = time.perf_counter()
+        output = self.cache.Load(key) if cached else None
+        if output is not None:
+            print(name, ": cached ", key[:12], ", ", "%.3f" % (time.perf_counter() - start), " s")
+        else:
+            inputs = [self.Get(inputName) for inputName in stage['inputs']]
+            start = time.perf_counter()
+            output = FILTERS[stage['filter']](inputs, **stage['params'])
+            print(name, ": ran ", stage['filter'], ", ", "%.3f" % (time.perf_counter() - start), " s")
+            self.executed.append(name)
+            if cached:
+                self.cache.Store(key, output)
+        self.outputs[key] = output
+        return output
+
+    def Set(self, name, parameter, value):
+        """Change one parameter; the keys of the stage and its dependents are recomputed."""
+        self.stages[name]['params'][parameter] = value
+        self.keys = {}
+
+
+def LoadDescription(file_name):
+    with open(file_name) as f:
+        if Path(file_name).suffix.lower() in ['.yaml', '.yml']:
+            # PyYAML is optional, JSON descriptions work without it #
+            import yaml
+            return yaml.safe_load(f)
+        return json.load(f)
+
+
+def ParseValue(text):
+    try:
+        return json.loads(text)
+    except ValueError:
+        return text
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description='Run a pipeline description with cached stages.')
+    parser.add_argument('filename', nargs='?', default=None,
+                        help='input of the read stage (default: the one in the description)')
+    parser.add_argument('--pipeline', help='.json or .yaml description (default: SURFACE_PIPELINE)')
+    parser.add_argument('--target', nargs='+', default=None,
+                        help='stages to produce (default: stages no other stage reads)')
+    parser.add_argument('--set', nargs='+', default=[], metavar='STAGE.PARAM=VALUE',
+                        help='override parameters, e.g. surface.radius=0.02')
+    parser.add_argument('--cache-dir', default=None)
+    parser.add_argument('--cache-bytes', type=int, default=None)
+    parser.add_argument('--output-dir', default=None, help='write the targets as <stage>.vtp/.vti')
+    args = parser.parse_args()
+
+    description = LoadDescription(args.pipeline) if args.pipeline else SURFACE_PIPELINE
+    dag = PipelineDag(description, StageCache(args.cache_dir, args.cache_bytes))
+    if args.filename:
+        for name, stage in dag.stages.items():
+            if stage['filter'] == 'read':
+                dag.Set(name, 'file', args.filename)
+    for assignment in args.set:
+        target, value = assignment.split('=', 1)
+        name, parameter = target.split('.', 1)
+        dag.Set(name, parameter, ParseValue(value))
+
+    targets = args.target or [name for name in dag.stages
+                              if not any(name in stage['inputs'] for stage in dag.stages.values())]
+    start = time.perf_counter()
+    for name in targets:
+        output = dag.Get(name)
+        if args.output_dir:
+            extension, writerType, _ = FORMATS[output.GetClassName()]
+            os.makedirs(args.output_dir, exist_ok=True)
+            writer = writerType()
+            writer.SetFileName(os.path.join(args.output_dir, name + extension))
+            writer.SetInputData(output)
+            writer.SetDataModeToAppended()
+            writer.Write()
+    print("Executed ", len(dag.executed), " of ", len(dag.stages), " stages ", dag.executed,
+          " in ", "%.3f" % (time.perf_counter() - start), " s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,139 @@
+#!/usr/bin/env python
+# Per-filter instrumentation of the VTK stages. Set PCFT_TRACE to a file
+# name to record every algorithm created through Traced(): a .json name
+# gives a Chrome trace (chrome://tracing, ui.perfetto.dev), any other
+# name JSON lines. Both are appended one event at a time, so worker
+# processes write to the same file. Unset, Traced() returns at once.
+# Importing the module touches neither the file nor the environment: the
+# main process creates the file on its first event, or when StartTrace()
+# is called before it starts workers; processes started through
+# multiprocessing only ever append.
+import json
+import multiprocessing
+import os
+import threading
+import time
+from pathlib import Path
+
+TRACE_ENV = 'PCFT_TRACE'
+
+
+def DataCounts(dataObject):
+    counts = {"points": 0, "cells": 0}
+    if dataObject is not None:
+        if hasattr(dataObject, 'GetNumberOfPoints'):
+            counts["points"] = dataObject.GetNumberOfPoints()
+        if hasattr(dataObject, 'GetNumberOfCells'):
+            counts["cells"] = dataObject.GetNumberOfCells()
+    return counts
+
+
+def InputCounts(algorithm):
+    counts = {"points": 0, "cells": 0}
+    for port in range(algorithm.GetNumberOfInputPorts()):
+        for connection in range(algorithm.GetNumberOfInputConnections(port)):
+            for key, value in DataCounts(algorithm.GetInputDataObject(port, connection)).items():
+                counts[key] += value
+    return counts
+
+
+class Tracer(object):
+    """Observes StartEvent/ProgressEvent/EndEvent of attached algorithms.
+
+    Every execution becomes one record: wall time, the number of progress
+    events with their mean and largest spacing, input and output point and
+    cell counts and the output's GetActualMemorySize().
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.chrome = self.path.suffix.lower() == '.json'
+        self.lock = threading.Lock()
+        self.started = False
+
+    def Start(self):
+        """Create the trace file, unless a worker: those append to their parent's file."""
+        with self.lock:
+            if self.started:
+                return
+            self.started = True
+            if multiprocessing.parent_process() is not None:
+                return
+            with open(self.path, 'w') as f:
+                if self.chrome:
+                    f.write('[\n')
+
+    def Attach(self, algorithm):
+        state = {}
+        algorithm.AddObserver('StartEvent', lambda caller, event: self.Begin(caller, state))
+        algorithm.AddObserver('ProgressEvent', lambda caller, event: self.Progress(state))
+        algorithm.AddObserver('EndEvent', lambda caller, event: self.End(caller, state))
+        return algorithm
+
+    def Begin(self, algorithm, state):
+        state["inputs"] = InputCounts(algorithm)
+        state["progress"] = []
+        state["start"] = time.perf_counter_ns()
+
+    @staticmethod
+    def Progress(state):
+        if "progress" in state:
+            state["progress"].append(time.perf_counter_ns())
+
+    def End(self, algorithm, state):
+        end = time.perf_counter_ns()
+        if "start" not in state:
+            return
+        start = state.pop("start")
+        ticks = [start] + state["progress"] + [end]
+        gaps = [(b - a) / 1e6 for a, b in zip(ticks, ticks[1:])]
+        output = algorithm.GetOutputDataObject(0) if algorithm.GetNumberOfOutputPorts() else None
+        outputs = DataCounts(output)
+        record = {
+            "name": algorithm.GetClassName(),
+            "ts_us": start // 1000,
+            "wall_seconds": (end - start) / 1e9,
+            "progress_events": len(state["progress"]),
+            "progress_interval_ms": sum(gaps) / len(gaps),
+            "progress_max_gap_ms": max(gaps),
+            "input_points": state["inputs"]["points"],
+            "input_cells": state["inputs"]["cells"],
+            "output_points": outputs["points"],
+            "output_cells": outputs["cells"],
+            "output_memory_kib": output.GetActualMemorySize() if output is not None else 0,
+            "pid": os.getpid(),
+            "tid": threading.get_ident(),
+        }
+        self.Write(record)
+
+    def Write(self, record):
+        if self.chrome:
+            args = {key: value for key, value in record.items()
+                    if key not in ("name", "ts_us", "pid", "tid")}
+            line = json.dumps({"name": record["name"], "cat": "vtk", "ph": "X",
+                               "ts": record["ts_us"], "dur": record["wall_seconds"] * 1e6,
+                               "pid": record["pid"], "tid": record["tid"], "args": args})
+            # The array format allows the closing bracket to be missing #
+            line += ',\n'
+        else:
+            line = json.dumps(record) + '\n'
+        self.Start()
+        with self.lock:
+            with open(self.path, 'a') as f:
+                f.write(line)
+
+
+tracer = Tracer(os.environ[TRACE_ENV]) if os.environ.get(TRACE_ENV) else None
+
+
+def StartTrace():
+    """Create the trace file now; call before starting worker processes that trace."""
+    if tracer is not None:
+        tracer.Start()
+
+
+def Traced(algorithm):
+    """Attach the tracer to algorithm when PCFT_TRACE is set; returns algorithm."""
+    if tracer is not None:
+        tracer.Attach(algorithm)
+    return algorithm
@@ -0,0 +1,151 @@
+#!/usr/bin/env python
+# Headless stages of the filter scripts, one function per VTK filter.
+# Every stage runs Update() and returns its output data object so that
+# callers (the scripts, Benchmark.py) can time and inspect each step.
+# Each stage imports its filter module itself, so a command loads only
+# the vtkFilters* modules of the stages it runs.
+from vtkmodules.vtkCommonDataModel import (
+    vtkOctreePointLocator,
+    vtkPolyData
+)
+from PipelineTrace import Traced
+
+
+def DataRange(bounds):
+    return [bounds[2 * i + 1] - bounds[2 * i] for i in range(3)]
+
+
+def PaddedBounds(bounds, pad=.1):
+    drange = DataRange(bounds)
+    return (bounds[0] - drange[0] * pad, bounds[1] + drange[0] * pad,
+            bounds[2] - drange[1] * pad, bounds[3] + drange[1] * pad,
+            bounds[4] - drange[2] * pad, bounds[5] + drange[2] * pad)
+
+
+def NormalSampleSize(polyData):
+    sampleSize = polyData.GetNumberOfPoints() * 0.00005
+    if (sampleSize < 10):
+        sampleSize = 10
+    return sampleSize
+
+
+def SurfaceRadius(bounds, dimension):
+    return max(DataRange(bounds)) / dimension * 4  # ~4 voxels
+
+
+def Elevation(polyData):
+    from vtkmodules.vtkFiltersCore import vtkElevationFilter
+    from vtkmodules.vtkFiltersGeneral import vtkVertexGlyphFilter
+    glyphFilter = Traced(vtkVertexGlyphFilter())
+    glyphFilter.SetInputData(polyData)
+    glyphFilter.Update()
+
+    bounds = glyphFilter.GetOutput().GetBounds()
+    elevationFilter = Traced(vtkElevationFilter())
+    elevationFilter.SetInputConnection(glyphFilter.GetOutputPort())
+    elevationFilter.SetLowPoint(0, 0, bounds[5])
+    elevationFilter.SetHighPoint(0, 0, bounds[4])
+    elevationFilter.Update()
+    return elevationFilter.GetOutput()
+
+
+def Densify(polyData, targetDistance, iterations=5, closestPoints=10):
+    from vtkmodules.vtkFiltersPoints import vtkDensifyPointCloudFilter
+    densify = Traced(vtkDensifyPointCloudFilter())
+    densify.SetInputData(polyData)
+    densify.SetMaximumNumberOfIterations(iterations)
+    densify.SetTargetDistance(targetDistance)
+    densify.SetNumberOfClosestPoints(closestPoints)
+    densify.Update()
+    return densify.GetOutput()
+
+
+def StatisticalOutlierRemoval(polyData, sampleSize=10, stdDevFactor=3.0, locator=None):
+    from vtkmodules.vtkFiltersPoints import vtkStatisticalOutlierRemoval
+    outliers = Traced(vtkStatisticalOutlierRemoval())
+    outliers.SetInputData(polyData)
+    outliers.SetSampleSize(sampleSize)
+    outliers.SetStandardDeviationFactor(stdDevFactor)
+    if locator is not None:
+        outliers.SetLocator(locator)
+    outliers.Update()
+    return outliers.GetOutput()
+
+
+def RadiusOutlierRemoval(polyData, radius, numberOfNeighbors=4, locator=None):
+    from vtkmodules.vtkFiltersPoints import vtkRadiusOutlierRemoval
+    outliers = Traced(vtkRadiusOutlierRemoval())
+    outliers.SetInputData(polyData)
+    outliers.SetRadius(radius)
+    outliers.SetNumberOfNeighbors(numberOfNeighbors)
+    if locator is not None:
+        outliers.SetLocator(locator)
+    outliers.Update()
+    return outliers.GetOutput()
+
+
+def EstimateNormals(polyData, sampleSize, orientation='GraphTraversal', flip=True, locator=None):
+    from vtkmodules.vtkFiltersPoints import vtkPCANormalEstimation
+    normals = Traced(vtkPCANormalEstimation())
+    normals.SetInputData(polyData)
+    if locator is not None:
+        normals.SetLocator(locator)
+    normals.SetSampleSize(int(sampleSize))
+    # orientation is one of AsComputed, Point or GraphTraversal #
+    getattr(normals, 'SetNormalOrientationTo' + orientation)()
+    normals.SetFlipNormals(flip)
+    normals.Update()
+    return normals.GetOutput()
+
+
+def SignedDistance(polyData, dimension, radius, bounds, locator=None):
+    from vtkmodules.vtkFiltersPoints import vtkSignedDistance
+    distance = Traced(vtkSignedDistance())
+    distance.SetInputData(polyData)
+    if locator is not None:
+        distance.SetLocator(locator)
+    distance.SetRadius(radius)
+    distance.SetDimensions(dimension, dimension, dimension)
+    distance.SetBounds(*bounds)
+    distance.Update()
+    return distance.GetOutput()
+
+
+def ExtractSurface(distance, radius):
+    from vtkmodules.vtkFiltersPoints import vtkExtractSurface
+    surface = Traced(vtkExtractSurface())
+    surface.SetInputData(distance)
+    surface.SetRadius(radius * .99)
+    surface.Update()
+    return surface.GetOutput()
+
+
+def BuildOctree(polyData, maxPointsPerRegion=5):
+    octree = vtkOctreePointLocator()
+    octree.SetMaximumPointsPerRegion(maxPointsPerRegion)
+    octree.SetDataSet(polyData)
+    octree.BuildLocator()
+    return octree
+
+
+def OctreeRepresentation(octree, level):
+    polyData = vtkPolyData()
+    octree.GenerateRepresentation(level, polyData)
+    return polyData
+
+
+def SamplePoints(polyData, distance):
+    from vtkmodules.vtkFiltersModeling import vtkPolyDataPointSampler
+    sample = Traced(vtkPolyDataPointSampler())
+    sample.SetInputData(polyData)
+    sample.SetDistance(distance)
+    sample.Update()
+    return sample.GetOutput()
+
+
+def Triangulate(polyData):
+    from vtkmodules.vtkFiltersCore import vtkTriangleFilter
+    triangleFilter = Traced(vtkTriangleFilter())
+    triangleFilter.SetInputData(polyData)
+    triangleFilter.Update()
+    return triangleFilter.GetOutput()
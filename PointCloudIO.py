@@ -0,0 +1,340 @@
+#!/usr/bin/env python
+import importlib
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+import numpy as np
+from vtkmodules.util import numpy_support
+from vtkmodules.vtkCommonCore import vtkPoints
+from vtkmodules.vtkCommonDataModel import (
+    vtkCellArray,
+    vtkPolyData
+)
+from PipelineTrace import Traced
+
+VALID_SUFFIXES = ['.g', '.obj', '.stl', '.ply', '.vtk', '.vtp']
+# Reader of each suffix, imported only when a file has to be decoded #
+READERS = {
+    '.g': ('vtkmodules.vtkIOGeometry', 'vtkBYUReader'),
+    '.obj': ('vtkmodules.vtkIOGeometry', 'vtkOBJReader'),
+    '.stl': ('vtkmodules.vtkIOGeometry', 'vtkSTLReader'),
+    '.ply': ('vtkmodules.vtkIOPLY', 'vtkPLYReader'),
+    '.vtk': ('vtkmodules.vtkIOLegacy', 'vtkPolyDataReader'),
+    '.vtp': ('vtkmodules.vtkIOXML', 'vtkXMLPolyDataReader'),
+}
+
+# Inputs that get a memory-mapped sidecar next to them, disable with PCFT_SIDECAR=0 #
+SIDECAR_SUFFIXES = ['.vtp', '.ply', '.stl']
+SIDECAR_EXTENSION = '.pcache'
+SIDECAR_VERSION = 2
+CELL_TYPES = ['verts', 'lines', 'polys', 'strips']
+ATTRIBUTE_GROUPS = ['point', 'cell', 'field']
+
+# Default byte budget of the in-process cache, override with PCFT_CACHE_BYTES #
+DEFAULT_CACHE_BYTES = 512 * 1024 * 1024
+
+
+def DecodePolyData(file_name):
+    """Parse file_name with the VTK reader matching its suffix, uncached."""
+    ext = Path(file_name).suffix.lower()
+    if ext not in VALID_SUFFIXES:
+        print(f'No reader for this file suffix: {ext}')
+        return None
+    module, name = READERS[ext]
+    reader = Traced(getattr(importlib.import_module(module), name)())
+    if ext == ".g":
+        reader.SetGeometryFileName(str(file_name))
+    else:
+        reader.SetFileName(str(file_name))
+    reader.Update()
+    return reader.GetOutput()
+
+
+def SidecarPath(file_name):
+    path = Path(file_name)
+    return path.with_name(path.name + SIDECAR_EXTENSION)
+
+
+def SidecarEnabled(file_name):
+    if os.environ.get("PCFT_SIDECAR", "1") == "0":
+        return False
+    return Path(file_name).suffix.lower() in SIDECAR_SUFFIXES
+
+
+def GetCellArray(polyData, cellType):
+    if cellType == 'verts':
+        return polyData.GetVerts()
+    if cellType == 'lines':
+        return polyData.GetLines()
+    if cellType == 'polys':
+        return polyData.GetPolys()
+    return polyData.GetStrips()
+
+
+def GetAttributes(polyData, group):
+    if group == 'point':
+        return polyData.GetPointData()
+    if group == 'cell':
+        return polyData.GetCellData()
+    return polyData.GetFieldData()
+
+
+def SidecarArrays(attributes):
+    """The data arrays of attributes with their attribute types, None if one is not numeric."""
+    # Field data has no attributes #
+    isAttribute = getattr(attributes, 'IsArrayAnAttribute', lambda i: -1)
+    arrays = []
+    for i in range(attributes.GetNumberOfArrays()):
+        array = attributes.GetArray(i)
+        if array is None:
+            return None
+        arrays.append((array, isAttribute(i)))
+    return arrays
+
+
+def WriteSidecar(file_name, polyData):
+    """Dump points, data arrays and cells of polyData as little-endian .npy files.
+
+    Arrays keep their VTK type, so the sidecar reads back exactly what
+    the reader decoded. Returns False without writing when polyData
+    holds an array that is not numeric (a vtkStringArray, say). The
+    directory is assembled under a temporary name and renamed into
+    place, so concurrent readers never see a partial sidecar.
+    """
+    groups = {group: SidecarArrays(GetAttributes(polyData, group)) for group in ATTRIBUTE_GROUPS}
+    if any(arrays is None for arrays in groups.values()):
+        return False
+    sidecar = SidecarPath(file_name)
+    stat = Path(file_name).stat()
+    # Not mkdtemp: its directories are 0700, this one follows the umask so
+    # that other users of a shared data directory can map the sidecar #
+    tmp = sidecar.with_name(f'{sidecar.name}.{uuid.uuid4().hex}')
+    os.mkdir(tmp)
+    try:
+        pointData = polyData.GetPoints().GetData()
+        SaveArray(tmp / 'points.npy', pointData)
+        arrays = {}
+        for group, groupArrays in groups.items():
+            arrays[group] = []
+            for i, (array, attribute) in enumerate(groupArrays):
+                SaveArray(tmp / f'{group}_{i}.npy', array)
+                arrays[group].append({"name": array.GetName(), "type": array.GetDataType(),
+                                      "attribute": attribute})
+        cells = []
+        for cellType in CELL_TYPES:
+            cellArray = GetCellArray(polyData, cellType)
+            if cellArray.GetNumberOfCells() == 0:
+                continue
+            offsets = numpy_support.vtk_to_numpy(cellArray.GetOffsetsArray())
+            connectivity = numpy_support.vtk_to_numpy(cellArray.GetConnectivityArray())
+            np.save(tmp / f'{cellType}_offsets.npy', offsets.astype('<i8', copy=False))
+            np.save(tmp / f'{cellType}_connectivity.npy',
+                    connectivity.astype('<i8', copy=False))
+            cells.append(cellType)
+        meta = {
+            "version": SIDECAR_VERSION,
+            "source_mtime_ns": stat.st_mtime_ns,
+            "source_size": stat.st_size,
+            "points_type": pointData.GetDataType(),
+            "arrays": arrays,
+            "cells": cells,
+        }
+        with open(tmp / 'meta.json', 'w') as f:
+            json.dump(meta, f)
+        if sidecar.exists():
+            shutil.rmtree(sidecar, ignore_errors=True)
+        os.replace(tmp, sidecar)
+    except OSError:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+    return True
+
+
+def SaveArray(path, array):
+    values = numpy_support.vtk_to_numpy(array)
+    np.save(path, values.astype(values.dtype.newbyteorder('<'), copy=False))
+
+
+def MapArray(path):
+    # Copy-on-write so filters that touch their input never write the file #
+    array = np.load(path, mmap_mode='c')
+    if not array.dtype.isnative:
+        array = array.astype(array.dtype.newbyteorder('='))
+    return array
+
+
+def ReadSidecar(file_name):
+    """Wrap a fresh sidecar of file_name zero-copy into vtkPolyData, else None.
+
+    None also when the sidecar is removed or replaced while it is read.
+    """
+    sidecar = SidecarPath(file_name)
+    try:
+        with open(sidecar / 'meta.json') as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    stat = Path(file_name).stat()
+    if (meta.get("version") != SIDECAR_VERSION
+            or meta.get("source_mtime_ns") != stat.st_mtime_ns
+            or meta.get("source_size") != stat.st_size):
+        return None
+    try:
+        return MapSidecar(sidecar, meta)
+    except (OSError, ValueError):
+        return None
+
+
+def MapSidecar(sidecar, meta):
+    polyData = vtkPolyData()
+    points = vtkPoints()
+    points.SetData(numpy_support.numpy_to_vtk(MapArray(sidecar / 'points.npy'),
+                                              array_type=meta["points_type"]))
+    polyData.SetPoints(points)
+    for group, arrays in meta["arrays"].items():
+        attributes = GetAttributes(polyData, group)
+        for i, entry in enumerate(arrays):
+            array = numpy_support.numpy_to_vtk(MapArray(sidecar / f'{group}_{i}.npy'),
+                                               array_type=entry["type"])
+            if entry["name"] is not None:
+                array.SetName(entry["name"])
+            index = attributes.AddArray(array)
+            if entry["attribute"] >= 0:
+                attributes.SetActiveAttribute(index, entry["attribute"])
+    for cellType in meta["cells"]:
+        offsets = MapArray(sidecar / f'{cellType}_offsets.npy')
+        connectivity = MapArray(sidecar / f'{cellType}_connectivity.npy')
+        cellArray = vtkCellArray()
+        cellArray.SetData(numpy_support.numpy_to_vtkIdTypeArray(offsets),
+                          numpy_support.numpy_to_vtkIdTypeArray(connectivity))
+        if cellType == 'verts':
+            polyData.SetVerts(cellArray)
+        elif cellType == 'lines':
+            polyData.SetLines(cellArray)
+        elif cellType == 'polys':
+            polyData.SetPolys(cellArray)
+        else:
+            polyData.SetStrips(cellArray)
+    return polyData
+
+
+def LoadPolyData(file_name):
+    """Open the sidecar of file_name if it is fresh, else decode and write one."""
+    if not SidecarEnabled(file_name):
+        return DecodePolyData(file_name)
+    polyData = ReadSidecar(file_name)
+    if polyData is not None:
+        return polyData
+    polyData = DecodePolyData(file_name)
+    if polyData is not None and polyData.GetPoints() is not None:
+        try:
+            if not WriteSidecar(file_name, polyData):
+                print(f'No point cache for {file_name}: it holds non-numeric arrays')
+        except OSError as e:
+            print(f'Could not write point cache for {file_name}: {e}')
+    return polyData
+
+
+class PolyDataCache(object):
+    """LRU cache of decoded vtkPolyData keyed on (path, mtime, size).
+
+    Entries are evicted least recently used first once the summed
+    GetActualMemorySize() of the cached outputs exceeds maxBytes.
+    """
+
+    def __init__(self, maxBytes=DEFAULT_CACHE_BYTES):
+        self.maxBytes = maxBytes
+        self.entries = OrderedDict()
+        self.totalBytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.decodeTime = 0.0
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def Key(file_name):
+        path = Path(file_name).resolve()
+        stat = path.stat()
+        return (str(path), stat.st_mtime_ns, stat.st_size)
+
+    def Get(self, file_name):
+        ext = Path(file_name).suffix.lower()
+        if ext not in VALID_SUFFIXES:
+            print(f'No reader for this file suffix: {ext}')
+            return None
+        key = self.Key(file_name)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return self.Copy(entry[0])
+            self.misses += 1
+
+        start = time.perf_counter()
+        polyData = LoadPolyData(file_name)
+        elapsed = time.perf_counter() - start
+        if polyData is None:
+            return None
+
+        nbytes = polyData.GetActualMemorySize() * 1024
+        with self.lock:
+            self.decodeTime += elapsed
+            # Stale entries of a rewritten file can never hit again #
+            for stale in [k for k in self.entries if k[0] == key[0]]:
+                self.Remove(stale)
+            if nbytes <= self.maxBytes:
+                self.entries[key] = (polyData, nbytes)
+                self.totalBytes += nbytes
+                while self.totalBytes > self.maxBytes:
+                    self.Remove(next(iter(self.entries)))
+        return self.Copy(polyData)
+
+    def Remove(self, key):
+        polyData, nbytes = self.entries.pop(key)
+        self.totalBytes -= nbytes
+
+    def Clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.totalBytes = 0
+
+    @staticmethod
+    def Copy(polyData):
+        # Callers get their own structure over the shared arrays #
+        copy = vtkPolyData()
+        copy.ShallowCopy(polyData)
+        return copy
+
+    def Stats(self):
+        with self.lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "decode_seconds": self.decodeTime,
+                "entries": len(self.entries),
+                "bytes": self.totalBytes,
+                "max_bytes": self.maxBytes,
+            }
+
+
+polyDataCache = PolyDataCache(
+    int(os.environ.get("PCFT_CACHE_BYTES", DEFAULT_CACHE_BYTES)))
+
+
+def ReadPolyData(file_name):
+    """Read file_name once per process and hand out shallow copies."""
+    return polyDataCache.Get(file_name)
+
+
+def ReportCacheStats():
+    stats = polyDataCache.Stats()
+    print("PolyData cache: ", stats["hits"], " hits, ", stats["misses"],
+          " misses, ", "%.3f" % stats["decode_seconds"], " s decoding, ",
+          stats["entries"], " entries, ", stats["bytes"], " bytes")
+    return stats
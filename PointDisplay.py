@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+import time
+from vtkmodules.vtkFiltersCore import vtkGlyph3D
+from vtkmodules.vtkFiltersSources import vtkSphereSource
+from vtkmodules.vtkRenderingCore import (
+    vtkActor,
+    vtkGlyph3DMapper,
+    vtkPointGaussianMapper,
+    vtkPolyDataMapper
+)
+from PipelineTrace import Traced
+
+DISPLAY_MODES = ['auto', 'glyph', 'instanced', 'sprites']
+# Above this many points 'auto' switches from instanced spheres to sprites #
+INSTANCE_LIMIT = 100000
+
+# Shades the point gaussian splats as spheres instead of gaussian blobs #
+SPHERE_SPLAT_SHADER = (
+    "//VTK::Color::Impl\n"
+    "float dist = dot(offsetVCVSOutput.xy, offsetVCVSOutput.xy);\n"
+    "if (dist > 1.0) {\n"
+    "  discard;\n"
+    "} else {\n"
+    "  float scale = (1.0 - dist);\n"
+    "  ambientColor *= scale;\n"
+    "  diffuseColor *= scale;\n"
+    "}\n"
+)
+
+
+def MeshBytes(polyData):
+    """Bytes held by the points, point data and cell arrays of polyData."""
+    arrays = []
+    if polyData.GetPoints():
+        arrays.append(polyData.GetPoints().GetData())
+    pointData = polyData.GetPointData()
+    arrays.extend(pointData.GetArray(i) for i in range(pointData.GetNumberOfArrays()))
+    for cells in (polyData.GetVerts(), polyData.GetLines(), polyData.GetPolys(),
+                  polyData.GetStrips()):
+        arrays.extend((cells.GetOffsetsArray(), cells.GetConnectivityArray()))
+    return sum(array.GetNumberOfValues() * array.GetDataTypeSize()
+               for array in arrays if array is not None)
+
+
+def DisplayMode(polyData, mode='auto'):
+    if mode != 'auto':
+        return mode
+    return 'instanced' if polyData.GetNumberOfPoints() <= INSTANCE_LIMIT else 'sprites'
+
+
+def MarkerActor(polyData, radius, color, mode='auto'):
+    """Actor drawing a sphere of radius at every point of polyData.
+
+    'glyph' copies a sphere mesh per point into a vtkGlyph3D output on the
+    CPU. 'instanced' draws one sphere mesh per point with vtkGlyph3DMapper
+    and 'sprites' shades one quad per point with vtkPointGaussianMapper;
+    neither copies the mesh. 'auto' picks instancing up to INSTANCE_LIMIT
+    points and sprites above. Prints the host memory the glyph copies take
+    or would take.
+    """
+    mode = DisplayMode(polyData, mode)
+    sphereSource = vtkSphereSource()
+    sphereSource.SetRadius(radius)
+    sphereSource.Update()
+    glyphBytes = polyData.GetNumberOfPoints() * MeshBytes(sphereSource.GetOutput())
+
+    if mode == 'glyph':
+        glyph3D = Traced(vtkGlyph3D())
+        glyph3D.SetInputData(polyData)
+        glyph3D.SetSourceConnection(sphereSource.GetOutputPort())
+        glyph3D.ScalingOff()
+        glyph3D.Update()
+        glyphBytes = MeshBytes(glyph3D.GetOutput())
+        mapper = vtkPolyDataMapper()
+        mapper.SetInputConnection(glyph3D.GetOutputPort())
+        print(mode, ": ", polyData.GetNumberOfPoints(), " markers, ",
+              "%.1f" % (glyphBytes / 2 ** 20), " MiB of glyph copies")
+    else:
+        if mode == 'instanced':
+            mapper = vtkGlyph3DMapper()
+            mapper.SetSourceConnection(sphereSource.GetOutputPort())
+            mapper.ScalingOff()
+        else:
+            mapper = vtkPointGaussianMapper()
+            mapper.SetScaleFactor(radius)
+            mapper.SetSplatShaderCode(SPHERE_SPLAT_SHADER)
+        mapper.SetInputData(polyData)
+        print(mode, ": ", polyData.GetNumberOfPoints(), " markers, ",
+              "%.1f" % (glyphBytes / 2 ** 20), " MiB of glyph copies saved")
+    mapper.ScalarVisibilityOff()
+
+    actor = vtkActor()
+    actor.SetMapper(mapper)
+    actor.GetProperty().SetColor(color)
+    return actor
+
+
+def FrameTime(renderWindow, frames=10):
+    """Mean seconds per frame while orbiting the camera of the first renderer."""
+    renderWindow.Render()
+    camera = renderWindow.GetRenderers().GetFirstRenderer().GetActiveCamera()
+    start = time.perf_counter()
+    for _ in range(frames):
+        camera.Azimuth(360.0 / frames)
+        renderWindow.Render()
+    return (time.perf_counter() - start) / frames
@@ -0,0 +1,164 @@
+#!/usr/bin/env python
+import time
+import numpy as np
+from vtkmodules.util import numpy_support
+from vtkmodules.vtkCommonCore import vtkPoints
+from vtkmodules.vtkCommonDataModel import vtkPolyData
+from ElevationEngine import PolyVertex
+
+DEFAULT_RENDER_BUDGET = 1000000
+MIN_LEVEL_POINTS = 10000
+MAX_DEPTH = 16
+
+
+def SpreadBits(values):
+    """Move bit i of each value to bit 3 * i, for Morton codes."""
+    x = values.astype(np.uint64) & np.uint64(0x1fffff)
+    for shift, mask in ((32, 0x1f00000000ffff), (16, 0x1f0000ff0000ff),
+                        (8, 0x100f00f00f00f00f), (4, 0x10c30c30c30c30c3),
+                        (2, 0x1249249249249249)):
+        x = (x | (x << np.uint64(shift))) & np.uint64(mask)
+    return x
+
+
+def VoxelLevels(points, minPoints=MIN_LEVEL_POINTS, seed=0):
+    """Spatially stratified subsets of points, as id arrays, largest first.
+
+    Every point gets a random rank and each octree voxel keeps its lowest
+    ranked point. Going one depth up merges eight voxels, so the subsets
+    are nested. The points are sorted once by Morton code; the voxels of
+    every depth are then runs of that order, reduced without sorting
+    again. Depths keeping between minPoints and half of the points become
+    levels.
+    """
+    numberOfPoints = len(points)
+    rank = np.random.default_rng(seed).permutation(numberOfPoints)
+    pointOfRank = np.empty_like(rank)
+    pointOfRank[rank] = np.arange(numberOfPoints)
+
+    low = points.min(axis=0).astype(np.float64)
+    extent = max(float((points.max(axis=0) - low).max()), 1e-12)
+    cells = 1 << MAX_DEPTH
+    index = np.minimum(((points - low) / extent * cells).astype(np.int64), cells - 1)
+    codes = (SpreadBits(index[:, 0]) << np.uint64(2)) | (SpreadBits(index[:, 1]) << np.uint64(1)) \
+        | SpreadBits(index[:, 2])
+    del index
+    order = np.argsort(codes, kind='stable')
+    codes = codes[order]
+    ranks = rank[order]
+    del order
+
+    levels = []
+    for depth in range(1, MAX_DEPTH + 1):
+        voxel = codes >> np.uint64(3 * (MAX_DEPTH - depth))
+        starts = np.flatnonzero(np.r_[True, voxel[1:] != voxel[:-1]])
+        if 2 * len(starts) > numberOfPoints:
+            break
+        if len(starts) >= minPoints:
+            levels.append(np.sort(pointOfRank[np.minimum.reduceat(ranks, starts)]))
+    levels.reverse()
+    return levels
+
+
+def SubsetPolyData(polyData, ids):
+    """The points ids of polyData with their point data, as one polyvertex."""
+    points = vtkPoints()
+    points.SetData(numpy_support.numpy_to_vtk(
+        numpy_support.vtk_to_numpy(polyData.GetPoints().GetData())[ids], deep=1))
+    subset = vtkPolyData()
+    subset.SetPoints(points)
+    subset.SetVerts(PolyVertex(len(ids)))
+    pointData = polyData.GetPointData()
+    for i in range(pointData.GetNumberOfArrays()):
+        source = pointData.GetArray(i)
+        if source is None:
+            continue
+        array = numpy_support.numpy_to_vtk(numpy_support.vtk_to_numpy(source)[ids], deep=1)
+        array.SetName(source.GetName())
+        subset.GetPointData().AddArray(array)
+    scalars = pointData.GetScalars()
+    if scalars is not None:
+        subset.GetPointData().SetActiveScalars(scalars.GetName())
+    return subset
+
+
+class PointBudgetLOD(object):
+    """Swap mapper inputs for coarser levels while the camera moves.
+
+    Add registers a mapper and its full polydata and precomputes the
+    levels. While the interactor style reports an interaction every mapper
+    shows its largest level within its share of budget (shares follow the
+    full sizes); when the interaction ends the full data comes back.
+    Frame times are logged for full-detail frames and summed up for each
+    interaction.
+    """
+
+    def __init__(self, renderWindow, budget=DEFAULT_RENDER_BUDGET):
+        self.renderWindow = renderWindow
+        self.budget = budget
+        self.entries = []
+        self.interacting = False
+        self.frameStart = None
+        self.frames = []
+
+    def Add(self, mapper, polyData):
+        mapper.SetInputData(polyData)
+        levels = []
+        if polyData.GetNumberOfPoints() > self.budget:
+            start = time.perf_counter()
+            points = numpy_support.vtk_to_numpy(polyData.GetPoints().GetData())
+            levels = [SubsetPolyData(polyData, ids) for ids in VoxelLevels(points)]
+            print("LOD levels: ", polyData.GetNumberOfPoints(), " -> ",
+                  [level.GetNumberOfPoints() for level in levels], " points in ",
+                  "%.3f" % (time.perf_counter() - start), " s")
+        self.entries.append((mapper, polyData, levels))
+
+    def Attach(self, style):
+        style.AddObserver('StartInteractionEvent', self.StartInteraction)
+        style.AddObserver('EndInteractionEvent', self.EndInteraction)
+        self.renderWindow.AddObserver('StartEvent', self.StartFrame)
+        self.renderWindow.AddObserver('EndEvent', self.EndFrame)
+
+    def RenderedPoints(self):
+        return sum(mapper.GetInput().GetNumberOfPoints() for mapper, _, _ in self.entries)
+
+    def StartInteraction(self, caller=None, event=None):
+        total = sum(polyData.GetNumberOfPoints() for _, polyData, _ in self.entries)
+        if total <= self.budget:
+            return
+        for mapper, polyData, levels in self.entries:
+            share = self.budget * polyData.GetNumberOfPoints() / total
+            coarse = polyData
+            for level in levels:
+                coarse = level
+                if level.GetNumberOfPoints() <= share:
+                    break
+            mapper.SetInputData(coarse)
+        self.interacting = True
+        self.frames = []
+
+    def EndInteraction(self, caller=None, event=None):
+        if not self.interacting:
+            return
+        self.interacting = False
+        if self.frames:
+            print("Interaction: ", len(self.frames), " frames of ", self.frames[0][1],
+                  " points, mean ", "%.1f" % (1000 * np.mean([f[0] for f in self.frames])),
+                  " ms, max ", "%.1f" % (1000 * max(f[0] for f in self.frames)), " ms")
+        for mapper, polyData, _ in self.entries:
+            mapper.SetInputData(polyData)
+        self.renderWindow.Render()
+
+    def StartFrame(self, caller=None, event=None):
+        self.frameStart = time.perf_counter()
+
+    def EndFrame(self, caller=None, event=None):
+        if self.frameStart is None:
+            return
+        seconds = time.perf_counter() - self.frameStart
+        self.frameStart = None
+        if self.interacting:
+            self.frames.append((seconds, self.RenderedPoints()))
+        else:
+            print("Full detail frame: ", self.RenderedPoints(), " points, ",
+                  "%.1f" % (1000 * seconds), " ms")
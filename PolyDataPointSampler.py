@@ -1,48 +1,18 @@
 #!/usr/bin/env python
 # noinspection PyUnresolvedReferences
-import numpy as np
-from pathlib import Path
-import vtk
 import vtkmodules.vtkInteractionStyle
 # noinspection PyUnresolvedReferences
 import vtkmodules.vtkRenderingOpenGL2
 from vtkmodules.vtkCommonColor import vtkNamedColors
-from vtkmodules.vtkIOXML import vtkXMLPolyDataReader
-from vtkmodules.vtkFiltersGeneral import vtkVertexGlyphFilter
-from vtkmodules.vtkInteractionStyle import vtkInteractorStyleTrackballCamera
-from vtkmodules.vtkCommonDataModel import (
-    vtkCellArray,
-    vtkPolyData,
-    vtkPolyLine
-)
-from vtkmodules.vtkFiltersCore import (
-    vtkCleanPolyData,
-    vtkElevationFilter,
-    vtkGlyph3D,
-    vtkMaskPoints,
-    vtkPolyDataNormals,
-    vtkTriangleFilter
-)
 from vtkmodules.vtkRenderingCore import (
-    vtkActor,
-    vtkActor2D,
-    vtkCamera,
-    vtkDataSetMapper,
-    vtkGlyph3DMapper,
-    vtkPolyDataMapper,
     vtkRenderWindow,
     vtkRenderWindowInteractor,
     vtkRenderer
 )
-from vtkmodules.vtkIOGeometry import (
-     vtkBYUReader,
-     vtkOBJReader,
-     vtkSTLReader
-)
-from vtkmodules.vtkIOLegacy import vtkPolyDataReader
-from vtkmodules.vtkIOPLY import vtkPLYReader
-from vtkmodules.vtkIOXML import vtkXMLPolyDataReader
-from vtkmodules.vtkFiltersSources import vtkSphereSource
+from PointCloudIO import ReadPolyData
+from Pipelines import SamplePoints
+from SurfaceSampler import SampleSurface
+from PointDisplay import DISPLAY_MODES, FrameTime, MarkerActor
 
 def get_program_parameters():
     import argparse
@@ -50,104 +20,43 @@ def get_program_parameters():
     epilogue = ''''''
     parser = argparse.ArgumentParser(description=description, epilog=epilogue,
                                      formatter_class=argparse.RawDescriptionHelpFormatter)
-    parser.add_argument('filename', help='./res/ism_test_cat.vtp')
+    parser.add_argument('filename', nargs='?', default='./res/Torso.vtp',
+                        help='./res/ism_test_cat.vtp')
+    parser.add_argument('--engine', choices=['vtk', 'numpy'], default='vtk',
+                        help='vtkPolyDataPointSampler or the area-weighted NumPy sampler')
+    parser.add_argument('--count', type=int, default=20000,
+                        help='number of points drawn by the numpy engine')
+    parser.add_argument('--seed', type=int, default=None,
+                        help='random seed of the numpy engine')
+    parser.add_argument('--poisson-radius', type=float, default=None,
+                        help='thin the numpy samples to this minimum spacing')
+    parser.add_argument('--display', choices=DISPLAY_MODES, default='auto',
+                        help='glyph copies, instanced spheres or sprites (auto: by point count)')
+    parser.add_argument('--offscreen', action='store_true',
+                        help='render offscreen, report the frame time and exit')
     args = parser.parse_args()
-    return args.filename
+    return args
 
 
-def ReadPolyData(file_name):
-    valid_suffixes = ['.g', '.obj', '.stl', '.ply', '.vtk', '.vtp']
-    path = Path(file_name)
-    if path.suffix:
-        ext = path.suffix.lower()
-    if path.suffix not in valid_suffixes:
-        print(f'No reader for this file suffix: {ext}')
-        return None
-    else:
-        if ext == ".ply":
-            reader = vtkPLYReader()
-            reader.SetFileName(file_name)
-            reader.Update()
-            poly_data = reader.GetOutput()
-        elif ext == ".vtp":
-            reader = vtkXMLPolyDataReader()
-            reader.SetFileName(file_name)
-            reader.Update()
-            poly_data = reader.GetOutput()
-        elif ext == ".obj":
-            reader = vtkOBJReader()
-            reader.SetFileName(file_name)
-            reader.Update()
-            poly_data = reader.GetOutput()
-        elif ext == ".stl":
-            reader = vtkSTLReader()
-            reader.SetFileName(file_name)
-            reader.Update()
-            poly_data = reader.GetOutput()
-        elif ext == ".vtk":
-            reader = vtkPolyDataReader()
-            reader.SetFileName(file_name)
-            reader.Update()
-            poly_data = reader.GetOutput()
-        elif ext == ".g":
-            reader = vtkBYUReader()
-            reader.SetGeometryFileName(file_name)
-            reader.Update()
-            poly_data = reader.GetOutput()
-
-        return poly_data
-
 def main():
     colors = vtkNamedColors()
-    #filename = get_program_parameters()
-    filename ="./res/Torso.vtp" # "./res/ism_test_wolf.vtp"
-    polyData = ReadPolyData(filename)
+    args = get_program_parameters()
+    polyData = ReadPolyData(args.filename)
     bounds = polyData.GetBounds()
     drange =[1, 2, 3]
     for i in range(0, 3):
         drange[i] = bounds[2 * i + 1] - bounds[2 * i]
     print("Range: ",drange[0], ", ", drange[1], ", ", drange[2])
     print("# of original points: ",polyData.GetNumberOfPoints())
-    sample = vtk.vtkPolyDataPointSampler()
-    sample.SetInputData(polyData)
-    sample.SetDistance(drange[0] / 50)
-    sample.Update()
-    print("# of points after sampling: ",sample.GetOutput().GetNumberOfPoints())
+    if args.engine == 'numpy':
+        sample = SampleSurface(polyData, args.count, args.seed, args.poisson_radius)
+    else:
+        sample = SamplePoints(polyData, drange[0] / 50)
+    print("# of points after sampling: ",sample.GetNumberOfPoints())
 
     radius = drange[0] * 0.01
-    originalSource = vtkSphereSource()
-    originalSource.SetRadius(radius)
-
-    originalGlyph3D = vtkGlyph3D()
-    originalGlyph3D.SetInputData(polyData)
-    originalGlyph3D.SetSourceConnection(originalSource.GetOutputPort())
-    originalGlyph3D.ScalingOff()
-    originalGlyph3D.Update()
-
-    originalMapper = vtkPolyDataMapper()
-    originalMapper.SetInputConnection(originalGlyph3D.GetOutputPort())
-    originalMapper.ScalarVisibilityOff()
-
-    originalActor = vtkActor()
-    originalActor.SetMapper(originalMapper)
-    originalActor.GetProperty().SetColor(colors.GetColor3d("Banana"))
-
-    sampleSource = vtkSphereSource()
-    sampleSource.SetRadius(radius * 0.75)
-
-    sampleGlyph3D = vtkGlyph3D()
-    sampleGlyph3D.SetInputConnection(sample.GetOutputPort())
-    sampleGlyph3D.SetSourceConnection(sampleSource.GetOutputPort())
-    sampleGlyph3D.ScalingOff()
-    sampleGlyph3D.Update()
-
-    sampleMapper = vtkPolyDataMapper()
-    sampleMapper.SetInputConnection(sampleGlyph3D.GetOutputPort())
-    sampleMapper.ScalarVisibilityOff()
-
-    sampleActor = vtkActor()
-    sampleActor.SetMapper(sampleMapper)
-    sampleActor.GetProperty().SetColor(colors.GetColor3d("Tomato"))
+    originalActor = MarkerActor(polyData, radius, colors.GetColor3d("Banana"), args.display)
+    sampleActor = MarkerActor(sample, radius * 0.75, colors.GetColor3d("Tomato"), args.display)
 
     # Create graphics stuff   #
     ren1 = vtkRenderer()
@@ -157,6 +66,7 @@ def main():
     renWin.AddRenderer(ren1)
     renWin.SetSize(512, 512)
     renWin.SetWindowName("PolyDataPointSampler")
+    renWin.SetOffScreenRendering(args.offscreen)
 
     iren = vtkRenderWindowInteractor()
     iren.SetRenderWindow(renWin)
@@ -173,7 +83,9 @@ def main():
     ren1.GetActiveCamera().Dolly(1.0)
     ren1.ResetCameraClippingRange()
 
-    renWin.Render()
+    print("Frame time: ", "%.2f" % (FrameTime(renWin) * 1000), " ms")
+    if args.offscreen:
+        return
     iren.Initialize()
     iren.Start()
 
@@ -0,0 +1,312 @@
+#!/usr/bin/env python
+import os
+import tempfile
+import time
+from pathlib import Path
+import numpy as np
+from vtkmodules.util import numpy_support
+from vtkmodules.vtkCommonCore import vtkPoints
+from vtkmodules.vtkCommonDataModel import (
+    vtkCellArray,
+    vtkPolyData
+)
+from vtkmodules.vtkFiltersCore import vtkTriangleFilter
+from PointCloudIO import GetCellArray, LoadPolyData
+from PipelineTrace import Traced
+
+DEFAULT_CHUNK_CELLS = 1 << 20
+READ_BYTES = 16 << 20
+PLY_TYPES = {
+    'char': 'i1', 'int8': 'i1', 'uchar': 'u1', 'uint8': 'u1',
+    'short': 'i2', 'int16': 'i2', 'ushort': 'u2', 'uint16': 'u2',
+    'int': 'i4', 'int32': 'i4', 'uint': 'u4', 'uint32': 'u4',
+    'float': 'f4', 'float32': 'f4', 'double': 'f8', 'float64': 'f8',
+}
+VTK_XML_TYPES = {
+    np.dtype('<f4'): 'Float32', np.dtype('<f8'): 'Float64', np.dtype('<i8'): 'Int64',
+}
+# Zero padded so the real values can be patched in place once known #
+PLACEHOLDER = '0' * 20
+
+
+class PlyHeader(object):
+    """Layout of a binary PLY file whose vertices and faces can be streamed.
+
+    Only vertex properties that are scalars and a face element, if any,
+    holding a single list property are supported; Parse returns None
+    otherwise.
+    """
+
+    @staticmethod
+    def Parse(file_name):
+        with open(file_name, 'rb') as f:
+            if f.readline().strip() != b'ply':
+                return None
+            elements = []
+            byteOrder = None
+            while True:
+                line = f.readline()
+                if not line:
+                    return None
+                words = line.decode('ascii', 'replace').split()
+                if not words or words[0] in ('comment', 'obj_info'):
+                    continue
+                if words[0] == 'format':
+                    byteOrder = {'binary_little_endian': '<',
+                                 'binary_big_endian': '>'}.get(words[1])
+                elif words[0] == 'element':
+                    elements.append((words[1], int(words[2]), []))
+                elif words[0] == 'property' and elements:
+                    elements[-1][2].append(words[1:])
+                elif words[0] == 'end_header':
+                    break
+            dataStart = f.tell()
+        if byteOrder is None:
+            return None
+
+        header = PlyHeader()
+        header.byteOrder = byteOrder
+        offset = dataStart
+        for name, count, properties in elements:
+            if name == 'face':
+                if len(properties) != 1 or properties[0][0] != 'list':
+                    return None
+                header.countType = np.dtype(byteOrder + PLY_TYPES[properties[0][1]])
+                header.indexType = np.dtype(byteOrder + PLY_TYPES[properties[0][2]])
+                header.numberOfFaces = count
+                header.faceStart = offset
+                return header if hasattr(header, 'vertexType') else None
+            if any(prop[0] == 'list' for prop in properties):
+                return None
+            dtype = np.dtype([(prop[1], byteOrder + PLY_TYPES[prop[0]]) for prop in properties])
+            if name == 'vertex':
+                header.vertexType = dtype
+                header.numberOfVertices = count
+                header.vertexStart = offset
+            offset += count * dtype.itemsize
+        if not hasattr(header, 'vertexType'):
+            return None
+        # A point cloud without faces #
+        header.numberOfFaces = 0
+        return header
+
+
+def PlyPoints(file_name, header):
+    vertices = np.memmap(file_name, dtype=header.vertexType, mode='r',
+                         offset=header.vertexStart, shape=(header.numberOfVertices,))
+    points = np.empty((header.numberOfVertices, 3), dtype='<f4')
+    for axis, name in enumerate('xyz'):
+        points[:, axis] = vertices[name]
+    normals = None
+    if all(name in header.vertexType.names for name in ('nx', 'ny', 'nz')):
+        normals = np.empty((header.numberOfVertices, 3), dtype='<f4')
+        for axis, name in enumerate(('nx', 'ny', 'nz')):
+            normals[:, axis] = vertices[name]
+    return points, normals
+
+
+def PlyFaceChunks(file_name, header, chunkCells=DEFAULT_CHUNK_CELLS):
+    """Yield (cellType, offsets, connectivity) for up to chunkCells faces at a time.
+
+    Faces are variable length records; runs of records with the same size
+    are sliced out of the read buffer with one strided view each.
+    """
+    countSize = header.countType.itemsize
+    indexSize = header.indexType.itemsize
+    remaining = header.numberOfFaces
+    with open(file_name, 'rb') as f:
+        f.seek(header.faceStart)
+        data = b''
+        while remaining:
+            if len(data) < READ_BYTES:
+                data += f.read(READ_BYTES)
+            position = 0
+            sizes, pieces = [], []
+            parsed = 0
+            while parsed < min(remaining, chunkCells) and position + countSize <= len(data):
+                size = int(np.frombuffer(data, header.countType, 1, position)[0])
+                stride = countSize + size * indexSize
+                available = min((len(data) - position) // stride,
+                                min(remaining, chunkCells) - parsed)
+                if available == 0:
+                    break
+                counts = np.ndarray((available,), header.countType, data, position, (stride,))
+                run = available if (counts == size).all() else int(np.argmin(counts == size))
+                indices = np.ndarray((run, size), header.indexType, data, position + countSize,
+                                     (stride, indexSize))
+                sizes.append(np.full(run, size, dtype=np.int64))
+                pieces.append(indices.astype(np.int64).reshape(-1))
+                parsed += run
+                position += run * stride
+            if parsed == 0:
+                raise ValueError(f'Truncated face data in {file_name}')
+            data = data[position:]
+            remaining -= parsed
+            offsets = np.zeros(parsed + 1, dtype=np.int64)
+            np.cumsum(np.concatenate(sizes), out=offsets[1:])
+            yield 'polys', offsets, np.concatenate(pieces)
+
+
+def CellChunks(polyData, chunkCells=DEFAULT_CHUNK_CELLS):
+    """Yield (cellType, offsets, connectivity) slices of the polys and strips."""
+    for cellType in ('polys', 'strips'):
+        cellArray = GetCellArray(polyData, cellType)
+        if cellArray.GetNumberOfCells() == 0:
+            continue
+        offsets = numpy_support.vtk_to_numpy(cellArray.GetOffsetsArray())
+        connectivity = numpy_support.vtk_to_numpy(cellArray.GetConnectivityArray())
+        for first in range(0, cellArray.GetNumberOfCells(), chunkCells):
+            chunk = offsets[first:first + chunkCells + 1]
+            yield cellType, chunk - chunk[0], connectivity[chunk[0]:chunk[-1]]
+
+
+def TriangulateChunk(points, cellType, offsets, connectivity):
+    """(M, 3) triangles of a cell range, with ids into the shared points."""
+    if cellType == 'polys' and (np.diff(offsets) == 3).all():
+        return np.asarray(connectivity, dtype=np.int64).reshape(-1, 3)
+    cells = vtkCellArray()
+    cells.SetData(numpy_support.numpy_to_vtkIdTypeArray(np.ascontiguousarray(offsets, np.int64)),
+                  numpy_support.numpy_to_vtkIdTypeArray(np.ascontiguousarray(connectivity,
+                                                                             np.int64)))
+    chunk = vtkPolyData()
+    chunk.SetPoints(points)
+    if cellType == 'polys':
+        chunk.SetPolys(cells)
+    else:
+        chunk.SetStrips(cells)
+    # vtkTriangleFilter passes the points through, so ids stay global #
+    triangleFilter = Traced(vtkTriangleFilter())
+    triangleFilter.SetInputData(chunk)
+    triangleFilter.PassVertsOff()
+    triangleFilter.PassLinesOff()
+    triangleFilter.Update()
+    triangles = triangleFilter.GetOutput().GetPolys().GetConnectivityArray()
+    return numpy_support.vtk_to_numpy(triangles).astype(np.int64).reshape(-1, 3)
+
+
+class AppendedTriangleWriter(object):
+    """Write a triangle mesh as raw appended-binary .vtp while it is produced.
+
+    The points (and normals) are written up front. Triangles are appended
+    with AddTriangles. Close writes the offsets array and patches the
+    polygon count, the offset of that array and the connectivity block
+    size, which were left as zero padded placeholders. Everything goes to
+    a temporary file next to file_name that Close renames into place;
+    Abort removes it, so a failed run never leaves a valid-looking file.
+    """
+
+    def __init__(self, file_name, points, normals=None):
+        self.fileName = str(file_name)
+        fd, self.tmpName = tempfile.mkstemp(prefix=Path(file_name).name + '.',
+                                            dir=Path(file_name).parent)
+        self.file = os.fdopen(fd, 'wb')
+        self.numberOfTriangles = 0
+        points = points.astype('<f4', copy=False)
+        blocks = [('Points', points)]
+        if normals is not None:
+            blocks.append(('Normals', normals.astype('<f4', copy=False)))
+
+        arrays = {}
+        offset = 0
+        for name, array in blocks:
+            arrays[name] = '<DataArray type="%s" Name="%s" NumberOfComponents="3" ' \
+                           'format="appended" offset="%d"/>' % (
+                               VTK_XML_TYPES[array.dtype], name, offset)
+            offset += 8 + array.nbytes
+        self.connectivityOffset = offset
+        pointData = ''
+        if normals is not None:
+            pointData = '<PointData Normals="Normals">%s</PointData>' % arrays['Normals']
+        header = (
+            '<?xml version="1.0"?>\n'
+            '<VTKFile type="PolyData" version="1.0" byte_order="LittleEndian" '
+            'header_type="UInt64">\n'
+            '<PolyData>\n'
+            '<Piece NumberOfPoints="%d" NumberOfVerts="0" NumberOfLines="0" '
+            'NumberOfStrips="0" NumberOfPolys="' % len(points))
+        self.file.write(header.encode('ascii'))
+        self.polysPatch = self.file.tell()
+        header = (
+            PLACEHOLDER + '">\n'
+            '<Points>%s</Points>\n%s\n<Polys>\n'
+            '<DataArray type="Int64" Name="connectivity" format="appended" offset="%d"/>\n'
+            '<DataArray type="Int64" Name="offsets" format="appended" offset="' % (
+                arrays['Points'], pointData, self.connectivityOffset))
+        self.file.write(header.encode('ascii'))
+        self.offsetsPatch = self.file.tell()
+        self.file.write((PLACEHOLDER + '"/>\n</Polys>\n</Piece>\n</PolyData>\n'
+                         '<AppendedData encoding="raw">\n_').encode('ascii'))
+        self.appendedStart = self.file.tell()
+        for name, array in blocks:
+            self.file.write(np.uint64(array.nbytes).astype('<u8').tobytes())
+            self.file.write(np.ascontiguousarray(array).data)
+        self.sizePatch = self.file.tell()
+        self.file.write(np.uint64(0).astype('<u8').tobytes())
+
+    def AddTriangles(self, triangles):
+        self.file.write(np.ascontiguousarray(triangles, dtype='<i8').data)
+        self.numberOfTriangles += len(triangles)
+
+    def Close(self):
+        count = self.numberOfTriangles
+        self.file.write(np.uint64(8 * count).astype('<u8').tobytes())
+        for first in range(0, count, DEFAULT_CHUNK_CELLS):
+            last = min(first + DEFAULT_CHUNK_CELLS, count)
+            self.file.write((3 * np.arange(first + 1, last + 1, dtype='<i8')).data)
+        self.file.write(b'\n</AppendedData>\n</VTKFile>\n')
+
+        offsetsOffset = self.connectivityOffset + 8 + 24 * count
+        for position, value in ((self.polysPatch, count), (self.offsetsPatch, offsetsOffset)):
+            self.file.seek(position)
+            self.file.write(b'%020d' % value)
+        self.file.seek(self.sizePatch)
+        self.file.write(np.uint64(24 * count).astype('<u8').tobytes())
+        self.file.close()
+        os.replace(self.tmpName, self.fileName)
+
+    def Abort(self):
+        self.file.close()
+        os.remove(self.tmpName)
+
+
+def StreamTriangulate(file_name, output_name, chunkCells=DEFAULT_CHUNK_CELLS):
+    """Triangulate the polygons of file_name chunk by chunk into output_name.
+
+    Memory is bounded only for binary PLY: its faces are read straight
+    from the file, so only the points and one chunk of faces are in
+    memory. Other formats are loaded whole through LoadPolyData (after the
+    first read its sidecar maps the cells from disk) and only the
+    triangulation and the output are chunked. Verts and lines are dropped.
+    """
+    start = time.perf_counter()
+    header = PlyHeader.Parse(file_name) if Path(file_name).suffix.lower() == '.ply' else None
+    if header is not None:
+        points, normals = PlyPoints(file_name, header)
+        chunks = PlyFaceChunks(file_name, header, chunkCells)
+    else:
+        polyData = LoadPolyData(file_name)
+        if polyData is None:
+            return None
+        points = numpy_support.vtk_to_numpy(polyData.GetPoints().GetData())
+        normals = polyData.GetPointData().GetNormals()
+        if normals is not None:
+            normals = numpy_support.vtk_to_numpy(normals)
+        chunks = CellChunks(polyData, chunkCells)
+
+    vtkpoints = vtkPoints()
+    vtkpoints.SetData(numpy_support.numpy_to_vtk(points))
+    writer = AppendedTriangleWriter(output_name, points, normals)
+    numberOfChunks = 0
+    try:
+        for cellType, offsets, connectivity in chunks:
+            writer.AddTriangles(TriangulateChunk(vtkpoints, cellType, offsets, connectivity))
+            numberOfChunks += 1
+    except BaseException:
+        writer.Abort()
+        raise
+    writer.Close()
+    elapsed = time.perf_counter() - start
+    print("Streamed ", writer.numberOfTriangles, " triangles in ", numberOfChunks, " chunks, ",
+          "%.3f" % elapsed, " s (", "%.0f" % (writer.numberOfTriangles / elapsed),
+          " triangles/s) to ", output_name)
+    return writer.numberOfTriangles
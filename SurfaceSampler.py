@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+import time
+import numpy as np
+from vtkmodules.util import numpy_support
+from vtkmodules.vtkCommonCore import vtkPoints
+from vtkmodules.vtkCommonDataModel import vtkPolyData
+from vtkmodules.vtkFiltersPoints import vtkPoissonDiskSampler
+from ElevationEngine import PolyVertex
+from Pipelines import Triangulate
+from PipelineTrace import Traced
+
+
+def TriangleArrays(polyData):
+    """Points as float32 and triangles as an (M, 3) id array.
+
+    Polygons that are not all triangles, and triangle strips, go through
+    vtkTriangleFilter first.
+    """
+    if polyData.GetNumberOfStrips() or polyData.GetPolys().IsHomogeneous() != 3:
+        polyData = Triangulate(polyData)
+    polys = polyData.GetPolys()
+    if polys.GetNumberOfCells() == 0:
+        return None, np.empty((0, 3), dtype=np.int64)
+    points = numpy_support.vtk_to_numpy(polyData.GetPoints().GetData()).astype(np.float32)
+    connectivity = numpy_support.vtk_to_numpy(polys.GetConnectivityArray())
+    return points, connectivity.reshape(-1, 3)
+
+
+def PoissonThin(polyData, radius):
+    sampler = Traced(vtkPoissonDiskSampler())
+    sampler.SetInputData(polyData)
+    sampler.SetRadius(radius)
+    sampler.Update()
+    # The sampler outputs a vtkPointSet, give it back its vertex cell #
+    output = vtkPolyData()
+    output.SetPoints(sampler.GetOutput().GetPoints())
+    output.SetVerts(PolyVertex(output.GetNumberOfPoints()))
+    return output
+
+
+def SampleSurface(polyData, numberOfPoints, seed=None, poissonRadius=None):
+    """Uniform random points on the surface of polyData, as a vertex cloud.
+
+    The number of samples of each triangle is drawn at once from a
+    multinomial over the triangle areas, and a barycentric point is drawn
+    for every sample, all in one batch. Samples come out grouped by
+    triangle. The output has exactly numberOfPoints points unless
+    poissonRadius is given, in which case vtkPoissonDiskSampler thins them
+    so that no two are closer than it.
+    """
+    output = vtkPolyData()
+    points, triangles = TriangleArrays(polyData)
+    if len(triangles) == 0:
+        print("No triangles to sample")
+        return output
+    rng = np.random.default_rng(seed)
+
+    # Corner a and edges ab, bc of every triangle: a sample is
+    # a + r1 * (ab + r2 * bc), sqrt(r1) keeping the density uniform #
+    a = points[triangles[:, 0]]
+    ab = points[triangles[:, 1]] - a
+    bc = points[triangles[:, 2]] - points[triangles[:, 1]]
+    area = np.linalg.norm(np.cross(ab.astype(np.float64), bc), axis=1)
+    if area.sum() == 0:
+        print("No triangles to sample")
+        return output
+    counts = rng.multinomial(numberOfPoints, area / area.sum())
+
+    # Samples are grouped by triangle, so repeating the rows of the
+    # per-triangle arrays gathers them faster than fancy indexing #
+    r1 = np.sqrt(rng.random((numberOfPoints, 1), dtype=np.float32))
+    r2 = rng.random((numberOfPoints, 1), dtype=np.float32)
+    samples = np.repeat(bc, counts, axis=0)
+    samples *= r2
+    samples += np.repeat(ab, counts, axis=0)
+    samples *= r1
+    samples += np.repeat(a, counts, axis=0)
+
+    vtkpoints = vtkPoints()
+    vtkpoints.SetData(numpy_support.numpy_to_vtk(samples, deep=1))
+    output.SetPoints(vtkpoints)
+    output.SetVerts(PolyVertex(len(samples)))
+    if poissonRadius:
+        output = PoissonThin(output, poissonRadius)
+    return output
+
+
+if __name__ == '__main__':
+    import argparse
+    from PointCloudIO import ReadPolyData
+    parser = argparse.ArgumentParser(description='Time the NumPy surface sampler.')
+    parser.add_argument('filename', nargs='?', default='./res/Torso.vtp')
+    parser.add_argument('--points', type=int, default=2000000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--poisson-radius', type=float, default=None)
+    args = parser.parse_args()
+    polyData = ReadPolyData(args.filename)
+    start = time.perf_counter()
+    sample = SampleSurface(polyData, args.points, args.seed, args.poisson_radius)
+    elapsed = time.perf_counter() - start
+    print(sample.GetNumberOfPoints(), " points in ", "%.4f" % elapsed, " s (",
+          "%.0f" % (sample.GetNumberOfPoints() / elapsed), " points/s)")
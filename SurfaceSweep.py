@@ -0,0 +1,117 @@
+#!/usr/bin/env python
+import json
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from vtkmodules.util import numpy_support
+from vtkmodules.vtkCommonDataModel import vtkImageData
+from vtkmodules.vtkIOXML import vtkXMLPolyDataWriter
+from Pipelines import ExtractSurface
+from PipelineDag import RADIUS_ARRAY, PipelineDag
+from PipelineTrace import StartTrace
+
+# Surface radii of the default sweep, as fractions of the distance radius #
+DEFAULT_RADIUS_FACTORS = np.linspace(0.55, 1.0, 10)
+
+# The distance volume of a worker process, set by LoadVolume #
+volume = None
+
+
+def LoadVolume(volumeFile, dimensions, origin, spacing, name):
+    """Worker initializer: wrap the memory-mapped distances in a vtkImageData."""
+    global volume
+    # Zero-copy: the VTK array holds a reference to the map #
+    array = numpy_support.numpy_to_vtk(np.load(volumeFile, mmap_mode='r'))
+    array.SetName(name)
+    volume = vtkImageData()
+    volume.SetDimensions(dimensions)
+    volume.SetOrigin(origin)
+    volume.SetSpacing(spacing)
+    volume.GetPointData().SetScalars(array)
+
+
+def ExtractRadius(surfaceRadius, outputName):
+    start = time.perf_counter()
+    surface = ExtractSurface(volume, surfaceRadius)
+    seconds = time.perf_counter() - start
+    writer = vtkXMLPolyDataWriter()
+    writer.SetFileName(outputName)
+    writer.SetInputData(surface)
+    writer.SetDataModeToAppended()
+    # zlib takes ten times as long as the extraction itself #
+    writer.EncodeAppendedDataOff()
+    writer.SetCompressorTypeToNone()
+    writer.Write()
+    return surfaceRadius, outputName, surface.GetNumberOfPoints(), surface.GetNumberOfCells(), seconds
+
+
+def SurfaceSweep(file_name, dimension, radii=None, outputDir='./sweep', distanceRadius=None,
+                 workers=None, outliers=None, outlierSigma=3.0, outlierRadius=None,
+                 voxelFactor=None):
+    """Extract the surface of file_name for every radius of radii from one distance volume.
+
+    The normals and the vtkSignedDistance volume come from a PipelineDag,
+    so they are built once per (points, dimension, distance radius) and
+    later sweeps load them from its stage cache. outliers (a mode of
+    RemoveOutliers) and voxelFactor insert the outlier and voxel grid
+    stages ahead of the normals, as ExtractSurfaceTest applies them. The volume is saved to a
+    memory-mapped .npy that every worker maps instead of receiving a copy;
+    the workers run vtkExtractSurface per radius and write
+    <stem>_r<radius>.vtp plus sweep.json with the timings. radii defaults
+    to DEFAULT_RADIUS_FACTORS times the distance radius.
+    """
+    start = time.perf_counter()
+    description = {'read': {'filter': 'read', 'params': {'file': str(file_name)}}}
+    cloud = 'read'
+    if outliers:
+        description['outliers'] = {'filter': 'outliers', 'inputs': [cloud],
+                                   'params': {'mode': outliers, 'stdDevFactor': outlierSigma,
+                                              'radius': outlierRadius}}
+        cloud = 'outliers'
+    if voxelFactor:
+        description['voxel-grid'] = {'filter': 'voxel-grid', 'inputs': [cloud],
+                                     'params': {'dimension': dimension, 'factor': voxelFactor}}
+        cloud = 'voxel-grid'
+    description['normals'] = {'filter': 'normals', 'inputs': [cloud]}
+    description['distance'] = {'filter': 'signed-distance', 'inputs': ['normals'],
+                               'params': {'dimension': dimension, 'radius': distanceRadius}}
+    dag = PipelineDag(description)
+    distance = dag.Get('distance')
+    distanceRadius = distance.GetFieldData().GetArray(RADIUS_ARRAY).GetValue(0)
+    volumeSeconds = time.perf_counter() - start
+    if radii is None:
+        radii = [float(factor * distanceRadius) for factor in DEFAULT_RADIUS_FACTORS]
+
+    os.makedirs(outputDir, exist_ok=True)
+    stem = os.path.splitext(os.path.basename(file_name))[0]
+    scalars = distance.GetPointData().GetScalars()
+    results = []
+    sweepStart = time.perf_counter()
+    with tempfile.TemporaryDirectory(dir=outputDir) as tmp:
+        volumeFile = os.path.join(tmp, 'distance.npy')
+        np.save(volumeFile, numpy_support.vtk_to_numpy(scalars))
+        initargs = (volumeFile, distance.GetDimensions(), distance.GetOrigin(),
+                    distance.GetSpacing(), scalars.GetName())
+        StartTrace()
+        with ProcessPoolExecutor(max_workers=workers, initializer=LoadVolume,
+                                 initargs=initargs) as executor:
+            futures = [executor.submit(ExtractRadius, radius,
+                                       os.path.join(outputDir, f'{stem}_r{radius:.6g}.vtp'))
+                       for radius in radii]
+            for future in futures:
+                radius, outputName, numPoints, numCells, seconds = future.result()
+                results.append({"radius": radius, "output": outputName, "points": numPoints,
+                                "cells": numCells, "seconds": seconds})
+                print("Radius ", "%.6g" % radius, ": ", numPoints, " points, ", numCells,
+                      " cells in ", "%.3f" % seconds, " s -> ", outputName)
+    sweepSeconds = time.perf_counter() - sweepStart
+
+    with open(os.path.join(outputDir, 'sweep.json'), 'w') as f:
+        json.dump({"input": str(file_name), "dimension": dimension,
+                   "distance_radius": distanceRadius, "volume_seconds": volumeSeconds,
+                   "sweep_seconds": sweepSeconds, "surfaces": results}, f, indent=1)
+    print("Sweep: ", len(results), " surfaces, volume ", "%.3f" % volumeSeconds,
+          " s (built ", dag.executed, "), extraction ", "%.3f" % sweepSeconds, " s wall")
+    return results
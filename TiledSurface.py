@@ -0,0 +1,46 @@
+#!/usr/bin/env python
+import time
+from concurrent.futures import ProcessPoolExecutor
+from NarrowBandSurface import (
+    SparseDistanceVolume,
+    StitchSeams
+)
+from PipelineTrace import StartTrace
+
+
+def ReconstructTile(dimension, radius, bounds, tileSize, key, points, normals):
+    """Signed distance plus surface extraction of one tile, run in a worker."""
+    start = time.perf_counter()
+    tile = SparseDistanceVolume(dimension, radius, bounds, tileSize)
+    tile.blocks[key] = tile.EvaluateBlock(key, points, normals)
+    mesh = tile.ExtractBlock(key, radius)
+    return key, mesh, time.perf_counter() - start
+
+
+def TiledSurface(polyData, dimension, radius, bounds, tileSize=64, halo=None, workers=None):
+    """Reconstruct the surface of an oriented cloud tile by tile in worker processes.
+
+    The padded bounds are cut into tiles of tileSize voxels per axis; each
+    worker gets the points within halo (at least radius) of its tile and
+    builds a dense (tileSize + 1)^3 distance volume, so peak memory per
+    worker is bounded by the tile size. The per-tile meshes share their
+    seam vertices exactly and are merged by StitchSeams.
+    """
+    start = time.perf_counter()
+    volume = SparseDistanceVolume(dimension, radius, bounds, tileSize, halo)
+    pieces = []
+    tileSeconds = 0.0
+    StartTrace()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(ReconstructTile, dimension, radius, bounds, tileSize,
+                                   key, points, normals)
+                   for key, points, normals in volume.ActiveBlocks(polyData)]
+        for future in futures:
+            key, mesh, seconds = future.result()
+            pieces.append(mesh)
+            tileSeconds += seconds
+    surface = StitchSeams(pieces, volume.origin, volume.spacing)
+    print("Tiled: ", len(pieces), " of ", volume.numberOfBlocks ** 3, " tiles of ",
+          tileSize, "^3 voxels, ", "%.3f" % tileSeconds, " s in workers, ",
+          "%.3f" % (time.perf_counter() - start), " s wall")
+    return surface
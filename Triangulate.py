@@ -1,48 +1,19 @@
 #!/usr/bin/env python
 # noinspection PyUnresolvedReferences
-import numpy as np
-from pathlib import Path
-import vtk
 import vtkmodules.vtkInteractionStyle
 # noinspection PyUnresolvedReferences
 import vtkmodules.vtkRenderingOpenGL2
 from vtkmodules.vtkCommonColor import vtkNamedColors
-from vtkmodules.vtkIOXML import vtkXMLPolyDataReader
-from vtkmodules.vtkFiltersGeneral import vtkVertexGlyphFilter
-from vtkmodules.vtkInteractionStyle import vtkInteractorStyleTrackballCamera
-from vtkmodules.vtkCommonDataModel import (
-    vtkCellArray,
-    vtkPolyData,
-    vtkPolyLine
-)
-from vtkmodules.vtkFiltersCore import (
-    vtkCleanPolyData,
-    vtkElevationFilter,
-    vtkGlyph3D,
-    vtkMaskPoints,
-    vtkPolyDataNormals,
-    vtkTriangleFilter
-)
 from vtkmodules.vtkRenderingCore import (
     vtkActor,
-    vtkActor2D,
-    vtkCamera,
-    vtkDataSetMapper,
-    vtkGlyph3DMapper,
     vtkPolyDataMapper,
     vtkRenderWindow,
     vtkRenderWindowInteractor,
     vtkRenderer
 )
-from vtkmodules.vtkIOGeometry import (
-     vtkBYUReader,
-     vtkOBJReader,
-     vtkSTLReader
-)
-from vtkmodules.vtkIOLegacy import vtkPolyDataReader
-from vtkmodules.vtkIOPLY import vtkPLYReader
-from vtkmodules.vtkIOXML import vtkXMLPolyDataReader
-from vtkmodules.vtkFiltersSources import vtkSphereSource
+from PointCloudIO import ReadPolyData
+from Pipelines import Triangulate
+from StreamingTriangulate import DEFAULT_CHUNK_CELLS, StreamTriangulate
 
 def get_program_parameters():
     import argparse
@@ -50,65 +21,28 @@ def get_program_parameters():
     epilogue = ''''''
     parser = argparse.ArgumentParser(description=description, epilog=epilogue,
                                      formatter_class=argparse.RawDescriptionHelpFormatter)
-    parser.add_argument('filename', help='./res/ism_test_cat.vtp')
+    parser.add_argument('filename', nargs='?', default='./res/Torso.vtp',
+                        help='./res/ism_test_cat.vtp')
+    parser.add_argument('--stream', metavar='OUTPUT_VTP',
+                        help='triangulate in cell chunks into an appended .vtp and exit; only '
+                             'binary PLY is read chunk by chunk, other formats are loaded whole')
+    parser.add_argument('--chunk-cells', type=int, default=DEFAULT_CHUNK_CELLS,
+                        help='polygons per chunk when streaming')
     args = parser.parse_args()
-    return args.filename
-
-
-def ReadPolyData(file_name):
-    valid_suffixes = ['.g', '.obj', '.stl', '.ply', '.vtk', '.vtp']
-    path = Path(file_name)
-    if path.suffix:
-        ext = path.suffix.lower()
-    if path.suffix not in valid_suffixes:
-        print(f'No reader for this file suffix: {ext}')
-        return None
-    else:
-        if ext == ".ply":
-            reader = vtkPLYReader()
-            reader.SetFileName(file_name)
-            reader.Update()
-            poly_data = reader.GetOutput()
-        elif ext == ".vtp":
-            reader = vtkXMLPolyDataReader()
-            reader.SetFileName(file_name)
-            reader.Update()
-            poly_data = reader.GetOutput()
-        elif ext == ".obj":
-            reader = vtkOBJReader()
-            reader.SetFileName(file_name)
-            reader.Update()
-            poly_data = reader.GetOutput()
-        elif ext == ".stl":
-            reader = vtkSTLReader()
-            reader.SetFileName(file_name)
-            reader.Update()
-            poly_data = reader.GetOutput()
-        elif ext == ".vtk":
-            reader = vtkPolyDataReader()
-            reader.SetFileName(file_name)
-            reader.Update()
-            poly_data = reader.GetOutput()
-        elif ext == ".g":
-            reader = vtkBYUReader()
-            reader.SetGeometryFileName(file_name)
-            reader.Update()
-            poly_data = reader.GetOutput()
-
-        return poly_data
+    return args
+
 
 def main():
     colors = vtkNamedColors()
-    #filename = get_program_parameters()
-    filename ="./res/Torso.vtp"
-    #filename ="./res/ism_test_wolf.vtp"
-    polyData = ReadPolyData(filename)
-    triangleFilter = vtkTriangleFilter()
-    triangleFilter.SetInputData(polyData)
-    triangleFilter.Update()
+    args = get_program_parameters()
+    if args.stream:
+        StreamTriangulate(args.filename, args.stream, args.chunk_cells)
+        return
+    polyData = ReadPolyData(args.filename)
+    triangles = Triangulate(polyData)
 
     inputMapper = vtkPolyDataMapper()
-    inputMapper.SetInputConnection(triangleFilter.GetOutputPort())
+    inputMapper.SetInputData(triangles)
 
     inputActor = vtkActor()
     inputActor.SetMapper(inputMapper)
@@ -117,7 +51,7 @@ def main():
         colors.GetColor3d("MistyRose"))
 
     triangleMapper = vtkPolyDataMapper()
-    triangleMapper.SetInputConnection(triangleFilter.GetOutputPort())
+    triangleMapper.SetInputData(triangles)
     triangleActor = vtkActor()
     triangleActor.SetMapper(triangleMapper)
     #triangleActor.GetProperty().SetRepresentationToWireframe()
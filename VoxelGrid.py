@@ -0,0 +1,101 @@
+#!/usr/bin/env python
+import time
+import numpy as np
+from vtkmodules.util import numpy_support
+from ChunkedPoints import ReduceVoxels, VoxelKeys
+from ElevationEngine import PointsPolyData, PolyVertex
+from Pipelines import DataRange, PaddedBounds
+
+DEFAULT_VOXEL_FACTOR = 1.0
+
+
+def GridVoxelSize(bounds, dimension, factor=DEFAULT_VOXEL_FACTOR):
+    """factor times the spacing of the signed distance grid over the padded bounds."""
+    return max(DataRange(PaddedBounds(bounds))) / (dimension - 1) * factor
+
+
+def VoxelDownsample(polyData, voxelSize):
+    """Replace the points of each voxelSize cell by their centroid.
+
+    Coordinates are quantized to int64 voxel keys counted from the minimum
+    of the points, so that georeferenced clouds far from 0 stay within the
+    key range, and reduced with np.unique and np.bincount
+    (ChunkedPoints.ReduceVoxels); normals, when present, are averaged the
+    same way and renormalized. Other point arrays are dropped. Prints the
+    reduction ratio.
+    """
+    start = time.perf_counter()
+    points = numpy_support.vtk_to_numpy(polyData.GetPoints().GetData())
+    origin = points.min(axis=0).astype(np.float64) if len(points) else np.zeros(3)
+    columns = [points - origin]
+    normals = polyData.GetPointData().GetNormals()
+    if normals is not None:
+        columns.append(numpy_support.vtk_to_numpy(normals).astype(np.float64))
+    keys = VoxelKeys(points, voxelSize, origin)
+    _, sums, counts = ReduceVoxels(keys, np.hstack(columns), np.ones(len(points)))
+
+    reduced = PointsPolyData((sums[:, :3] / counts[:, None] + origin).astype(points.dtype))
+    reduced.SetVerts(PolyVertex(len(counts)))
+    if normals is not None:
+        average = sums[:, 3:]
+        lengths = np.linalg.norm(average, axis=1, keepdims=True)
+        average /= np.where(lengths > 0, lengths, 1)
+        array = numpy_support.numpy_to_vtk(average.astype(np.float32), deep=1)
+        array.SetName("Normals")
+        reduced.GetPointData().SetNormals(array)
+    print("Voxel grid: ", len(points), " -> ", len(counts), " points (",
+          "%.1f" % (len(points) / max(len(counts), 1)), "x) at voxel size ",
+          "%.4g" % voxelSize, " in ", "%.3f" % (time.perf_counter() - start), " s")
+    return reduced
+
+
+def CompareDownstream(polyData, dimension=256, factor=DEFAULT_VOXEL_FACTOR):
+    """Time normals + signed distance + extraction with and without the voxel grid stage.
+
+    Returns (raw seconds, downsampled seconds including the stage).
+    """
+    from Pipelines import (
+        EstimateNormals,
+        ExtractSurface,
+        NormalSampleSize,
+        SignedDistance,
+        SurfaceRadius
+    )
+
+    def Reconstruct(cloud):
+        start = time.perf_counter()
+        oriented = cloud
+        if not cloud.GetPointData().GetNormals():
+            oriented = EstimateNormals(cloud, NormalSampleSize(cloud))
+        bounds = polyData.GetBounds()
+        radius = SurfaceRadius(bounds, dimension)
+        surface = ExtractSurface(SignedDistance(oriented, dimension, radius, PaddedBounds(bounds)),
+                                 radius)
+        return surface, time.perf_counter() - start
+
+    rawSurface, rawSeconds = Reconstruct(polyData)
+    start = time.perf_counter()
+    reduced = VoxelDownsample(polyData, GridVoxelSize(polyData.GetBounds(), dimension, factor))
+    stageSeconds = time.perf_counter() - start
+    surface, seconds = Reconstruct(reduced)
+    print("Downstream: raw ", "%.3f" % rawSeconds, " s (", rawSurface.GetNumberOfCells(),
+          " cells), voxel grid ", "%.3f" % stageSeconds, " s + ", "%.3f" % seconds, " s (",
+          surface.GetNumberOfCells(), " cells), saved ",
+          "%.3f" % (rawSeconds - stageSeconds - seconds), " s")
+    return rawSeconds, stageSeconds + seconds
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description='Compare reconstruction with and without voxel grid downsampling.')
+    parser.add_argument('filename', nargs='?', default='./res/ism_test_cat.vtp')
+    parser.add_argument('--dimension', type=int, default=256)
+    parser.add_argument('--voxel-factor', type=float, default=DEFAULT_VOXEL_FACTOR,
+                        help='voxel size in signed distance grid spacings')
+    args = parser.parse_args()
+    from PointCloudIO import ReadPolyData
+    CompareDownstream(ReadPolyData(args.filename), args.dimension, args.voxel_factor)
+
+
+if __name__ == '__main__':
+    main()
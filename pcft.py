@@ -0,0 +1,278 @@
+#!/usr/bin/env python
+# pcft: the filter scripts as headless subcommands writing .vtp files.
+# Nothing but the standard library is imported up front; every command
+# imports the pipeline modules (and through them the vtkmodules) it needs
+# when it runs, so `pcft --help` and a single command pay only for their
+# own modules. The interactive scripts remain for viewing results.
+import argparse
+import sys
+import time
+from pathlib import Path
+
+
+def OutputName(args, command):
+    if args.output:
+        return args.output
+    return Path(args.filename).stem + '_' + command + '.vtp'
+
+
+def ReadInput(file_name):
+    from PointCloudIO import ReadPolyData
+    polyData = ReadPolyData(file_name)
+    if polyData is None:
+        raise SystemExit(f'Could not read {file_name}')
+    print("# of input points: ", polyData.GetNumberOfPoints())
+    return polyData
+
+
+def CleanInput(args, polyData):
+    if not args.outliers:
+        return polyData
+    from OutlierRemoval import RemoveOutliers
+    return RemoveOutliers(polyData, args.outliers, stdDevFactor=args.outlier_sigma,
+                          radius=args.outlier_radius)
+
+
+def WritePolyData(polyData, file_name):
+    from vtkmodules.vtkIOXML import vtkXMLPolyDataWriter
+    writer = vtkXMLPolyDataWriter()
+    writer.SetFileName(str(file_name))
+    writer.SetInputData(polyData)
+    writer.SetDataModeToAppended()
+    writer.Write()
+    print(polyData.GetNumberOfPoints(), " points, ", polyData.GetNumberOfCells(),
+          " cells written to ", file_name)
+
+
+def ElevationCommand(args):
+    from ElevationBatch import BatchElevation
+    results = BatchElevation(args.files, args.output_dir, args.workers, args.engine)
+    return 0 if results else 1
+
+
+def DensifyCommand(args):
+    from Pipelines import DataRange
+    polyData = CleanInput(args, ReadInput(args.filename))
+    distance = args.distance or max(DataRange(polyData.GetBounds())) * .03
+    if args.tiles > 0 and args.compare:
+        from PartitionedDensify import CompareWithSingleShot
+        densified, agrees = CompareWithSingleShot(polyData, distance, args.iterations,
+                                                  args.closest_points, tiles=args.tiles,
+                                                  workers=args.workers)
+        if not agrees:
+            print("Partitioned and single-shot point counts disagree, nothing written")
+            return 1
+    elif args.tiles > 0:
+        from PartitionedDensify import PartitionedDensify
+        densified = PartitionedDensify(polyData, distance, args.iterations, args.closest_points,
+                                       tiles=args.tiles, workers=args.workers)
+    elif args.min_growth is not None or args.point_budget is not None:
+        from DensifyDriver import IterativeDensify
+        densified, history = IterativeDensify(polyData, distance, args.iterations,
+                                              args.closest_points, args.min_growth or 0.0,
+                                              args.point_budget)
+    else:
+        from Pipelines import Densify
+        densified = Densify(polyData, distance, args.iterations, args.closest_points)
+    WritePolyData(densified, OutputName(args, 'densify'))
+    return 0
+
+
+def ExtractSurfaceCommand(args):
+    from NeighborIndex import IndexFor
+    from Pipelines import NormalSampleSize, PaddedBounds, SurfaceRadius
+    polyData = CleanInput(args, ReadInput(args.filename))
+    bounds = polyData.GetBounds()
+    if args.voxel_factor:
+        from VoxelGrid import GridVoxelSize, VoxelDownsample
+        polyData = VoxelDownsample(polyData, GridVoxelSize(bounds, args.dimension,
+                                                           args.voxel_factor))
+    if polyData.GetPointData().GetNormals():
+        oriented = polyData
+    else:
+        from NormalCache import CachedNormals
+        oriented = CachedNormals(polyData, NormalSampleSize(polyData),
+                                 locator=IndexFor(polyData).locator)
+    radius = SurfaceRadius(bounds, args.dimension)
+    if args.tiled:
+        from TiledSurface import TiledSurface
+        surface = TiledSurface(oriented, args.dimension, radius, PaddedBounds(bounds),
+                               args.tile_size, workers=args.workers)
+    elif args.narrow_band:
+        from NarrowBandSurface import NarrowBandSurface
+        surface = NarrowBandSurface(oriented, args.dimension, radius, PaddedBounds(bounds),
+                                    args.block_size)
+    else:
+        from Pipelines import ExtractSurface, SignedDistance
+        distance = SignedDistance(oriented, args.dimension, radius, PaddedBounds(bounds),
+                                  IndexFor(oriented).locator)
+        surface = ExtractSurface(distance, radius)
+    WritePolyData(surface, OutputName(args, 'surface'))
+    return 0
+
+
+def OctreeCommand(args):
+    from NeighborIndex import IndexFor
+    from Pipelines import OctreeRepresentation
+    polyData = CleanInput(args, ReadInput(args.filename))
+    if args.octree_cache:
+        from OctreeCache import CachedOctree
+        octree = CachedOctree(polyData, args.filename, args.max_points)
+    else:
+        octree = IndexFor(polyData).Octree(args.max_points)
+    level = octree.GetLevel() if args.level is None else min(args.level, octree.GetLevel())
+    print("Octree levels: ", octree.GetLevel() + 1, ", writing level ", level)
+    WritePolyData(OctreeRepresentation(octree, level), OutputName(args, 'octree'))
+    return 0
+
+
+def SampleCommand(args):
+    polyData = ReadInput(args.filename)
+    if args.engine == 'numpy':
+        from SurfaceSampler import SampleSurface
+        sample = SampleSurface(polyData, args.count, args.seed, args.poisson_radius)
+    else:
+        from Pipelines import DataRange, SamplePoints
+        distance = args.distance or DataRange(polyData.GetBounds())[0] / 50
+        sample = SamplePoints(polyData, distance)
+    WritePolyData(sample, OutputName(args, 'sample'))
+    return 0
+
+
+def TriangulateCommand(args):
+    output = OutputName(args, 'triangles')
+    if args.stream:
+        from StreamingTriangulate import StreamTriangulate
+        return 0 if StreamTriangulate(args.filename, output, args.chunk_cells) is not None else 1
+    from Pipelines import Triangulate
+    WritePolyData(Triangulate(ReadInput(args.filename)), output)
+    return 0
+
+
+def RenderCommand(args):
+    from OffscreenRender import RenderTurntable
+    outputDir = args.output_dir or args.pipeline + '_' + Path(args.filename).stem
+    result = RenderTurntable(args.pipeline, args.filename, outputDir, args.frames,
+                             tuple(args.size), args.workers, args.fps)
+    return 0 if result is not None else 1
+
+
+def get_program_parameters(argv=None):
+    description = 'Headless point cloud filter pipelines.'
+    epilogue = '''
+Each command reads a point cloud or mesh (.vtp, .ply, .stl, .obj, .vtk, .g)
+and writes its result as an appended .vtp, by default <input stem>_<result>.vtp
+in the current directory. Set PCFT_TRACE to record every VTK filter run.
+'''
+    parser = argparse.ArgumentParser(prog='pcft', description=description, epilog=epilogue,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest='command', metavar='COMMAND', required=True)
+
+    def Command(name, handler, help):
+        command = commands.add_parser(name, help=help, description=help)
+        command.set_defaults(handler=handler)
+        if name not in ('elevation', 'render'):
+            command.add_argument('filename')
+            command.add_argument('-o', '--output', help='output .vtp')
+        return command
+
+    def OutlierArguments(command):
+        command.add_argument('--outliers', choices=['statistical', 'radius'], default=None,
+                             help='remove stray points first')
+        command.add_argument('--outlier-sigma', type=float, default=3.0,
+                             help='standard deviations kept by --outliers statistical')
+        command.add_argument('--outlier-radius', type=float, default=None,
+                             help='radius of --outliers radius (default: twice the 4-NN spacing)')
+
+    command = Command('elevation', ElevationCommand, 'color points by elevation')
+    command.add_argument('files', nargs='+', metavar='FILE',
+                         help='input files or glob patterns, e.g. "./res/*.vtp"')
+    command.add_argument('--output-dir', default='./elevation',
+                         help='where <name>_elevation.vtp results go, mirroring the input directories')
+    command.add_argument('--engine', choices=['vtk', 'numpy'], default='vtk')
+    command.add_argument('--workers', type=int, default=None,
+                         help='number of worker processes (default: CPU count)')
+
+    command = Command('densify', DensifyCommand, 'add points with vtkDensifyPointCloudFilter')
+    command.add_argument('--distance', type=float, default=None,
+                         help='target distance (default: 3%% of the largest extent)')
+    command.add_argument('--iterations', type=int, default=5)
+    command.add_argument('--closest-points', type=int, default=10)
+    command.add_argument('--tiles', type=int, default=0,
+                         help='densify in tiles^3 spatial tiles in worker processes')
+    command.add_argument('--workers', type=int, default=None)
+    command.add_argument('--compare', action='store_true',
+                         help='with --tiles, also densify in one call and compare the point counts')
+    command.add_argument('--min-growth', type=float, default=None,
+                         help='densify pass by pass, stop when a pass grows the cloud less than this ratio')
+    command.add_argument('--point-budget', type=int, default=None,
+                         help='densify pass by pass, stop once the cloud has this many points')
+    OutlierArguments(command)
+
+    command = Command('extract-surface', ExtractSurfaceCommand,
+                      'reconstruct a surface from a signed distance volume')
+    command.add_argument('--dimension', type=int, default=256,
+                         help='signed distance volume resolution per axis')
+    command.add_argument('--voxel-factor', type=float, default=None,
+                         help='reconstruct from voxel centroids, voxels this many grid spacings wide')
+    command.add_argument('--narrow-band', action='store_true',
+                         help='evaluate and store distances only within radius of the points')
+    command.add_argument('--block-size', type=int, default=32)
+    command.add_argument('--tiled', action='store_true',
+                         help='reconstruct tile by tile in worker processes')
+    command.add_argument('--tile-size', type=int, default=64)
+    command.add_argument('--workers', type=int, default=None)
+    OutlierArguments(command)
+
+    command = Command('octree', OctreeCommand, 'write the regions of an octree level')
+    command.add_argument('--max-points', type=int, default=5,
+                         help='maximum points per octree region')
+    command.add_argument('--level', type=int, default=None, help='default: the deepest level')
+    command.add_argument('--octree-cache', action='store_true',
+                         help='save the built octree next to the input and reload it next time')
+    OutlierArguments(command)
+
+    command = Command('sample', SampleCommand, 'sample points on the surface')
+    command.add_argument('--engine', choices=['vtk', 'numpy'], default='vtk',
+                         help='vtkPolyDataPointSampler or the area-weighted NumPy sampler')
+    command.add_argument('--distance', type=float, default=None,
+                         help='vtk engine spacing (default: x extent / 50)')
+    command.add_argument('--count', type=int, default=20000,
+                         help='number of points drawn by the numpy engine')
+    command.add_argument('--seed', type=int, default=None)
+    command.add_argument('--poisson-radius', type=float, default=None,
+                         help='thin the numpy samples to this minimum spacing')
+
+    command = Command('triangulate', TriangulateCommand, 'split polygons and strips into triangles')
+    command.add_argument('--stream', action='store_true',
+                         help='triangulate in cell chunks; only binary PLY is read chunk by '
+                              'chunk, other formats are loaded whole')
+    command.add_argument('--chunk-cells', type=int, default=1 << 20,
+                         help='polygons per chunk when streaming')
+
+    command = Command('render', RenderCommand,
+                      'render a pipeline result offscreen as turntable PNGs (and mp4 with ffmpeg)')
+    command.add_argument('pipeline', choices=['elevation', 'densify', 'extract-surface', 'octree',
+                                              'sample', 'triangulate'])
+    command.add_argument('filename')
+    command.add_argument('--output-dir', default=None,
+                         help='frame directory (default: <pipeline>_<input stem>)')
+    command.add_argument('--frames', type=int, default=120)
+    command.add_argument('--size', type=int, nargs=2, default=(640, 480), metavar=('W', 'H'))
+    command.add_argument('--fps', type=int, default=30)
+    command.add_argument('--workers', type=int, default=None)
+
+    args = parser.parse_args(argv)
+    return args
+
+
+def main(argv=None):
+    args = get_program_parameters(argv)
+    start = time.perf_counter()
+    status = args.handler(args)
+    print(args.command, ": ", "%.3f" % (time.perf_counter() - start), " s")
+    return status
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,36 @@
+import os
+import shutil
+
+from conftest import ROOT
+from ElevationBatch import BatchElevation, OutputNames
+
+
+def test_output_names_mirror_input_directories(tmp_path):
+    names = OutputNames([str(tmp_path / 'a' / 'cat.vtp'), str(tmp_path / 'b' / 'cat.vtp')],
+                        'out')
+    assert names == [os.path.join('out', 'a', 'cat_elevation.vtp'),
+                     os.path.join('out', 'b', 'cat_elevation.vtp')]
+    assert OutputNames([str(tmp_path / 'cat.vtp')], 'out') == [os.path.join('out',
+                                                                             'cat_elevation.vtp')]
+
+
+def test_recursive_glob_keeps_same_named_files(tmp_path, monkeypatch):
+    monkeypatch.setenv('PCFT_SIDECAR', '0')
+    for directory in ('a', 'b'):
+        (tmp_path / 'in' / directory).mkdir(parents=True)
+        shutil.copy(os.path.join(ROOT, 'res', 'ism_test_horse.vtp'),
+                    tmp_path / 'in' / directory / 'horse.vtp')
+    results = BatchElevation([str(tmp_path / 'in' / '**' / '*.vtp')], str(tmp_path / 'out'),
+                             workers=1)
+    assert len(results) == 2
+    assert (tmp_path / 'out' / 'a' / 'horse_elevation.vtp').exists()
+    assert (tmp_path / 'out' / 'b' / 'horse_elevation.vtp').exists()
+
+
+def test_name_collision_fails(tmp_path, monkeypatch):
+    monkeypatch.setenv('PCFT_SIDECAR', '0')
+    (tmp_path / 'in').mkdir()
+    shutil.copy(os.path.join(ROOT, 'res', 'ism_test_horse.vtp'), tmp_path / 'in' / 'horse.vtp')
+    shutil.copy(os.path.join(ROOT, 'res', 'ism_test_horse.vtp'), tmp_path / 'in' / 'horse.VTP')
+    assert BatchElevation([str(tmp_path / 'in' / '*')], str(tmp_path / 'out'), workers=1) == []
+    assert not (tmp_path / 'out').exists()
@@ -0,0 +1,23 @@
+import numpy as np
+from vtkmodules.util import numpy_support
+
+from ElevationEngine import NumpyElevation
+from Pipelines import Elevation
+
+
+def ArrayNames(attributes):
+    return [attributes.GetArrayName(i) for i in range(attributes.GetNumberOfArrays())]
+
+
+def test_numpy_engine_matches_vtk(horse):
+    points = numpy_support.vtk_to_numpy(horse.GetPoints().GetData())
+    height = numpy_support.numpy_to_vtk(points[:, 1].copy(), deep=1)
+    height.SetName('Height')
+    horse.GetPointData().SetScalars(height)
+    expected = Elevation(horse).GetPointData()
+    actual = NumpyElevation(horse).GetPointData()
+    assert ArrayNames(actual) == ArrayNames(expected) == ['Height', 'Elevation']
+    assert actual.GetScalars().GetName() == 'Elevation'
+    assert np.allclose(numpy_support.vtk_to_numpy(actual.GetScalars()),
+                       numpy_support.vtk_to_numpy(expected.GetScalars()), atol=1e-6)
+    assert horse.GetPointData().GetScalars().GetName() == 'Height'
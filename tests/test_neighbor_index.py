@@ -0,0 +1,37 @@
+import numpy as np
+from vtkmodules.util import numpy_support
+
+import NeighborIndex
+from NeighborIndex import IndexFor
+from NormalCache import CachedNormals
+from Pipelines import EstimateNormals, PaddedBounds, SignedDistance, SurfaceRadius
+
+
+def test_index_survives_normals(horse, tmp_path, monkeypatch):
+    monkeypatch.setenv('PCFT_NORMAL_CACHE', str(tmp_path))
+    index = IndexFor(horse)
+    oriented = CachedNormals(horse, 10, locator=index.locator)
+    assert IndexFor(oriented) is index
+    assert IndexFor(horse) is index
+    # Second run comes from the cache #
+    oriented = CachedNormals(horse, 10, locator=index.locator)
+    assert IndexFor(oriented) is index
+
+
+def test_shared_locator_gives_same_distances(horse):
+    oriented = EstimateNormals(horse, 10)
+    bounds = horse.GetBounds()
+    radius = SurfaceRadius(bounds, 32)
+    own = SignedDistance(oriented, 32, radius, PaddedBounds(bounds))
+    shared = SignedDistance(oriented, 32, radius, PaddedBounds(bounds), IndexFor(oriented).locator)
+    assert np.array_equal(numpy_support.vtk_to_numpy(own.GetPointData().GetScalars()),
+                          numpy_support.vtk_to_numpy(shared.GetPointData().GetScalars()))
+
+
+def test_modified_points_are_reindexed(horse):
+    index = IndexFor(horse)
+    points = numpy_support.vtk_to_numpy(horse.GetPoints().GetData())
+    points[0] += 1.0
+    horse.GetPoints().GetData().Modified()
+    assert IndexFor(horse) is not index
+    assert index not in NeighborIndex.indices.values()
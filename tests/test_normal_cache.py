@@ -0,0 +1,33 @@
+import os
+
+from NormalCache import CachedNormals
+
+
+def CacheFiles(cacheDir):
+    return sorted(path.name for path in cacheDir.glob('*.npy'))
+
+
+def test_normal_cache_evicts_least_recently_used(horse, tmp_path, monkeypatch):
+    monkeypatch.setenv('PCFT_NORMAL_CACHE', str(tmp_path))
+    CachedNormals(horse, 10)
+    (first,) = CacheFiles(tmp_path)
+    entryBytes = (tmp_path / first).stat().st_size
+    monkeypatch.setenv('PCFT_NORMAL_CACHE_BYTES', str(int(entryBytes * 2.5)))
+    CachedNormals(horse, 12)
+    (second,) = set(CacheFiles(tmp_path)) - {first}
+    os.utime(tmp_path / first, ns=(1, 1))
+    os.utime(tmp_path / second, ns=(2, 2))
+    # A hit makes the first entry the most recently used #
+    CachedNormals(horse, 10)
+    CachedNormals(horse, 14)
+    files = CacheFiles(tmp_path)
+    assert len(files) == 2
+    assert first in files and second not in files
+
+
+def test_normal_cache_skips_entries_over_budget(horse, tmp_path, monkeypatch):
+    monkeypatch.setenv('PCFT_NORMAL_CACHE', str(tmp_path))
+    monkeypatch.setenv('PCFT_NORMAL_CACHE_BYTES', '1')
+    oriented = CachedNormals(horse, 10)
+    assert oriented.GetPointData().GetNormals() is not None
+    assert CacheFiles(tmp_path) == []
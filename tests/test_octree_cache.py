@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+from vtkmodules.util import numpy_support
+from vtkmodules.vtkCommonCore import vtkPoints
+from vtkmodules.vtkCommonDataModel import vtkPolyData
+
+from OctreeCache import ReadOctree, SaveOctree
+from Pipelines import BuildOctree
+
+
+def FaceBounds(representation):
+    """The bounds of every quad of an octree representation, sorted."""
+    points = numpy_support.vtk_to_numpy(representation.GetPoints().GetData()).astype(np.float64)
+    polys = numpy_support.vtk_to_numpy(representation.GetPolys().GetConnectivityArray())
+    faces = points[polys.reshape(-1, 4)]
+    return np.unique(np.round(np.hstack([faces.min(axis=1), faces.max(axis=1)]), 4), axis=0)
+
+
+def PlanarCloud():
+    grid = np.stack(np.meshgrid(np.zeros(1), np.linspace(0, 10, 40), np.linspace(0, 5, 30),
+                                indexing='ij'), -1).reshape(-1, 3)
+    points = vtkPoints()
+    points.SetData(numpy_support.numpy_to_vtk(grid.astype(np.float32), deep=1))
+    polyData = vtkPolyData()
+    polyData.SetPoints(points)
+    return polyData
+
+
+@pytest.mark.parametrize('cloud', ['horse', 'planar'])
+def test_saved_octree_matches_vtk(cloud, horse, tmp_path):
+    polyData = horse if cloud == 'horse' else PlanarCloud()
+    octree = BuildOctree(polyData, 5)
+    path = tmp_path / 'cloud.5.octree'
+    SaveOctree(octree, path)
+    loaded = ReadOctree(path, polyData)
+    assert loaded is not None
+    assert loaded.GetLevel() == octree.GetLevel()
+    assert loaded.GetNumberOfLeafNodes() == octree.GetNumberOfLeafNodes()
+    for level in range(octree.GetLevel() + 1):
+        expected = vtkPolyData()
+        octree.GenerateRepresentation(level, expected)
+        actual = vtkPolyData()
+        loaded.GenerateRepresentation(level, actual)
+        assert np.array_equal(FaceBounds(expected), FaceBounds(actual)), level
+
+
+def test_saved_octree_queries(horse, tmp_path):
+    octree = BuildOctree(horse, 5)
+    path = tmp_path / 'horse.5.octree'
+    SaveOctree(octree, path)
+    loaded = ReadOctree(path, horse)
+    points = numpy_support.vtk_to_numpy(horse.GetPoints().GetData())
+    for x in points[::347]:
+        assert loaded.FindClosestPoint(x) == octree.FindClosestPoint(x)
+
+
+def test_stale_octree_is_ignored(horse, tmp_path):
+    path = tmp_path / 'horse.5.octree'
+    SaveOctree(BuildOctree(horse, 5), path)
+    assert ReadOctree(path, PlanarCloud()) is None
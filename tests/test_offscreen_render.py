@@ -0,0 +1,34 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from conftest import ROOT
+
+
+def test_import_keeps_the_gl_driver():
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    env.pop('LIBGL_ALWAYS_SOFTWARE', None)
+    result = subprocess.run([sys.executable, '-c', 'import os, OffscreenRender; '
+                             'print(os.environ.get("LIBGL_ALWAYS_SOFTWARE"))'],
+                            env=env, check=True, capture_output=True, text=True)
+    assert result.stdout.strip() == 'None'
+
+
+@pytest.mark.skipif(not sys.platform.startswith('linux'), reason='Mesa fallback is Linux only')
+def test_software_gl_only_without_display(monkeypatch):
+    import OffscreenRender
+    monkeypatch.delenv('LIBGL_ALWAYS_SOFTWARE', raising=False)
+    monkeypatch.delenv('WAYLAND_DISPLAY', raising=False)
+    monkeypatch.setenv('DISPLAY', ':0')
+    assert not OffscreenRender.SoftwareGLFallback()
+    assert 'LIBGL_ALWAYS_SOFTWARE' not in os.environ
+    monkeypatch.delenv('DISPLAY')
+    monkeypatch.setattr(OffscreenRender.glob, 'glob', lambda pattern: [])
+    assert OffscreenRender.SoftwareGLFallback()
+    assert os.environ['LIBGL_ALWAYS_SOFTWARE'] == '1'
+    # A value chosen by the caller is kept #
+    monkeypatch.setenv('LIBGL_ALWAYS_SOFTWARE', '0')
+    assert not OffscreenRender.SoftwareGLFallback()
+    assert os.environ['LIBGL_ALWAYS_SOFTWARE'] == '0'
@@ -0,0 +1,30 @@
+import numpy as np
+import pytest
+from vtkmodules.util import numpy_support
+
+from ElevationEngine import PointsPolyData
+from OutlierRemoval import RemoveOutliers
+from Pipelines import DataRange
+
+
+@pytest.fixture
+def strays(horse):
+    """horse with five points far outside its bounds appended."""
+    points = numpy_support.vtk_to_numpy(horse.GetPoints().GetData())
+    extent = max(DataRange(horse.GetBounds()))
+    far = points.max(axis=0) + extent * np.arange(1, 6)[:, None]
+    return PointsPolyData(np.vstack([points, far.astype(points.dtype)])), horse.GetNumberOfPoints()
+
+
+@pytest.mark.parametrize('mode', ['statistical', 'radius'])
+def test_outliers_drop_strays(strays, mode):
+    polyData, numberOfPoints = strays
+    cleaned = RemoveOutliers(polyData, mode)
+    assert cleaned.GetNumberOfPoints() <= numberOfPoints
+    assert cleaned.GetNumberOfPoints() > numberOfPoints * .95
+    assert max(DataRange(cleaned.GetBounds())) < max(DataRange(polyData.GetBounds())) / 2
+
+
+def test_outliers_reject_unknown_mode(horse):
+    with pytest.raises(ValueError):
+        RemoveOutliers(horse, 'median')
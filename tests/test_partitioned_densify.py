@@ -0,0 +1,19 @@
+import os
+
+import pytest
+
+from conftest import ROOT
+from PartitionedDensify import CompareWithSingleShot
+from Pipelines import DataRange
+from PointCloudIO import DecodePolyData
+
+
+@pytest.mark.parametrize('name', ['horse', 'cat'])
+def test_partitioned_matches_single_shot(name, capsys):
+    polyData = DecodePolyData(os.path.join(ROOT, 'res', f'ism_test_{name}.vtp'))
+    distance = max(DataRange(polyData.GetBounds())) * .03
+    partitioned, agrees = CompareWithSingleShot(polyData, distance, tolerance=0.01, tiles=2,
+                                                workers=1)
+    assert agrees
+    assert partitioned.GetNumberOfPoints() > polyData.GetNumberOfPoints()
+    assert 'Single shot: ' in capsys.readouterr().out
@@ -0,0 +1,52 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from conftest import ROOT
+
+WORKERS = '''
+import multiprocessing, sys
+from concurrent.futures import ProcessPoolExecutor
+from ElevationBatch import ElevateFile
+from PipelineTrace import StartTrace
+
+if __name__ == '__main__':
+    StartTrace()
+    context = multiprocessing.get_context(sys.argv[1])
+    with ProcessPoolExecutor(max_workers=2, mp_context=context) as executor:
+        list(executor.map(ElevateFile, [sys.argv[2]] * 2, [sys.argv[3], sys.argv[4]]))
+'''
+
+
+def Run(args, tracePath, cwd):
+    env = dict(os.environ, PCFT_TRACE=str(tracePath), PCFT_SIDECAR='0', PYTHONPATH=ROOT)
+    return subprocess.run([sys.executable] + args, env=env, cwd=cwd, check=True,
+                          capture_output=True, text=True)
+
+
+def test_import_has_no_side_effects(tmp_path):
+    tracePath = tmp_path / 'trace.jsonl'
+    result = Run(['-c', 'import json, os, PipelineTrace, Pipelines; '
+                  'print(json.dumps(sorted(k for k in os.environ if k.startswith("PCFT_"))))'],
+                 tracePath, tmp_path)
+    assert not tracePath.exists()
+    assert json.loads(result.stdout) == ['PCFT_SIDECAR', 'PCFT_TRACE']
+
+
+@pytest.mark.parametrize('method', ['fork', 'spawn'])
+def test_workers_append_to_the_parent_trace(tmp_path, method):
+    tracePath = tmp_path / 'trace.jsonl'
+    tracePath.write_text('stale\n')
+    script = tmp_path / 'workers.py'
+    script.write_text(WORKERS)
+    horse = os.path.join(ROOT, 'res', 'ism_test_horse.vtp')
+    Run([str(script), method, horse, str(tmp_path / 'a.vtp'), str(tmp_path / 'b.vtp')],
+        tracePath, tmp_path)
+    records = [json.loads(line) for line in tracePath.read_text().splitlines()]
+    # Reader, vertex glyphs and elevation in each of the two workers #
+    assert len(records) == 6
+    assert {record["name"] for record in records} == {
+        'vtkXMLPolyDataReader', 'vtkVertexGlyphFilter', 'vtkElevationFilter'}
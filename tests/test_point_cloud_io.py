@@ -0,0 +1,130 @@
+import os
+import shutil
+
+import numpy as np
+import pytest
+from vtkmodules.util import numpy_support
+from vtkmodules.vtkCommonCore import vtkDoubleArray, vtkStringArray
+from vtkmodules.vtkIOXML import vtkXMLPolyDataWriter
+
+import PointCloudIO
+from conftest import ROOT
+from PointCloudIO import DecodePolyData, LoadPolyData, SidecarPath
+
+
+def AttributeArrays(attributes):
+    return {attributes.GetArrayName(i): (attributes.GetArray(i).GetDataType(),
+                                         numpy_support.vtk_to_numpy(attributes.GetArray(i)))
+            for i in range(attributes.GetNumberOfArrays())}
+
+
+def AssertSamePolyData(expected, actual):
+    assert (expected.GetPoints().GetData().GetDataType()
+            == actual.GetPoints().GetData().GetDataType())
+    assert np.array_equal(numpy_support.vtk_to_numpy(expected.GetPoints().GetData()),
+                          numpy_support.vtk_to_numpy(actual.GetPoints().GetData()))
+    for group in ('GetPointData', 'GetCellData', 'GetFieldData'):
+        expectedArrays = AttributeArrays(getattr(expected, group)())
+        actualArrays = AttributeArrays(getattr(actual, group)())
+        assert expectedArrays.keys() == actualArrays.keys()
+        for name, (dataType, values) in expectedArrays.items():
+            assert actualArrays[name][0] == dataType
+            assert np.array_equal(actualArrays[name][1], values)
+    for attribute in ('GetNormals', 'GetScalars'):
+        expectedArray = getattr(expected.GetPointData(), attribute)()
+        actualArray = getattr(actual.GetPointData(), attribute)()
+        assert (expectedArray is None) == (actualArray is None)
+        if expectedArray is not None:
+            assert expectedArray.GetName() == actualArray.GetName()
+    assert expected.GetNumberOfCells() == actual.GetNumberOfCells()
+    for cells in ('GetVerts', 'GetLines', 'GetPolys', 'GetStrips'):
+        expectedCells = getattr(expected, cells)()
+        actualCells = getattr(actual, cells)()
+        assert np.array_equal(numpy_support.vtk_to_numpy(expectedCells.GetConnectivityArray()),
+                              numpy_support.vtk_to_numpy(actualCells.GetConnectivityArray()))
+
+
+def WriteVtp(polyData, path):
+    writer = vtkXMLPolyDataWriter()
+    writer.SetFileName(str(path))
+    writer.SetInputData(polyData)
+    writer.Write()
+
+
+@pytest.fixture
+def richCloud(tmp_path):
+    """horse with float64 points, scalars, a cell array and field data."""
+    polyData = DecodePolyData(os.path.join(ROOT, 'res', 'ism_test_horse.vtp'))
+    points = numpy_support.vtk_to_numpy(polyData.GetPoints().GetData()).astype(np.float64)
+    polyData.GetPoints().SetData(numpy_support.numpy_to_vtk(points, deep=1))
+    elevation = numpy_support.numpy_to_vtk(points[:, 2].copy(), deep=1)
+    elevation.SetName('Elevation')
+    polyData.GetPointData().SetScalars(elevation)
+    colors = numpy_support.numpy_to_vtk(
+        np.random.default_rng(0).integers(0, 255, (len(points), 3), dtype=np.uint8), deep=1)
+    colors.SetName('Colors')
+    polyData.GetPointData().AddArray(colors)
+    cellIds = numpy_support.numpy_to_vtk(np.arange(polyData.GetNumberOfCells(), dtype=np.int32),
+                                         deep=1)
+    cellIds.SetName('CellIds')
+    polyData.GetCellData().AddArray(cellIds)
+    field = vtkDoubleArray()
+    field.SetName('Scale')
+    field.InsertNextValue(2.5)
+    polyData.GetFieldData().AddArray(field)
+    path = tmp_path / 'rich.vtp'
+    WriteVtp(polyData, path)
+    return path
+
+
+def test_sidecar_round_trip(richCloud):
+    decoded = LoadPolyData(richCloud)
+    assert SidecarPath(richCloud).is_dir()
+    mapped = LoadPolyData(richCloud)
+    AssertSamePolyData(DecodePolyData(richCloud), decoded)
+    AssertSamePolyData(decoded, mapped)
+    assert mapped.GetPoints().GetData().GetDataType() == decoded.GetPoints().GetData().GetDataType()
+
+
+def test_sidecar_of_bundled_model(tmp_path):
+    path = tmp_path / 'horse.vtp'
+    shutil.copy(os.path.join(ROOT, 'res', 'ism_test_horse.vtp'), path)
+    decoded = LoadPolyData(path)
+    AssertSamePolyData(decoded, LoadPolyData(path))
+
+
+def test_no_sidecar_for_string_arrays(richCloud, tmp_path):
+    polyData = DecodePolyData(richCloud)
+    labels = vtkStringArray()
+    labels.SetName('Labels')
+    labels.SetNumberOfValues(polyData.GetNumberOfPoints())
+    polyData.GetPointData().AddArray(labels)
+    path = tmp_path / 'labels.vtp'
+    WriteVtp(polyData, path)
+    LoadPolyData(path)
+    assert not SidecarPath(path).exists()
+
+
+def test_sidecar_follows_umask(richCloud):
+    umask = os.umask(0o022)
+    try:
+        LoadPolyData(richCloud)
+    finally:
+        os.umask(umask)
+    assert SidecarPath(richCloud).stat().st_mode & 0o777 == 0o755
+
+
+def test_sidecar_removed_while_read(richCloud, monkeypatch):
+    LoadPolyData(richCloud)
+    sidecar = SidecarPath(richCloud)
+    mapArray = PointCloudIO.MapArray
+
+    def RemoveThenMap(path):
+        # Another process replaces the sidecar after meta.json was read #
+        shutil.rmtree(sidecar, ignore_errors=True)
+        return mapArray(path)
+
+    monkeypatch.setattr(PointCloudIO, 'MapArray', RemoveThenMap)
+    assert PointCloudIO.ReadSidecar(richCloud) is None
+    monkeypatch.setattr(PointCloudIO, 'MapArray', mapArray)
+    AssertSamePolyData(DecodePolyData(richCloud), LoadPolyData(richCloud))
@@ -0,0 +1,36 @@
+import os
+import shutil
+
+from conftest import ROOT
+from PointCloudIO import DecodePolyData, PolyDataCache
+
+
+def test_cache_evicts_least_recently_used(tmp_path, monkeypatch):
+    monkeypatch.setenv('PCFT_SIDECAR', '0')
+    paths = []
+    for i in range(3):
+        path = tmp_path / f'copy{i}.vtp'
+        shutil.copy(os.path.join(ROOT, 'res', 'ism_test_horse.vtp'), path)
+        paths.append(path)
+    entryBytes = DecodePolyData(paths[0]).GetActualMemorySize() * 1024
+    cache = PolyDataCache(int(entryBytes * 2.5))
+    cache.Get(paths[0])
+    cache.Get(paths[1])
+    cache.Get(paths[0])
+    cache.Get(paths[2])
+    stats = cache.Stats()
+    assert stats["entries"] == 2
+    assert stats["bytes"] <= cache.maxBytes
+    keys = [key[0] for key in cache.entries]
+    assert keys == [str(paths[0].resolve()), str(paths[2].resolve())]
+    cache.Get(paths[0])
+    assert cache.Stats()["hits"] == 2
+
+
+def test_cache_skips_entries_over_budget(tmp_path, monkeypatch):
+    monkeypatch.setenv('PCFT_SIDECAR', '0')
+    path = tmp_path / 'horse.vtp'
+    shutil.copy(os.path.join(ROOT, 'res', 'ism_test_horse.vtp'), path)
+    cache = PolyDataCache(1)
+    assert cache.Get(path) is not None
+    assert cache.Stats()["entries"] == 0
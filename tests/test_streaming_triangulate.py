@@ -0,0 +1,74 @@
+import os
+
+import numpy as np
+import pytest
+from vtkmodules.util import numpy_support
+from vtkmodules.vtkFiltersCore import vtkTriangleFilter
+from vtkmodules.vtkIOPLY import vtkPLYWriter
+from vtkmodules.vtkIOXML import vtkXMLPolyDataReader
+
+import StreamingTriangulate
+from conftest import ROOT
+from PointCloudIO import DecodePolyData
+from StreamingTriangulate import StreamTriangulate
+
+
+def Triangles(polyData):
+    points = numpy_support.vtk_to_numpy(polyData.GetPoints().GetData())
+    triangles = numpy_support.vtk_to_numpy(polyData.GetPolys().GetConnectivityArray())
+    return points, triangles.reshape(-1, 3)
+
+
+def ReadVtp(path):
+    reader = vtkXMLPolyDataReader()
+    reader.SetFileName(str(path))
+    reader.Update()
+    return reader.GetOutput()
+
+
+@pytest.fixture
+def torso():
+    return DecodePolyData(os.path.join(ROOT, 'res', 'Torso.vtp'))
+
+
+def ExpectedTriangles(polyData):
+    triangleFilter = vtkTriangleFilter()
+    triangleFilter.SetInputData(polyData)
+    triangleFilter.PassVertsOff()
+    triangleFilter.PassLinesOff()
+    triangleFilter.Update()
+    return Triangles(triangleFilter.GetOutput())
+
+
+@pytest.mark.parametrize('suffix', ['.vtp', '.ply'])
+def test_stream_matches_triangle_filter(torso, tmp_path, monkeypatch, suffix):
+    monkeypatch.setenv('PCFT_SIDECAR', '0')
+    source = os.path.join(ROOT, 'res', 'Torso.vtp')
+    if suffix == '.ply':
+        source = str(tmp_path / 'torso.ply')
+        writer = vtkPLYWriter()
+        writer.SetFileName(source)
+        writer.SetInputData(torso)
+        writer.SetFileTypeToBinary()
+        writer.Write()
+    output = tmp_path / 'torso_triangles.vtp'
+    count = StreamTriangulate(source, str(output), chunkCells=1000)
+    points, triangles = Triangles(ReadVtp(output))
+    expectedPoints, expectedTriangles = ExpectedTriangles(DecodePolyData(source))
+    assert count == len(expectedTriangles)
+    assert np.allclose(points, expectedPoints)
+    assert np.array_equal(triangles, expectedTriangles)
+    assert [name for name in os.listdir(tmp_path) if name.startswith('torso_triangles.vtp.')] == []
+
+
+def test_failed_stream_leaves_no_output(tmp_path, monkeypatch):
+    monkeypatch.setenv('PCFT_SIDECAR', '0')
+
+    def Fail(*args):
+        raise RuntimeError('interrupted')
+
+    monkeypatch.setattr(StreamingTriangulate, 'TriangulateChunk', Fail)
+    output = tmp_path / 'torso_triangles.vtp'
+    with pytest.raises(RuntimeError):
+        StreamTriangulate(os.path.join(ROOT, 'res', 'Torso.vtp'), str(output))
+    assert os.listdir(tmp_path) == []
@@ -0,0 +1,19 @@
+import json
+import os
+
+from conftest import ROOT
+from SurfaceSweep import SurfaceSweep
+
+
+def test_sweep_applies_outliers_and_voxel_grid(tmp_path, monkeypatch, capsys):
+    monkeypatch.setenv('PCFT_DAG_CACHE', str(tmp_path / 'cache'))
+    monkeypatch.setenv('PCFT_SIDECAR', '0')
+    results = SurfaceSweep(os.path.join(ROOT, 'res', 'ism_test_horse.vtp'), 32, [8.0],
+                           str(tmp_path / 'sweep'), workers=1, outliers='statistical',
+                           voxelFactor=1.0)
+    output = capsys.readouterr().out
+    assert 'Outliers ( statistical )' in output
+    assert 'Voxel grid:' in output
+    assert len(results) == 1 and results[0]["cells"] > 0
+    with open(tmp_path / 'sweep' / 'sweep.json') as f:
+        assert json.load(f)["surfaces"][0]["radius"] == 8.0
@@ -0,0 +1,56 @@
+import numpy as np
+from vtkmodules.util import numpy_support
+
+from ChunkedPoints import VoxelDownsampleChunks
+from ElevationEngine import PointsPolyData
+from NormalCache import CachedNormals
+from Pipelines import NormalSampleSize
+from VoxelGrid import GridVoxelSize, VoxelDownsample
+
+
+def Points(polyData):
+    return numpy_support.vtk_to_numpy(polyData.GetPoints().GetData()).astype(np.float64)
+
+
+def Sorted(points):
+    return points[np.lexsort(points.T)]
+
+
+def test_voxel_centroids_match_numpy(horse):
+    voxelSize = GridVoxelSize(horse.GetBounds(), 64)
+    reduced = VoxelDownsample(horse, voxelSize)
+    points = Points(horse)
+    cells, inverse = np.unique(np.floor((points - points.min(axis=0)) / voxelSize), axis=0,
+                               return_inverse=True)
+    inverse = inverse.ravel()
+    expected = np.zeros((len(cells), 3))
+    np.add.at(expected, inverse, points)
+    expected /= np.bincount(inverse)[:, None]
+    assert reduced.GetNumberOfPoints() == len(cells)
+    assert reduced.GetNumberOfVerts() == 1
+    assert np.allclose(Sorted(Points(reduced)), Sorted(expected), atol=1e-4)
+
+
+def test_voxel_grid_far_from_origin(horse):
+    # UTM-like coordinates: 2^20 voxels of 0.4 m end 420 km from 0 #
+    offset = np.array([5e5, 5e6, 100.0])
+    voxelSize = 0.4
+    near = VoxelDownsample(horse, voxelSize)
+    far = VoxelDownsample(PointsPolyData(Points(horse) + offset), voxelSize)
+    assert far.GetNumberOfPoints() == near.GetNumberOfPoints()
+    assert np.allclose(Sorted(Points(far) - offset), Sorted(Points(near)), atol=1e-6)
+    centroids, counts = VoxelDownsampleChunks(np.array_split(Points(horse) + offset, 4), 40.0)
+    assert counts.sum() == horse.GetNumberOfPoints()
+    assert np.all(np.abs(centroids - offset) < 1e3)
+
+
+def test_voxel_normals_stay_unit(horse, tmp_path, monkeypatch):
+    monkeypatch.setenv('PCFT_NORMAL_CACHE', str(tmp_path))
+    oriented = CachedNormals(horse, NormalSampleSize(horse))
+    reduced = VoxelDownsample(oriented, GridVoxelSize(horse.GetBounds(), 64))
+    normals = numpy_support.vtk_to_numpy(reduced.GetPointData().GetNormals())
+    assert len(normals) == reduced.GetNumberOfPoints()
+    lengths = np.linalg.norm(normals, axis=1)
+    # Opposite normals in one voxel cancel to a zero vector #
+    assert np.allclose(lengths[lengths > 0], 1, atol=1e-5)
+    assert np.count_nonzero(lengths) > len(lengths) * .99